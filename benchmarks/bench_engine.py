@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Benchmark engine percakapan (MentalHealthChatbot.get_response).
+
+Sesi sintetis multi-giliran dibangun dari kata kunci theme_patterns, END_PHRASES
+dan CLOSING_KEYWORDS dengan seed tetap, lalu diukur:
+  - latensi per giliran (p50/p95/p99) dan throughput (giliran/detik)
+  - latensi ringkasan penutup terhadap panjang riwayat
+  - memori per sesi yang masih aktif
+
+    python benchmarks/bench_engine.py --output hasil.json
+    python benchmarks/bench_engine.py --compare baseline.json --threshold 0.2
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, TextIO
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.cache import get_detection_cache
+from src.core.chatbot import CLOSING_KEYWORDS, END_PHRASES, MentalHealthChatbot
+from src.core.knowledge_base import get_shared_knowledge_base
+from src.core.normalizer import get_normalizer
+from src.core.replay import session_rng
+
+FILLERS = ["hmm", "iya", "gitu deh", "aku juga nggak ngerti", "oke", "makasih ya", "halo lagi"]
+TEMPLATES = ["aku merasa {kw} banget", "akhir-akhir ini {kw} terus", "soal {kw}, rasanya berat", "{kw}"]
+
+# Metrik yang dibandingkan pada mode --compare (semakin kecil semakin baik, kecuali throughput)
+LOWER_IS_BETTER = ('turn_p50_us', 'turn_p95_us', 'turn_p99_us', 'bytes_per_session')
+HIGHER_IS_BETTER = ('turns_per_second',)
+
+def build_corpus(rng: random.Random, sessions: int, turns: int) -> List[List[str]]:
+    keywords = [kw for kws in get_shared_knowledge_base().theme_patterns.values() for kw in kws]
+    corpus = []
+    for i in range(sessions):
+        script = [f"halo, nama saya user{i}"]
+        for _ in range(turns):
+            roll = rng.random()
+            if roll < 0.6:
+                script.append(rng.choice(TEMPLATES).format(kw=rng.choice(keywords)))
+            elif roll < 0.75:
+                script.append(rng.choice(END_PHRASES))
+            else:
+                script.append(rng.choice(FILLERS))
+        script.append(rng.choice(CLOSING_KEYWORDS))
+        corpus.append(script)
+    return corpus
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+def bench_turns(corpus: List[List[str]], seed: int) -> Dict[str, float]:
+    latencies = []
+    timer = time.perf_counter
+    start = timer()
+    for i, script in enumerate(corpus):
+        chatbot = MentalHealthChatbot(f"user{i}", rng=session_rng(seed, f"user{i}"))
+        for text in script[:-1]:
+            t0 = timer()
+            chatbot.get_response(text)
+            latencies.append(timer() - t0)
+    elapsed = timer() - start
+    return {
+        'turns': len(latencies),
+        'turn_p50_us': percentile(latencies, 50) * 1e6,
+        'turn_p95_us': percentile(latencies, 95) * 1e6,
+        'turn_p99_us': percentile(latencies, 99) * 1e6,
+        'turns_per_second': len(latencies) / elapsed,
+    }
+
+def bench_closing(rng: random.Random, lengths: List[int], repeats: int, seed: int) -> Dict[str, float]:
+    results = {}
+    for length in lengths:
+        samples = []
+        for r in range(repeats):
+            script = build_corpus(rng, 1, length)[0]
+            chatbot = MentalHealthChatbot(f"closing{r}", max_history=max(length + 2, 100),
+                                          rng=session_rng(seed, f"closing{length}:{r}"))
+            for text in script[:-1]:
+                chatbot.get_response(text)
+            t0 = time.perf_counter()
+            chatbot.get_response(script[-1])
+            samples.append(time.perf_counter() - t0)
+        results[str(length)] = percentile(samples, 50) * 1e6
+    return results
+
+def bench_memory(corpus: List[List[str]], seed: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    live = []
+    for i, script in enumerate(corpus):
+        chatbot = MentalHealthChatbot(f"user{i}", rng=session_rng(seed, f"user{i}"))
+        for text in script[:-1]:
+            chatbot.get_response(text)
+        live.append(chatbot)
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (after - before) / len(live)
+
+def run(args) -> Dict:
+    # Setiap sesi memakai RNG sendiri (session_rng), sama seperti replay
+    rng = random.Random(args.seed)
+    get_shared_knowledge_base()
+    corpus = build_corpus(rng, args.sessions, args.turns)
+
+    # Pemanasan (import, automaton, jalur kode) dengan korpus terpisah, lalu cache deteksi
+    # dan normalizer dikosongkan agar giliran terukur tidak sekadar mengulang hit cache
+    warm_up = build_corpus(random.Random(args.seed + 1), max(1, args.sessions // 10), args.turns)
+    bench_turns(warm_up, args.seed + 1)
+    get_detection_cache().clear()
+    get_normalizer().clear()
+
+    results = bench_turns(corpus, args.seed)
+    results['bytes_per_session'] = bench_memory(corpus[:args.memory_sessions], args.seed)
+    results['closing_p50_us_by_history'] = bench_closing(rng, args.closing_lengths, args.closing_repeats, args.seed)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'sessions': args.sessions,
+            'turns_per_session': args.turns,
+            'seed': args.seed,
+            'timestamp': time.time(),
+        },
+        'results': results,
+    }
+
+def compare(current: Dict, baseline: Dict, threshold: float, out: TextIO = sys.stdout) -> List[str]:
+    """Mengembalikan daftar regresi yang melewati ambang (proporsi, mis. 0.2 = 20%)."""
+    regressions = []
+    cur, base = current['results'], baseline['results']
+    for key in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+        if key not in base or not base[key]:
+            continue
+        change = (cur[key] - base[key]) / base[key]
+        if key in HIGHER_IS_BETTER:
+            change = -change
+        marker = "REGRESI" if change > threshold else "ok"
+        print(f"  {key:<22}{base[key]:>14,.1f} -> {cur[key]:>14,.1f}  ({change:+.1%}) {marker}", file=out)
+        if change > threshold:
+            regressions.append(key)
+    for length, value in cur['closing_p50_us_by_history'].items():
+        base_value = base.get('closing_p50_us_by_history', {}).get(length)
+        if base_value:
+            change = (value - base_value) / base_value
+            marker = "REGRESI" if change > threshold else "ok"
+            print(f"  closing@{length:<14}{base_value:>14,.1f} -> {value:>14,.1f}  ({change:+.1%}) {marker}", file=out)
+            if change > threshold:
+                regressions.append(f"closing@{length}")
+    return regressions
+
+def print_report(report: Dict):
+    r = report['results']
+    print(f"giliran          : {r['turns']}")
+    print(f"latensi p50/p95/p99 (us): {r['turn_p50_us']:.1f} / {r['turn_p95_us']:.1f} / {r['turn_p99_us']:.1f}")
+    print(f"throughput       : {r['turns_per_second']:,.0f} giliran/detik")
+    print(f"memori per sesi  : {r['bytes_per_session']:,.0f} bytes")
+    print("ringkasan penutup (p50, us) per panjang riwayat:")
+    for length, value in r['closing_p50_us_by_history'].items():
+        print(f"  {length:>5} giliran: {value:,.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark engine MentalHealthChatbot")
+    parser.add_argument('--sessions', type=int, default=300)
+    parser.add_argument('--turns', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--memory-sessions', type=int, default=200)
+    parser.add_argument('--closing-lengths', type=int, nargs='+', default=[10, 50, 100, 200])
+    parser.add_argument('--closing-repeats', type=int, default=5)
+    parser.add_argument('--output', help="Tulis hasil JSON ke file ini ('-' untuk stdout)")
+    parser.add_argument('--compare', help="File JSON baseline untuk dibandingkan")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Ambang regresi relatif untuk --compare (default 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(report)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        # Dengan --output - stdout berisi JSON; perbandingan dialihkan ke stderr
+        out = sys.stderr if args.output == '-' else sys.stdout
+        print(f"\nPerbandingan dengan {args.compare} (ambang {args.threshold:.0%}):", file=out)
+        regressions = compare(report, baseline, args.threshold, out)
+        if regressions:
+            print(f"Regresi terdeteksi: {', '.join(regressions)}", file=out)
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark reflections: implementasi lama (enam re.sub berurutan dan satu
+scan per pemicu) dibandingkan dengan reflector satu lintasan.
+
+Selain waktu per panggilan, dilaporkan juga berapa kalimat yang hasilnya berbeda;
+implementasi lama membalik "aku" menjadi "kamu" lalu kembali menjadi "aku".
+
+    python benchmarks/bench_reflections.py --number 20000
+"""
+
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.reflections import reflect_pronouns, should_use_reflection
+
+LEGACY_REFLECTIONS = {
+    r'\bsaya\b': 'kamu',
+    r'\baku\b': 'kamu',
+    r'\bku\b': 'mu',
+    r'\bkamu\b': 'aku',
+    r'\bmu\b': 'ku',
+    r'\banda\b': 'saya'
+}
+LEGACY_TRIGGERS = ['saya merasa', 'aku merasa', 'saya ingin', 'aku ingin']
+
+def legacy_reflect_pronouns(text: str) -> str:
+    reflected = text.lower()
+    for pattern, replacement in LEGACY_REFLECTIONS.items():
+        reflected = re.sub(pattern, replacement, reflected, flags=re.IGNORECASE)
+    return reflected
+
+def legacy_should_use_reflection(user_input: str) -> bool:
+    user_lower = user_input.lower()
+    return any(trigger in user_lower for trigger in LEGACY_TRIGGERS)
+
+SENTENCES = [
+    "Aku merasa kamu tidak pernah mendengarkan aku",
+    "saya ingin pacarku lebih perhatian sama aku",
+    "capek banget sama kuliah, dosennya galak",
+    "aku merasa sendiri, teman-temanku menjauh dan ibuku sibuk",
+    "Kenapa anda bilang begitu ke saya?",
+    "hari ini biasa saja sih, nggak ada yang spesial " * 3,
+]
+
+def bench(fn, number: int) -> float:
+    """Waktu terbaik per panggilan (mikrodetik) untuk seluruh kalimat contoh."""
+    runs = timeit.repeat(lambda: [fn(s) for s in SENTENCES], number=number, repeat=5)
+    return min(runs) / number / len(SENTENCES) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark reflect_pronouns & should_use_reflection")
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'fungsi':<24}{'lama us':>10}{'baru us':>10}{'speedup':>10}")
+    for name, old, new in [('reflect_pronouns', legacy_reflect_pronouns, reflect_pronouns),
+                           ('should_use_reflection', legacy_should_use_reflection, should_use_reflection)]:
+        old_us, new_us = bench(old, args.number), bench(new, args.number)
+        print(f"{name:<24}{old_us:>10.2f}{new_us:>10.2f}{old_us / new_us:>9.1f}x")
+
+    changed = [s for s in SENTENCES if legacy_reflect_pronouns(s) != reflect_pronouns(s)]
+    print(f"\n{len(changed)} dari {len(SENTENCES)} kalimat direfleksikan berbeda, contoh:")
+    for sentence in changed[:2]:
+        print(f"  {sentence!r}\n    lama: {legacy_reflect_pronouns(sentence)!r}\n    baru: {reflect_pronouns(sentence)!r}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Gateway Discord tiruan untuk uji beban lokal.
+
+Menyediakan user, channel (DM dan server), pesan, dan context command tiruan yang
+cukup untuk menjalankan MentalHealthBot.on_message, start_chat dan stop_chat tanpa
+koneksi ke Discord. Setiap `send` (teks maupun embed) dicatat per channel, dan
+balasan yang muncul di channel selama satu pesan diproses dikembalikan ke pemanggilnya
+(akurat selama setiap channel hanya dipakai oleh satu user sintetis sekaligus).
+"""
+
+import asyncio
+import itertools
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import discord
+
+class SentMessage(NamedTuple):
+    channel_id: int
+    content: Optional[str]
+    embeds: Tuple[Any, ...]
+    sent_at: float
+
+class FakeUser:
+    bot = False
+
+    def __init__(self, user_id: int, name: str):
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{user_id}>"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, FakeUser) and other.id == self.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+class _FakeTyping:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+class FakeChannel:
+    def __init__(self, gateway: 'FakeGateway', channel_id: int, private: bool):
+        self.gateway = gateway
+        self.id = channel_id
+        self.type = discord.ChannelType.private if private else discord.ChannelType.text
+        self.sent: List[SentMessage] = []
+
+    async def send(self, content: Optional[str] = None, *, embed: Optional[Any] = None,
+                   embeds: Sequence[Any] = ()) -> SentMessage:
+        if content is not None and len(content) > 2000:
+            # Batas yang sama dengan API asli, agar pemecahan pesan ikut teruji
+            raise ValueError(f"content lebih dari 2000 karakter ({len(content)})")
+        if self.gateway.api_latency:
+            await asyncio.sleep(self.gateway.api_latency)
+        sent = SentMessage(self.id, content, ((embed,) if embed is not None else ()) + tuple(embeds),
+                           time.perf_counter())
+        self.sent.append(sent)
+        self.gateway.record(sent)
+        return sent
+
+    def typing(self) -> _FakeTyping:
+        return _FakeTyping()
+
+class FakeMessage:
+    def __init__(self, message_id: int, author: FakeUser, channel: FakeChannel, content: str):
+        self.id = message_id
+        self.author = author
+        self.channel = channel
+        self.content = content
+        self.guild = None if channel.type == discord.ChannelType.private else channel.gateway.guild
+
+class FakeContext:
+    """Pengganti commands.Context untuk command yang dipanggil langsung."""
+
+    def __init__(self, message: FakeMessage, bot: Any):
+        self.message = message
+        self.bot = bot
+        self.author = message.author
+        self.channel = message.channel
+        self.guild = message.guild
+
+    async def send(self, content: Optional[str] = None, *, embed: Optional[Any] = None,
+                   embeds: Sequence[Any] = ()) -> SentMessage:
+        return await self.channel.send(content, embed=embed, embeds=embeds)
+
+class FakeGateway:
+    """
+    Mengantar event sintetis ke bot. `api_latency` mensimulasikan waktu respons
+    REST Discord untuk setiap `send`.
+    """
+
+    def __init__(self, bot: Any, api_latency: float = 0.0):
+        self.bot = bot
+        self.api_latency = api_latency
+        self.guild = object()
+        self._ids = itertools.count(1)
+        self._dm_channels: Dict[int, FakeChannel] = {}
+
+        self.messages_in = 0
+        self.sends = 0
+        self.embeds = 0
+        self.chars_out = 0
+
+    def user(self, user_id: int, name: Optional[str] = None) -> FakeUser:
+        return FakeUser(user_id, name or f"user{user_id}")
+
+    def dm_channel(self, user: FakeUser) -> FakeChannel:
+        channel = self._dm_channels.get(user.id)
+        if channel is None:
+            channel = self._dm_channels[user.id] = FakeChannel(self, next(self._ids), private=True)
+        return channel
+
+    def guild_channel(self) -> FakeChannel:
+        return FakeChannel(self, next(self._ids), private=False)
+
+    def record(self, sent: SentMessage):
+        self.sends += 1
+        for embed in sent.embeds:
+            self.embeds += 1
+            self.chars_out += len(getattr(embed, 'description', None) or '')
+        if sent.content:
+            self.chars_out += len(sent.content)
+
+    def _message(self, author: FakeUser, channel: FakeChannel, content: str) -> FakeMessage:
+        self.messages_in += 1
+        return FakeMessage(next(self._ids), author, channel, content)
+
+    async def dispatch_message(self, author: FakeUser, channel: FakeChannel, content: str) -> List[SentMessage]:
+        """Mengirim pesan lewat on_message dan mengembalikan semua balasan yang dipicunya."""
+        start = len(channel.sent)
+        await self.bot.on_message(self._message(author, channel, content))
+        return channel.sent[start:]
+
+    async def invoke_command(self, name: str, author: FakeUser, channel: FakeChannel) -> List[SentMessage]:
+        """
+        Memanggil callback command (mis. 'start_chat', 'stop_chat') dengan context tiruan,
+        melewati parser command discord.py yang butuh state koneksi asli.
+        """
+        command = getattr(type(self.bot), name)
+        ctx = FakeContext(self._message(author, channel, f"!{command.name}"), self.bot)
+        start = len(channel.sent)
+        await command.callback(self.bot, ctx)
+        return channel.sent[start:]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'messages_in': self.messages_in,
+            'sends': self.sends,
+            'embeds': self.embeds,
+            'chars_out': self.chars_out,
+        }
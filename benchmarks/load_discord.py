@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Uji beban MentalHealthBot dengan gateway Discord tiruan (benchmarks/fake_discord.py).
+
+Ribuan user sintetis bercakap bersamaan: sebagian lewat DM (sesi otomatis,
+diakhiri kata penutup), sebagian di channel server (!chat lalu !stop). Untuk
+setiap tingkat konkurensi dilaporkan:
+  - latensi end-to-end per pesan (dari on_message sampai semua balasan terkirim)
+  - lag event loop (p50/p99/max) selama beban berjalan
+  - RSS proses dan jumlah sesi aktif di akhir putaran
+
+    python benchmarks/load_discord.py --users 100 1000 5000 --turns 8
+    python benchmarks/load_discord.py --users 2000 --api-latency 0.05 --output hasil.json
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from core.chatbot import CLOSING_KEYWORDS, END_PHRASES
+from core.knowledge_base import get_shared_knowledge_base
+from fake_discord import FakeGateway
+from integrations.discord_bot import MentalHealthBot
+
+# Sama dengan bench_engine.py; tidak diimpor dari sana karena modul itu memakai jalur paket `src.core`
+FILLERS = ["hmm", "iya", "gitu deh", "aku juga nggak ngerti", "oke", "makasih ya", "halo lagi"]
+TEMPLATES = ["aku merasa {kw} banget", "akhir-akhir ini {kw} terus", "soal {kw}, rasanya berat", "{kw}"]
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+def rss_bytes() -> int:
+    """RSS saat ini dari /proc (Linux); selain itu puncak RSS dari getrusage."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+class LoopLagProbe:
+    """Mencatat setiap sampel lag (bukan hanya rata-rata) agar persentil bisa dihitung."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+def build_script(rng: random.Random, keywords: List[str], turns: int) -> List[str]:
+    script = []
+    for _ in range(turns):
+        roll = rng.random()
+        if roll < 0.6:
+            script.append(rng.choice(TEMPLATES).format(kw=rng.choice(keywords)))
+        elif roll < 0.75:
+            script.append(rng.choice(END_PHRASES))
+        else:
+            script.append(rng.choice(FILLERS))
+    return script
+
+async def simulate_user(gateway: FakeGateway, user_id: int, script: List[str], in_guild: bool,
+                        rng: random.Random, args, latencies: List[float], errors: List[str]):
+    timer = time.perf_counter
+    user = gateway.user(user_id)
+    await asyncio.sleep(rng.uniform(0, args.ramp))
+
+    try:
+        if in_guild:
+            channel = gateway.guild_channel()
+            t0 = timer()
+            await gateway.invoke_command('start_chat', user, channel)
+            latencies.append(timer() - t0)
+        else:
+            channel = gateway.dm_channel(user)
+            # Pesan pertama di DM membuka sesi dan dijawab dengan sapaan
+            script = ["halo"] + script
+
+        for text in script:
+            await asyncio.sleep(rng.expovariate(1 / args.think) if args.think else 0)
+            t0 = timer()
+            replies = await gateway.dispatch_message(user, channel, text)
+            latencies.append(timer() - t0)
+            if not replies:
+                errors.append(f"user{user_id}: tidak ada balasan untuk {text!r}")
+
+        t0 = timer()
+        if in_guild:
+            await gateway.invoke_command('stop_chat', user, channel)
+        else:
+            await gateway.dispatch_message(user, channel, rng.choice(CLOSING_KEYWORDS))
+        latencies.append(timer() - t0)
+    except Exception as e:
+        errors.append(f"user{user_id}: {type(e).__name__}: {e}")
+
+async def run_level(users: int, rng: random.Random, keywords: List[str], args) -> Dict:
+    bot = MentalHealthBot()
+    gateway = FakeGateway(bot, api_latency=args.api_latency)
+    probe = LoopLagProbe(args.lag_interval)
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    gc.collect()
+    rss_before = rss_bytes()
+    probe.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        simulate_user(gateway, 10_000_000 + i, build_script(rng, keywords, args.turns),
+                      rng.random() < args.guild_share, random.Random(rng.random()), args, latencies, errors)
+        for i in range(users)
+    ))
+    elapsed = time.perf_counter() - start
+    await probe.stop()
+
+    result = {
+        'users': users,
+        'messages': len(latencies),
+        'errors': len(errors),
+        'elapsed_s': elapsed,
+        'messages_per_second': len(latencies) / elapsed,
+        'latency_p50_ms': percentile(latencies, 50) * 1000,
+        'latency_p95_ms': percentile(latencies, 95) * 1000,
+        'latency_p99_ms': percentile(latencies, 99) * 1000,
+        'latency_max_ms': max(latencies) * 1000,
+        'loop_lag_p50_ms': percentile(probe.samples, 50) * 1000 if probe.samples else 0.0,
+        'loop_lag_p99_ms': percentile(probe.samples, 99) * 1000 if probe.samples else 0.0,
+        'loop_lag_max_ms': max(probe.samples, default=0.0) * 1000,
+        'rss_bytes': rss_bytes(),
+        'rss_delta_bytes': rss_bytes() - rss_before,
+        'sessions_left': len(bot.chatbots),
+        'executor': bot.executor.stats(),
+        'sender': bot.sender.stats(),
+        'gateway': gateway.stats(),
+    }
+    for error in errors[:5]:
+        print(f"  ! {error}", file=sys.stderr)
+
+    await bot.executor.shutdown()
+    await bot.sender.shutdown()
+    if bot.session_store is not None:
+        bot.session_store.close()
+    return result
+
+def print_report(levels: List[Dict]):
+    header = (f"{'users':>7} {'pesan':>8} {'msg/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'lag p99':>8} {'lag max':>8} {'RSS MB':>8} {'error':>6}")
+    print(header)
+    print('-' * len(header))
+    for r in levels:
+        print(f"{r['users']:>7} {r['messages']:>8} {r['messages_per_second']:>8,.0f} "
+              f"{r['latency_p50_ms']:>8.1f} {r['latency_p95_ms']:>8.1f} {r['latency_p99_ms']:>8.1f} "
+              f"{r['loop_lag_p99_ms']:>8.1f} {r['loop_lag_max_ms']:>8.1f} "
+              f"{r['rss_bytes'] / 2**20:>8.1f} {r['errors']:>6}")
+
+async def run(args) -> Dict:
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    keywords = [kw for kws in get_shared_knowledge_base().theme_patterns.values() for kw in kws]
+    levels = []
+    for users in args.users:
+        levels.append(await run_level(users, rng, keywords, args))
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'turns_per_user': args.turns,
+            'think_s': args.think,
+            'api_latency_s': args.api_latency,
+            'guild_share': args.guild_share,
+            'executor': os.getenv('ENGINE_EXECUTOR', 'thread'),
+            'seed': args.seed,
+            'timestamp': time.time(),
+        },
+        'levels': levels,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Uji beban MentalHealthBot dengan gateway Discord tiruan")
+    parser.add_argument('--users', type=int, nargs='+', default=[100, 500, 1000, 2000],
+                        help="Tingkat konkurensi (jumlah user bersamaan) yang diuji berurutan")
+    parser.add_argument('--turns', type=int, default=8, help="Pesan per user di luar sapaan dan penutup")
+    parser.add_argument('--think', type=float, default=0.05, help="Rata-rata jeda antar pesan per user (detik)")
+    parser.add_argument('--ramp', type=float, default=1.0, help="Rentang waktu mulainya semua user (detik)")
+    parser.add_argument('--api-latency', type=float, default=0.0, help="Simulasi latensi REST per send (detik)")
+    parser.add_argument('--guild-share', type=float, default=0.3, help="Proporsi user yang memakai !chat di server")
+    parser.add_argument('--lag-interval', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', help="Tulis hasil JSON ke file ini ('-' untuk stdout)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+    print_report(report['levels'])
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
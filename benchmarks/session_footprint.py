@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Mengukur memori dan waktu konstruksi per sesi MentalHealthChatbot.
+
+Mode 'private' meniru perilaku lama (setiap sesi membangun KnowledgeBase sendiri,
+ditambah satu lagi di ConversationAnalyzer); mode 'shared' memakai konten
+bersama per proses.
+
+    python benchmarks/session_footprint.py [jumlah_sesi]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.analyzer import ConversationAnalyzer
+from src.core.chatbot import MentalHealthChatbot
+from src.core.knowledge_base import KnowledgeBase, get_shared_knowledge_base
+
+def _private_session(i: int) -> MentalHealthChatbot:
+    return MentalHealthChatbot(f"user{i}", knowledge_base=KnowledgeBase(),
+                               analyzer=ConversationAnalyzer(KnowledgeBase()))
+
+def _shared_session(i: int) -> MentalHealthChatbot:
+    return MentalHealthChatbot(f"user{i}")
+
+def measure(factory, sessions: int) -> dict:
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    bots = [factory(i) for i in range(sessions)]
+    elapsed = time.perf_counter() - start
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del bots
+    return {
+        'bytes_per_session': (after - before) / sessions,
+        'us_per_session': elapsed / sessions * 1e6,
+    }
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    get_shared_knowledge_base()  # dimuat sekali per proses, di luar pengukuran
+
+    print(f"{'mode':<10}{'bytes/sesi':>14}{'us/sesi':>12}")
+    for name, factory in (('private', _private_session), ('shared', _shared_session)):
+        result = measure(factory, sessions)
+        print(f"{name:<10}{result['bytes_per_session']:>14,.0f}{result['us_per_session']:>12,.1f}")
+
+if __name__ == '__main__':
+    main()
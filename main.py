@@ -6,16 +6,29 @@ Focus on genuine empathy and natural conversation
 
 import sys
 import os
+import threading
 
 # Menambahkan src directory ke Python path
 src_path = os.path.join(os.path.dirname(__file__), 'src')
 sys.path.insert(0, src_path)
 
+def _warm_engine_in_background() -> threading.Thread:
+    """Import dan warm-up engine berjalan selagi user mengetik namanya."""
+    def load():
+        try:
+            from core.chatbot import warm_up
+            warm_up()
+        except Exception:
+            pass  # Diulang di thread utama, yang akan melaporkan error-nya
+    thread = threading.Thread(target=load, name='engine-warm-up', daemon=True)
+    thread.start()
+    return thread
+
 def run_cli():
     """Menjalankan chatbot dalam mode CLI dengan pendekatan yang lebih natural."""
     
     try:
-        from core.chatbot import MentalHealthChatbot
+        warm_up_thread = _warm_engine_in_background()
         
         print("="*60)
         print("MENTAL HEALTH SUPPORT CHATBOT")
@@ -28,6 +41,8 @@ def run_cli():
         if not nama:
             nama = "User"
         
+        warm_up_thread.join()
+        from core.chatbot import MentalHealthChatbot
         chatbot = MentalHealthChatbot(nama)
         
         # DITINGKATKAN: Sapaan pertama diambil langsung dari bot, bukan teks statis
@@ -86,6 +101,41 @@ def run_discord():
         print(f"Discord Bot Error: {e}")
         sys.exit(1)
 
+def run_server():
+    """Menjalankan server HTTP/WebSocket untuk klien web dan mobile."""
+    try:
+        from integrations.http_server import main as server_main
+        import asyncio
+
+        port = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        print("Starting HTTP/WebSocket Server...")
+        print("Endpoint: POST /sessions/<id>/turns, DELETE /sessions/<id>, GET /ws/<id>, GET /health\n")
+
+        asyncio.run(server_main(port=port))
+
+    except ImportError as e:
+        print(f"Import Error: {e}")
+        print("Pastikan http_server.py ada di src/integrations/")
+        sys.exit(1)
+    except ValueError:
+        print(f"Port tidak valid: {sys.argv[2]}")
+        sys.exit(1)
+
+def run_startup_profile():
+    """Mengukur waktu import per mode dan waktu sampai respons pertama."""
+    from utils.startup_profile import run_startup_profile as profile
+    profile()
+
+def run_analyze():
+    """Analitik offline dari transkrip JSONL (argumen setelah 'analyze' diteruskan)."""
+    from core.transcript_analytics import main as analytics_main
+    analytics_main(sys.argv[2:])
+
+def run_replay():
+    """Replay deterministik korpus sesi (argumen setelah 'replay' diteruskan)."""
+    from core.replay import main as replay_main
+    replay_main(sys.argv[2:])
+
 def show_help():
     """Menampilkan informasi bantuan."""
     print("="*60)
@@ -96,10 +146,17 @@ def show_help():
     print("\nMODES:")
     print("  cli      - Chat di terminal (default)")
     print("  discord  - Run as Discord bot")
+    print("  server   - Run HTTP/WebSocket server (opsional: port)")
+    print("  startup-profile - Rincian waktu import & respons pertama")
+    print("  analyze  - Analitik transkrip JSONL (lihat: analyze --help)")
+    print("  replay   - Replay korpus sesi: golden & latensi (lihat: replay --help)")
     print("  help     - Show this help")
     print("\nEXAMPLES:")
     print("  python main.py")
     print("  python main.py discord")
+    print("  python main.py server 8080")
+    print("  python main.py analyze logs/sessions --csv laporan/")
+    print("  python main.py replay run korpus.jsonl --golden golden.jsonl")
     print("="*60)
 
 def main():
@@ -111,11 +168,19 @@ def main():
                 show_help()
             elif mode == 'discord':
                 run_discord()
+            elif mode == 'server':
+                run_server()
+            elif mode == 'startup-profile':
+                run_startup_profile()
+            elif mode == 'analyze':
+                run_analyze()
+            elif mode == 'replay':
+                run_replay()
             elif mode == 'cli':
                 run_cli()
             else:
                 print(f"Mode tidak dikenal: {mode}")
-                print("Mode yang valid: cli, discord, help")
+                print("Mode yang valid: cli, discord, server, startup-profile, analyze, replay, help")
                 sys.exit(1)
         else:
             run_cli() # Default ke CLI
@@ -1,29 +1,94 @@
 # src/core/analyzer.py
 """
-Conversation Analyzer V8 - Final
+Conversation Analyzer V9 - Incremental
 Menganalisis percakapan untuk menghasilkan ringkasan yang kaya dan bermanfaat.
+Statistik tema diperbarui setiap giliran, sehingga ringkasan penutup hanya
+sebanding dengan jumlah tema, bukan panjang percakapan.
 """
 
-import re
-from typing import List, Dict
-from .knowledge_base import KnowledgeBase
+from typing import Dict, Iterable, List, Optional, Set
+from .history import ConversationHistory
+from .knowledge_base import KnowledgeBase, get_shared_knowledge_base
+from .matcher import ThemeHit
+
+class ThemeStats:
+    __slots__ = ('count', 'first_turn', 'last_turn')
+
+    def __init__(self, count: int, first_turn: int, last_turn: int):
+        self.count = count
+        self.first_turn = first_turn
+        self.last_turn = last_turn
+
+class ConversationInsights:
+    """State analisis per sesi: jumlah kemunculan tiap tema dan flag observasi."""
+    __slots__ = ('themes', 'flags')
 
-class ConversationAnalyzer:
     def __init__(self):
-        self.kb = KnowledgeBase()
+        self.themes: Dict[str, ThemeStats] = {}
+        self.flags: Set[str] = set()
+
+    def ranked_themes(self) -> List[str]:
+        """Tema dari yang paling sering muncul; seri diurutkan dari yang muncul lebih dulu."""
+        return sorted(self.themes, key=lambda t: (-self.themes[t].count, self.themes[t].first_turn))
+
+    def to_state(self) -> Dict:
+        return {
+            'themes': {theme: [s.count, s.first_turn, s.last_turn] for theme, s in self.themes.items()},
+            'flags': sorted(self.flags),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> 'ConversationInsights':
+        insights = cls()
+        for theme, (count, first_turn, last_turn) in state['themes'].items():
+            insights.themes[theme] = ThemeStats(count, first_turn, last_turn)
+        insights.flags = set(state['flags'])
+        return insights
+
+class ConversationAnalyzer:
+    def __init__(self, knowledge_base: Optional[KnowledgeBase] = None):
+        # Tidak menyimpan state per sesi, jadi satu instance bisa dipakai bersama
+        self._kb = knowledge_base
 
-    def get_conversation_summary_insights(self, conversation_history: List[Dict]) -> str:
+    @property
+    def kb(self) -> KnowledgeBase:
+        # Tanpa injeksi, selalu ikut instance bersama terbaru (mendukung hot reload)
+        return self._kb or get_shared_knowledge_base()
+
+    def observe_turn(self, insights: ConversationInsights, turn_index: int, user_input: str,
+                     hits: Optional[Iterable[ThemeHit]] = None):
+        """Memperbarui statistik tema dengan satu pesan user (hasil scan boleh dipakai ulang)."""
+        if hits is None:
+            hits = self.kb.scan_emotional_themes(user_input)
+        for hit in hits:
+            stats = insights.themes.get(hit.theme)
+            if stats is None:
+                insights.themes[hit.theme] = ThemeStats(hit.count, turn_index, turn_index)
+            else:
+                stats.count += hit.count
+                stats.last_turn = turn_index
+
+    def build_insights(self, conversation_history: ConversationHistory) -> ConversationInsights:
+        """Membangun insights dari riwayat yang tersimpan (untuk sesi lama tanpa statistik)."""
+        insights = ConversationInsights()
+        first_index = conversation_history.total_turns - len(conversation_history) + 1
+        for turn_index, turn in enumerate(conversation_history, start=first_index):
+            # Giliran pertama adalah sapaan dan tidak ikut dianalisis
+            if turn_index > 1 and turn.user:
+                self.observe_turn(insights, turn_index, turn.user)
+        return insights
+
+    def get_conversation_summary_insights(self, conversation_history: ConversationHistory,
+                                          insights: Optional[ConversationInsights] = None) -> str:
         if not conversation_history:
             return "Tidak ada percakapan untuk direfleksikan."
 
-        # Hapus sapaan awal agar tidak mengganggu analisis tema
-        user_inputs = [h.get('user', '').lower() for h in conversation_history[1:] if h.get('user')]
-        full_text = ' '.join(user_inputs)
-        
-        themes = self.kb.detect_emotional_themes(full_text)
-        
+        if insights is None:
+            insights = self.build_insights(conversation_history)
+        themes = insights.ranked_themes()
+
         summary = "**Refleksi dari Percakapan Kita**\n\n"
-        
+
         if themes:
             theme_list = [t.replace('_', ' ') for t in themes]
             summary += f"Fokus utama kita adalah seputar perasaan **{', '.join(theme_list)}**. Tampaknya ini adalah area yang paling membebani pikiranmu saat ini.\n\n"
@@ -31,18 +96,20 @@ class ConversationAnalyzer:
             summary += "Kita telah membahas banyak hal penting dalam percakapan ini.\n\n"
 
         summary += "**Beberapa Observasi Penting:**\n"
-        if len(conversation_history) > 5:
+        if conversation_history.total_turns > 5:
             summary += "- Kamu menunjukkan kemauan yang besar untuk berefleksi dan memahami perasaanmu lebih dalam. Itu adalah kekuatan yang luar biasa.\n"
-        
+        if themes and insights.themes[themes[0]].count > 1:
+            summary += f"- Perasaan **{themes[0].replace('_', ' ')}** muncul berulang kali ({insights.themes[themes[0]].count} kali) selama kita berbicara.\n"
+        if 'reflected' in insights.flags:
+            summary += "- Kamu bersedia menerima refleksi dan mempertimbangkan sudut pandang baru.\n"
+
         summary += "\n**Saran untuk Refleksi Lanjutan:**\n"
         if themes:
-            unique_themes = set(themes)
-            for theme in unique_themes:
+            for theme in themes:
                 suggestion = self.kb.get_contextual_suggestion(theme)
                 if suggestion:
                     summary += f"- **Terkait {theme.replace('_', ' ')}:** Ingatlah refleksi kita bahwa {suggestion[0].lower()}{suggestion[1:]}\n"
-        
+
         summary += "- Teruslah berlatih mengenali dan menerima perasaan yang muncul, tanpa menghakiminya. Setiap emosi membawa pesan yang berharga.\n"
-        
-        return summary
 
+        return summary
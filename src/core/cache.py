@@ -0,0 +1,115 @@
+# src/core/cache.py
+"""
+Detection Cache - Memoisasi Input yang Dinormalisasi
+Pesan pendek yang sama ("halo", "capek", "ga tau") datang berulang kali.
+Hasil deteksi tema dan aturan fallback disimpan dalam LRU terbatas dengan
+kunci input yang sudah dinormalisasi. Kunci tema juga memuat versi knowledge
+base, sehingga hasil dari konten lama tidak pernah terbaca setelah reload.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from .knowledge_base import KnowledgeBase
+from .matcher import ThemeHit
+from .normalizer import normalize_text
+from .patterns import PatternRule, match_pattern_rule
+
+_MISSING = object()
+
+def normalize_input(text: str) -> str:
+    """Bentuk normal pesan (lihat normalizer), sehingga 'Capeeek ' dan 'capek' berbagi satu entri."""
+    return normalize_text(text)
+
+class LRUCache:
+    """LRU thread-safe dengan batas jumlah entri dan penghitung hit/miss."""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._data: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+class DetectionCache:
+    """
+    Lapisan antara chatbot dan detektor (automaton tema & dispatcher pola).
+    Hanya input pendek yang disimpan (max_key_length), karena pesan panjang
+    hampir selalu unik dan hanya akan mendorong keluar entri yang berguna.
+    """
+
+    def __init__(self, max_entries: int = 4096, max_key_length: int = 160):
+        self.max_key_length = max_key_length
+        self.themes = LRUCache(max_entries)
+        self.rules = LRUCache(max_entries)
+
+    def _cached(self, cache: LRUCache, key: str, compute: Callable[[], Any], scope: Hashable = None) -> Any:
+        if len(key) > self.max_key_length:
+            return compute()
+        entry = (scope, key) if scope is not None else key
+        value = cache.get(entry, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            cache.put(entry, value)
+        return value
+
+    def scan_themes(self, knowledge_base: KnowledgeBase, user_input: str,
+                    key: Optional[str] = None) -> Tuple[ThemeHit, ...]:
+        """`key` boleh diisi jika pemanggil sudah menormalisasi pesannya."""
+        key = key if key is not None else normalize_input(user_input)
+        # Entri KB lama tidak dihapus saat reload; tidak pernah cocok lagi dan tergeser LRU
+        return self._cached(self.themes, key, lambda: tuple(knowledge_base.scan_emotional_themes(user_input, key)),
+                            knowledge_base.cache_token)
+
+    def match_rule(self, user_input: str, key: Optional[str] = None) -> Optional[PatternRule]:
+        key = key if key is not None else normalize_input(user_input)
+        return self._cached(self.rules, key, lambda: match_pattern_rule(user_input, key))
+
+    def clear(self):
+        self.themes.clear()
+        self.rules.clear()
+
+    def stats(self) -> dict:
+        return {'themes': self.themes.stats(), 'rules': self.rules.stats()}
+
+_detection_cache = DetectionCache()
+
+def get_detection_cache() -> DetectionCache:
+    return _detection_cache
@@ -5,14 +5,23 @@ Versi final dengan perbaikan logika untuk memastikan prioritas respons yang bena
 dan transisi state percakapan yang andal, berdasarkan hasil unit test.
 """
 
+import os
 import random
-from typing import List, Dict, Optional, Set
-from datetime import datetime
+import time
+from typing import List, Dict, Optional, Sequence, Set, Tuple
 from enum import Enum, auto
 
-from .knowledge_base import KnowledgeBase
-from .analyzer import ConversationAnalyzer
-from .patterns import get_pattern_response
+from .knowledge_base import KnowledgeBase, get_shared_knowledge_base
+from .analyzer import ConversationAnalyzer, ConversationInsights
+from .history import RESPONSES, ConversationHistory
+from .matcher import ThemeHit
+from .cache import DetectionCache, get_detection_cache
+from .patterns import choose_pattern_response
+from .flow import CompiledFlow, Goto, HandlerResult, Reply, TurnInput, compile_flow
+from .normalizer import normalize_text
+from .reflections import reflect_statement
+from .metrics import (ENGINE_DISPATCH_SECONDS, ENGINE_OPERATION_SECONDS, ENGINE_TURNS,
+                      REGISTRY as _metrics, STAGE_TRANSITIONS)
 
 class ConversationStage(Enum):
     GREETING = auto()
@@ -21,59 +30,188 @@ class ConversationStage(Enum):
     POST_REFLECTION = auto()
     CLOSING = auto()
 
+_shared_analyzer = ConversationAnalyzer()
+_dispatch_timers = {stage: ENGINE_DISPATCH_SECONDS.labels(stage.name.lower()) for stage in ConversationStage}
+
+# Kata yang mengakhiri sesi dan frasa yang menandakan user sudah selesai dengan topiknya
+CLOSING_KEYWORDS = ('stop', 'quit', 'exit', 'bye', 'keluar', 'selesai', 'ringkasan')
+END_PHRASES = ('sudah, itu saja', 'cukup', 'itu aja', 'ga ada lagi', 'tidak ada', 'entahlah', 'ga tau', 'tidak bisa', 'lumayan')
+# Jumlah giliran pada satu topik sebelum refleksi ditawarkan
+SUGGESTION_THRESHOLD = 3
+
+# Respons tetap yang tidak bergantung pada nama atau isi sesi
+NO_TOPIC_RESPONSE = "Tentu, aku mengerti. Ada hal lain yang ingin kamu ceritakan?"
+POST_REFLECTION_RESPONSE = ("Baik, aku mengerti. Kita bisa membahas topik lain jika kamu mau. "
+                            "Atau, jika kamu merasa sesi ini sudah cukup, aku bisa membantumu merangkum semua yang telah kita bicarakan. "
+                            "Cukup katakan **'stop'** atau **'ringkasan'** untuk melihatnya.")
+RESPONSES.register((NO_TOPIC_RESPONSE, POST_REFLECTION_RESPONSE))
+
+# Alur percakapan sebagai data; dikompilasi menjadi MentalHealthChatbot.FLOW di akhir modul.
+# Stage baru cukup ditambahkan ke ConversationStage, ke 'stages' (dengan handler dan
+# rute keluarnya), dan bila perlu ke 'triggers' - dispatch per giliran tetap dua lookup dict.
+# Semua transisi ada di sini; handler hanya memilih nama rute (lihat flow.Reply/Goto).
+CONVERSATION_FLOW = {
+    'initial': 'GREETING',
+    'thresholds': {'suggestion': SUGGESTION_THRESHOLD},
+    'triggers': {
+        # Pesan yang persis berupa kata penutup langsung menutup sesi dari stage mana pun
+        'closing': {'phrases': CLOSING_KEYWORDS, 'stages': '*', 'target': 'CLOSING'},
+        # User selesai dengan topiknya; handler eksplorasi memilih rute 'reflect' atau 'move_on'
+        'end_topic': {'phrases': END_PHRASES, 'stages': ['EXPLORATION']},
+    },
+    'stages': {
+        'GREETING': {'handler': '_handle_greeting', 'scan': False, 'next': 'EXPLORATION'},
+        'EXPLORATION': {'handler': '_get_exploration_response',
+                        'routes': {'reflect': 'REFLECTION', 'move_on': 'POST_REFLECTION'}},
+        'REFLECTION': {'handler': '_get_reflection_response', 'next': 'POST_REFLECTION',
+                       'routes': {'no_topic': 'EXPLORATION'}},
+        'POST_REFLECTION': {'handler': '_handle_post_reflection', 'next': 'EXPLORATION'},
+        'CLOSING': {'handler': '_handle_closing'},
+    },
+}
+
 class MentalHealthChatbot:
-    def __init__(self, user_name: str = "User"):
+    FLOW: CompiledFlow
+
+    def __init__(self, user_name: str = "User",
+                 knowledge_base: Optional[KnowledgeBase] = None,
+                 analyzer: Optional[ConversationAnalyzer] = None,
+                 max_history: Optional[int] = None,
+                 detection_cache: Optional[DetectionCache] = None,
+                 rng: Optional[random.Random] = None):
         self.user_name = user_name
-        self.conversation_history: List[Dict] = []
+        if max_history is None:
+            max_history = int(os.getenv('MAX_CONVERSATION_LENGTH', '100'))
+        self.conversation_history = ConversationHistory(max_history)
+        self.insights = ConversationInsights()
         
-        self.knowledge_base = KnowledgeBase()
-        self.analyzer = ConversationAnalyzer()
+        # Konten statis dibagi per proses; hanya state di bawah ini yang milik sesi
+        self._knowledge_base = knowledge_base
+        if analyzer is None:
+            analyzer = ConversationAnalyzer(knowledge_base) if knowledge_base else _shared_analyzer
+        self.analyzer = analyzer
+        self._detection_cache = detection_cache
+        # RNG milik sesi (mis. random.Random(seed) untuk replay); None = RNG global
+        self.rng = rng
         
         # State Management
-        self.stage = ConversationStage.GREETING
+        self.stage = self.FLOW.initial
         self.last_topic: Optional[str] = None
         self.questions_asked: Set[str] = set()
         self.validated_topics: Set[str] = set()
         self.reflected_topics: Set[str] = set()
         
         self.topic_exploration_count = 0
-        self.SUGGESTION_THRESHOLD = 3 
+        self.SUGGESTION_THRESHOLD = self.FLOW.thresholds['suggestion']
+
+    STATE_VERSION = 3
+
+    def to_state(self) -> Dict:
+        """State sesi dalam bentuk ringkas (hanya tipe JSON) untuk disimpan ke session store."""
+        return {
+            'v': self.STATE_VERSION,
+            'name': self.user_name,
+            'stage': self.stage.name,
+            'topic': self.last_topic,
+            'count': self.topic_exploration_count,
+            'asked': sorted(self.questions_asked),
+            'validated': sorted(self.validated_topics),
+            'reflected': sorted(self.reflected_topics),
+            'turns': self.conversation_history.total_turns,
+            'history': [[turn.timestamp, turn.user, turn.bot_response] for turn in self.conversation_history],
+            'insights': self.insights.to_state(),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> 'MentalHealthChatbot':
+        """Kebalikan dari `to_state`; sesi dipulihkan dengan konten bersama yang sedang aktif."""
+        if state.get('v') not in (1, 2, cls.STATE_VERSION):
+            raise ValueError(f"Versi state sesi tidak didukung: {state.get('v')}")
+        chatbot = cls(state['name'])
+        chatbot.stage = ConversationStage[state['stage']]
+        chatbot.last_topic = state['topic']
+        chatbot.topic_exploration_count = state['count']
+        chatbot.questions_asked = set(state['asked'])
+        chatbot.validated_topics = set(state['validated'])
+        chatbot.reflected_topics = set(state['reflected'])
+        history = chatbot.conversation_history
+        for timestamp, user_input, bot_response in state['history']:
+            history.append(user_input, timestamp, bot_response)
+        # Versi 1 belum menyimpan total giliran; riwayatnya dulu tidak pernah dipotong
+        history.total_turns = state.get('turns', len(state['history']))
+        if 'insights' in state:
+            chatbot.insights = ConversationInsights.from_state(state['insights'])
+        else:
+            chatbot.insights = chatbot.analyzer.build_insights(history)
+        return chatbot
+
+    @property
+    def knowledge_base(self) -> KnowledgeBase:
+        # Dibaca ulang setiap kali agar reload_shared_knowledge_base berlaku tanpa memutus sesi
+        return self._knowledge_base or get_shared_knowledge_base()
+
+    @property
+    def detection_cache(self) -> DetectionCache:
+        # Memoisasi deteksi untuk input pendek yang berulang, dibagi antar sesi (tidak ikut di-pickle)
+        return self._detection_cache or get_detection_cache()
 
-    def get_response(self, user_input: str) -> str:
-        self.conversation_history.append({'user': user_input, 'timestamp': datetime.now()})
+    def get_response(self, user_input: str, theme_hits: Optional[List[ThemeHit]] = None,
+                     key: Optional[str] = None) -> str:
+        """
+        Memproses satu giliran. `theme_hits` (hasil scan_emotional_themes) dan `key`
+        (bentuk normal pesan) boleh diisi jika deteksi tema sudah dilakukan di luar,
+        misalnya oleh get_batch_responses.
+        """
+        if not _metrics.enabled:
+            return self._respond(user_input, theme_hits, key)
+        stage = self.stage
+        start = time.perf_counter()
+        response = self._respond(user_input, theme_hits, key)
+        _dispatch_timers[stage].observe(time.perf_counter() - start)
+        ENGINE_TURNS.inc()
+        if self.stage is not stage:
+            STAGE_TRANSITIONS.labels(stage.name.lower(), self.stage.name.lower()).inc()
+        return response
+
+    def _respond(self, user_input: str, theme_hits: Optional[List[ThemeHit]] = None,
+                 key: Optional[str] = None) -> str:
+        turn = self.conversation_history.append(user_input)
         
-        if user_input.lower().strip() in ['stop', 'quit', 'exit', 'bye', 'keluar', 'selesai', 'ringkasan']:
-            self.stage = ConversationStage.CLOSING
+        # Dinormalisasi sekali; pemicu alur, cache deteksi, dan automaton memakai kunci yang sama
+        if key is None:
+            key = normalize_text(user_input)
+        stage = self.stage
+        node = self.FLOW.nodes[stage]
+        trigger = node.triggers.get(key)
+        themes = None
+        if trigger and trigger.target:
+            stage = trigger.target
+        elif node.scan:
+            # Satu kali scan per giliran, dipakai untuk eksplorasi dan statistik ringkasan
+            if theme_hits is None:
+                theme_hits = self._detect_themes(user_input, key)
+            self.analyzer.observe_turn(self.insights, self.conversation_history.total_turns, user_input, theme_hits)
+            themes = tuple(hit.theme for hit in theme_hits)
         
-        response = ""
-        if self.stage == ConversationStage.GREETING:
-            response = self._handle_greeting()
-            self.stage = ConversationStage.EXPLORATION
-        elif self.stage == ConversationStage.EXPLORATION:
-            response = self._get_exploration_response(user_input)
-        elif self.stage == ConversationStage.REFLECTION:
-            response = self._get_reflection_response()
-        elif self.stage == ConversationStage.POST_REFLECTION:
-            response = self._handle_post_reflection(user_input)
-        elif self.stage == ConversationStage.CLOSING:
-            response = self._handle_closing()
-
-        self.conversation_history[-1]['bot_response'] = response
+        response, self.stage = self.FLOW.run(self, stage, TurnInput(user_input, key, themes, trigger and trigger.name))
+
+        turn.bot_response = response
         return response
 
-    def _get_exploration_response(self, user_input: str) -> str:
+    @_metrics.timed(ENGINE_OPERATION_SECONDS, 'detect_themes')
+    def _detect_themes(self, user_input: str, key: Optional[str] = None) -> Tuple[ThemeHit, ...]:
+        return self.detection_cache.scan_themes(self.knowledge_base, user_input, key)
+
+    def _get_exploration_response(self, message: TurnInput) -> HandlerResult:
         """Logika inti V9: Memperbaiki alur deteksi dan transisi state."""
         
-        end_phrases = ['sudah, itu saja', 'cukup', 'itu aja', 'ga ada lagi', 'tidak ada', 'entahlah', 'ga tau', 'tidak bisa', 'lumayan']
-        if user_input.lower().strip() in end_phrases and self.last_topic:
-            if self.last_topic not in self.reflected_topics:
-                self.stage = ConversationStage.REFLECTION
-                return self._get_reflection_response()
-            else:
-                self.stage = ConversationStage.POST_REFLECTION
-                return self._handle_post_reflection(user_input)
+        if message.trigger == 'end_topic' and self.last_topic:
+            return Goto('move_on' if self.last_topic in self.reflected_topics else 'reflect')
 
-        themes = self.knowledge_base.detect_emotional_themes(user_input)
+        user_input = message.text
+        themes = message.themes
+        if themes is None:
+            themes = self.knowledge_base.detect_emotional_themes(user_input, message.key)
         
         # PERBAIKAN LOGIKA FINAL: Konteks topik dibuat lebih "lengket" dan cerdas.
         current_theme = themes[0] if themes else self.last_topic
@@ -89,8 +227,7 @@ class MentalHealthChatbot:
         # Memicu refleksi jika threshold tercapai
         if self.last_topic and self.topic_exploration_count >= self.SUGGESTION_THRESHOLD:
             if self.last_topic not in self.reflected_topics:
-                self.stage = ConversationStage.REFLECTION
-                return self._get_reflection_response()
+                return Goto('reflect')
 
         # Alur utama: Validasi lalu bertanya
         if self.last_topic:
@@ -99,48 +236,90 @@ class MentalHealthChatbot:
                 validation = self.knowledge_base.get_emotional_validation(self.last_topic) + " "
                 self.validated_topics.add(self.last_topic)
 
-            deep_inquiry = self.knowledge_base.get_deep_inquiry(self.last_topic, self.questions_asked)
+            deep_inquiry = self.knowledge_base.get_deep_inquiry(self.last_topic, self.questions_asked, self.rng)
             if deep_inquiry:
                 self.questions_asked.add(deep_inquiry)
-                return f"{validation}{deep_inquiry}"
+                return f"{self._echo_statement(message)}{validation}{deep_inquiry}"
 
         # Fallback HANYA jika semua logika di atas gagal
-        return get_pattern_response(user_input)
+        rule = self.detection_cache.match_rule(user_input, message.key)
+        return self._echo_statement(message) + choose_pattern_response(
+            rule, {'recent_responses': self._recent_bot_responses()}, self.rng)
+
+    def _echo_statement(self, message: TurnInput) -> str:
+        """Menggemakan pernyataan "aku merasa ..." dengan sudut pandang dibalik, atau string kosong."""
+        statement = reflect_statement(message.key)
+        return f"Jadi, {statement}. " if statement else ""
             
-    def _get_reflection_response(self) -> str:
+    def _recent_bot_responses(self, limit: int = 3) -> List[str]:
+        """Respons bot dari beberapa giliran terakhir (giliran saat ini belum punya respons)."""
+        return self.conversation_history.recent_responses(limit)
+
+    @_metrics.timed(ENGINE_OPERATION_SECONDS, 'reflection')
+    def _get_reflection_response(self, message: Optional[TurnInput] = None) -> HandlerResult:
         if not self.last_topic:
-            self.stage = ConversationStage.EXPLORATION
-            return "Tentu, aku mengerti. Ada hal lain yang ingin kamu ceritakan?"
+            return Reply(NO_TOPIC_RESPONSE, 'no_topic')
         
         suggestion = self.knowledge_base.get_contextual_suggestion(self.last_topic)
         self.reflected_topics.add(self.last_topic)
-        self.stage = ConversationStage.POST_REFLECTION
+        self.insights.flags.add('reflected')
         
         return (f"Terima kasih sudah berbagi begitu dalam tentang {self.last_topic.replace('_', ' ')}. Aku bisa melihat betapa ini memengaruhimu.\n\n"
                 f"**Sebuah Refleksi:** {suggestion}\n\n"
                 "Ini bukan solusi instan, tapi semoga bisa memberikan sudut pandang baru. Bagaimana menurutmu?")
 
-    def _handle_post_reflection(self, user_input: str) -> str:
-        self.stage = ConversationStage.EXPLORATION
+    def _handle_post_reflection(self, message: Optional[TurnInput] = None) -> str:
         self._reset_topic_state()
         
-        return ("Baik, aku mengerti. Kita bisa membahas topik lain jika kamu mau. "
-                "Atau, jika kamu merasa sesi ini sudah cukup, aku bisa membantumu merangkum semua yang telah kita bicarakan. "
-                "Cukup katakan **'stop'** atau **'ringkasan'** untuk melihatnya.")
+        return POST_REFLECTION_RESPONSE
     
     def _reset_topic_state(self, new_topic: Optional[str] = None):
         self.last_topic = new_topic
         self.topic_exploration_count = 0
 
-    def _handle_greeting(self) -> str:
+    def _handle_greeting(self, message: Optional[TurnInput] = None) -> str:
         return (f"Halo {self.user_name}! Senang bisa ngobrol denganmu. Aku di sini untuk mendengarkan tanpa menghakimi. "
                 "Silakan ceritakan apa yang sedang kamu rasakan atau pikirkan saat ini.")
 
-    def _handle_closing(self) -> str:
-        summary = self.analyzer.get_conversation_summary_insights(self.conversation_history)
-        motivation = self.knowledge_base.get_motivational_quote()
+    @_metrics.timed(ENGINE_OPERATION_SECONDS, 'closing')
+    def _handle_closing(self, message: Optional[TurnInput] = None) -> str:
+        summary = self.analyzer.get_conversation_summary_insights(self.conversation_history, self.insights)
+        motivation = self.knowledge_base.get_motivational_quote(self.rng)
         return (f"Tentu. Terima kasih banyak sudah meluangkan waktu untuk berbagi dan berefleksi, {self.user_name}.\n\n"
                 f"{summary}\n\n"
                 f"Sebagai penutup, ingatlah ini: **\"{motivation}\"**\n\n"
                 "Jaga diri baik-baik, ya. Kamu tidak sendirian. 💙")
 
+MentalHealthChatbot.FLOW = compile_flow(CONVERSATION_FLOW, ConversationStage, MentalHealthChatbot, normalize_text)
+
+def get_batch_responses(turns: Sequence[Tuple[MentalHealthChatbot, str]]) -> List[str]:
+    """
+    Memproses banyak pasangan (sesi, pesan) sekaligus, misalnya satu burst dari gateway.
+    Pesan dinormalisasi sekali, lalu deteksi tema dijalankan sekali per pesan unik
+    per knowledge base (pesan identik berbagi hasil); transisi stage tetap
+    diterapkan per sesi sesuai urutan pesan di batch.
+    """
+    hits_per_turn: List[Optional[List[ThemeHit]]] = [None] * len(turns)
+    # Dinormalisasi sekali untuk scan batch dan giliran masing-masing sesi
+    keys = [normalize_text(user_input) for _, user_input in turns]
+    groups: Dict[int, List[int]] = {}
+    for i, (chatbot, _) in enumerate(turns):
+        groups.setdefault(id(chatbot.knowledge_base), []).append(i)
+    for indices in groups.values():
+        knowledge_base = turns[indices[0]][0].knowledge_base
+        scanned = knowledge_base.scan_emotional_themes_batch([turns[i][1] for i in indices],
+                                                             [keys[i] for i in indices])
+        for i, hits in zip(indices, scanned):
+            hits_per_turn[i] = hits
+
+    return [chatbot.get_response(user_input, hits, key)
+            for (chatbot, user_input), hits, key in zip(turns, hits_per_turn, keys)]
+
+def warm_up() -> KnowledgeBase:
+    """
+    Memuat semua yang dibutuhkan giliran pertama (knowledge pack, automaton tema)
+    lebih awal, agar respons pertama tidak menanggung biaya startup.
+    """
+    knowledge_base = get_shared_knowledge_base()
+    get_detection_cache()
+    return knowledge_base
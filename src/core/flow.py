@@ -0,0 +1,132 @@
+# src/core/flow.py
+"""
+Conversation Flow - Tabel Transisi dari Spesifikasi Deklaratif
+Alur percakapan ditulis sebagai data (stage, himpunan frasa pemicu, ambang,
+nama handler, dan rute keluar setiap stage), lalu dikompilasi sekali saat modul
+dimuat menjadi tabel per stage. Setiap giliran cukup satu lookup stage dan satu
+lookup dict untuk frasa pemicu, berapa pun jumlah stage dan frasanya.
+
+Handler tidak pernah mengubah stage atau memanggil handler lain. Ia mengembalikan
+teks (stage berikutnya = 'next'), Reply(teks, rute), atau Goto(rute) untuk
+menyerahkan giliran ke handler stage tujuan; rute di-resolve lewat tabel 'routes'.
+"""
+
+from enum import Enum
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional, Tuple, Type, Union
+
+ALL_STAGES = '*'
+
+class TurnInput(NamedTuple):
+    """Satu giliran seperti yang diterima handler stage."""
+    text: str
+    key: str                       # bentuk normal text, kunci pencocokan frasa
+    themes: Optional[Tuple[str, ...]]
+    trigger: Optional[str]         # nama pemicu yang cocok di stage ini, jika ada
+
+class Reply(NamedTuple):
+    """Hasil handler: balas `text`, lalu pindah ke tujuan `route` alih-alih 'next'."""
+    text: str
+    route: str
+
+class Goto(NamedTuple):
+    """Hasil handler: pindah ke tujuan `route` dan jalankan handler-nya di giliran ini."""
+    route: str
+
+HandlerResult = Union[str, Reply, Goto]
+
+class Trigger(NamedTuple):
+    name: str
+    target: Optional[Enum]         # None = pemicu hanya ditandai; handler memilih rutenya
+
+class StageNode(NamedTuple):
+    handler: Callable[[Any, TurnInput], HandlerResult]
+    scan: bool                     # deteksi tema dijalankan sebelum handler
+    next: Optional[Enum]           # stage setelah handler (None = tetap di stage ini)
+    triggers: Dict[str, Trigger]   # frasa -> pemicu yang berlaku di stage ini
+    routes: Dict[str, Enum]        # nama rute -> stage, untuk Reply dan Goto
+
+class CompiledFlow:
+    """
+    Hasil kompilasi spesifikasi alur. Frasa dari semua pemicu yang berlaku di satu
+    stage digabung ke satu dict; jika satu frasa ada di beberapa pemicu, pemicu
+    yang dideklarasikan lebih dulu menang.
+    """
+
+    def __init__(self, initial: Enum, nodes: Dict[Enum, StageNode], thresholds: Dict[str, int]):
+        self.initial = initial
+        self.nodes = nodes
+        self.thresholds = thresholds
+
+    def run(self, owner: Any, stage: Enum, message: TurnInput) -> Tuple[str, Enum]:
+        """
+        Menjalankan handler `stage` (dan handler tujuan Goto-nya); mengembalikan
+        respons dan stage berikutnya.
+        """
+        for _ in range(len(self.nodes)):
+            node = self.nodes[stage]
+            result = node.handler(owner, message)
+            if isinstance(result, Goto):
+                stage = node.routes[result.route]
+            elif isinstance(result, Reply):
+                return result.text, node.routes[result.route]
+            else:
+                return result, node.next or stage
+        raise RuntimeError(f"Goto berputar tanpa menghasilkan respons (terakhir di {stage.name})")
+
+def _default_key(text: str) -> str:
+    return text.lower().strip()
+
+def compile_flow(spec: Mapping[str, Any], stages: Type[Enum], owner: type,
+                 normalize: Callable[[str], str] = _default_key) -> CompiledFlow:
+    """
+    Mengompilasi spesifikasi alur:
+
+        {'initial': 'GREETING',
+         'thresholds': {'suggestion': 3},
+         'triggers': {'closing': {'phrases': [...], 'stages': '*', 'target': 'CLOSING'}, ...},
+         'stages': {'GREETING': {'handler': '_handle_greeting', 'scan': False, 'next': 'EXPLORATION'},
+                    'EXPLORATION': {'handler': '...', 'routes': {'reflect': 'REFLECTION'}}, ...}}
+
+    Nama stage di-resolve ke member `stages`, nama handler ke fungsi di kelas `owner`
+    (dipanggil sebagai handler(instance, TurnInput)). Setiap member `stages` wajib punya
+    entri, dan setiap tujuan 'next' atau 'routes' harus stage yang dikenal. Frasa pemicu
+    disimpan dalam bentuk `normalize(frasa)`, fungsi yang sama yang harus dipakai untuk
+    membentuk TurnInput.key. Kesalahan spesifikasi memunculkan ValueError saat kompilasi,
+    bukan saat giliran.
+    """
+    def resolve(name: str, where: str) -> Enum:
+        try:
+            return stages[name]
+        except KeyError:
+            raise ValueError(f"Stage tidak dikenal di {where}: {name}") from None
+
+    stage_specs = spec['stages']
+    missing = [stage.name for stage in stages if stage.name not in stage_specs]
+    if missing:
+        raise ValueError(f"Stage tanpa definisi alur: {', '.join(missing)}")
+
+    triggers: Dict[Enum, Dict[str, Trigger]] = {stage: {} for stage in stages}
+    for name, trigger_spec in spec.get('triggers', {}).items():
+        target = trigger_spec.get('target')
+        trigger = Trigger(name, resolve(target, f"pemicu {name}") if target else None)
+        scope = trigger_spec.get('stages', ALL_STAGES)
+        applies_to = list(stages) if scope == ALL_STAGES else [resolve(s, f"pemicu {name}") for s in scope]
+        for stage in applies_to:
+            table = triggers[stage]
+            for phrase in trigger_spec['phrases']:
+                table.setdefault(normalize(phrase), trigger)
+
+    nodes: Dict[Enum, StageNode] = {}
+    for name, stage_spec in stage_specs.items():
+        stage = resolve(name, "stages")
+        handler = getattr(owner, stage_spec['handler'], None)
+        if not callable(handler):
+            raise ValueError(f"Handler stage {name} tidak ditemukan: {owner.__name__}.{stage_spec['handler']}")
+        next_stage = stage_spec.get('next')
+        routes = {route: resolve(target, f"rute {route} stage {name}")
+                  for route, target in stage_spec.get('routes', {}).items()}
+        nodes[stage] = StageNode(handler, stage_spec.get('scan', True),
+                                 resolve(next_stage, f"stage {name}") if next_stage else None,
+                                 triggers[stage], routes)
+
+    return CompiledFlow(resolve(spec['initial'], "initial"), nodes, dict(spec.get('thresholds', {})))
@@ -0,0 +1,116 @@
+# src/core/history.py
+"""
+Conversation History - Riwayat Ringkas & Terbatas
+Setiap giliran disimpan sebagai record ber-__slots__ dengan timestamp epoch.
+Respons bot yang persis sama dengan template statis (tabel pola, pertanyaan
+di knowledge pack) disimpan sebagai ID ke tabel bersama; teks dinamis (sapaan
+bernama, ringkasan, gabungan validasi dan gema) disimpan apa adanya. Riwayat dibatasi panjangnya (ring buffer)
+dan menyimpan agregat bergulir agar tidak ada yang butuh giliran yang sudah dibuang.
+"""
+
+import threading
+import time
+from collections import deque
+from itertools import islice
+from typing import Deque, Iterable, Iterator, List, Optional, Union
+
+class ResponseTable:
+    """
+    Tabel template respons per proses. Hanya template yang didaftarkan (`register`)
+    yang mendapat ID; respons lain tidak pernah masuk tabel, jadi tabel tidak terisi
+    string sekali pakai. Setelah penuh, template baru juga disimpan apa adanya.
+    """
+
+    def __init__(self, max_entries: int = 20000):
+        self.max_entries = max_entries
+        self._ids = {}
+        self._strings: List[str] = []
+        self._lock = threading.Lock()
+
+    def register(self, templates: Iterable[str]):
+        """Mendaftarkan template statis (dipanggil saat tabel pola atau knowledge pack dimuat)."""
+        with self._lock:
+            for text in templates:
+                if text in self._ids or len(self._strings) >= self.max_entries:
+                    continue
+                self._ids[text] = len(self._strings)
+                self._strings.append(text)
+
+    def compact(self, text: str) -> Union[int, str]:
+        """ID template jika `text` persis sebuah template terdaftar, selain itu teksnya sendiri."""
+        response_id = self._ids.get(text)
+        return text if response_id is None else response_id
+
+    def resolve(self, response_id: Union[int, str, None]) -> Optional[str]:
+        if isinstance(response_id, int):
+            return self._strings[response_id]
+        return response_id
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+RESPONSES = ResponseTable()
+
+class Turn:
+    __slots__ = ('timestamp', 'user', 'response_id')
+
+    def __init__(self, timestamp: float, user: str, response: Optional[str] = None):
+        self.timestamp = timestamp
+        self.user = user
+        self.response_id = None if response is None else RESPONSES.compact(response)
+
+    @property
+    def bot_response(self) -> Optional[str]:
+        return RESPONSES.resolve(self.response_id)
+
+    @bot_response.setter
+    def bot_response(self, response: str):
+        self.response_id = RESPONSES.compact(response)
+
+    def __reduce__(self):
+        # ID respons hanya berlaku di proses ini; kirim teksnya saat pickle (process pool, spill)
+        return (Turn, (self.timestamp, self.user, self.bot_response))
+
+    def __repr__(self) -> str:
+        return f"Turn({self.timestamp!r}, {self.user!r}, {self.bot_response!r})"
+
+class ConversationHistory:
+    __slots__ = ('_turns', 'total_turns', 'first_timestamp', 'last_timestamp')
+
+    def __init__(self, max_turns: Optional[int] = None):
+        self._turns: Deque[Turn] = deque(maxlen=max_turns or None)
+        # Agregat bergulir: tetap benar walaupun giliran lama sudah dibuang
+        self.total_turns = 0
+        self.first_timestamp: Optional[float] = None
+        self.last_timestamp: Optional[float] = None
+
+    @property
+    def max_turns(self) -> Optional[int]:
+        return self._turns.maxlen
+
+    def append(self, user_input: str, timestamp: Optional[float] = None,
+               bot_response: Optional[str] = None) -> Turn:
+        turn = Turn(time.time() if timestamp is None else timestamp, user_input, bot_response)
+        self._turns.append(turn)
+        self.total_turns += 1
+        if self.first_timestamp is None:
+            self.first_timestamp = turn.timestamp
+        self.last_timestamp = turn.timestamp
+        return turn
+
+    def recent_responses(self, limit: int, skip_current: bool = True) -> List[str]:
+        """Respons bot dari beberapa giliran terakhir, tanpa giliran yang sedang diproses."""
+        turns = islice(reversed(self._turns), 1 if skip_current else 0, limit + (1 if skip_current else 0))
+        return [turn.bot_response for turn in turns if turn.response_id is not None][::-1]
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def __iter__(self) -> Iterator[Turn]:
+        return iter(self._turns)
+
+    def __getitem__(self, index: int) -> Turn:
+        return self._turns[index]
+
+    def __bool__(self) -> bool:
+        return self.total_turns > 0
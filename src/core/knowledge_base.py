@@ -3,252 +3,136 @@
 Knowledge Base V8 - The Relationship Expert (Final Version)
 Diperkaya secara masif dengan konten hubungan, konflik, dan self-esteem.
 Logika disempurnakan untuk mendukung alur percakapan yang natural.
+Konten dimuat dari knowledge pack dan dibagi bersama oleh semua sesi.
 """
 
 import random
-from typing import List, Dict, Optional, Set
+import threading
+from types import MappingProxyType
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Set
+
+from .history import RESPONSES
+from .knowledge_pack import KnowledgePack, load_pack
+from .matcher import KeywordMatcher, ThemeHit
+from .normalizer import get_normalizer, normalize_text
+from .metrics import ENGINE_OPERATION_SECONDS, REGISTRY as _metrics
+
+def _freeze(value: Any) -> Any:
+    """Mengubah dict/list bersarang menjadi mappingproxy/tuple yang read-only."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
 
 class KnowledgeBase:
-    def __init__(self):
-        # ... (five_secrets dan cognitive_distortions tetap sama seperti versi V8 sebelumnya) ...
-        self.five_secrets = {
-            'disarming': {
-                'name': 'Teknik Melucuti Senjata (The Disarming Technique)',
-                'description': 'menemukan butir kebenaran dalam kritik yang kamu terima, bahkan jika terasa tidak adil, untuk meredakan ketegangan.',
-                'example': 'Kamu benar, aku sadar akhir-akhir ini aku memang kurang mendengarkan. Maafkan aku.',
-                'when_to_use': 'Saat menerima kritik, keluhan, atau saat lawan bicara dalam posisi menyerang.'
-            },
-            'empathy': {
-                'name': 'Empati Pikiran dan Perasaan (Thought and Feeling Empathy)',
-                'description': 'mencoba memahami apa yang orang lain pikirkan (empati pikiran) dan rasakan (empati perasaan) secara tulus.',
-                'example': 'Kedengarannya situasi itu membuatmu sangat frustrasi dan kecewa ya. Aku bisa membayangkan betapa beratnya itu untukmu.',
-                'when_to_use': 'Saat seseorang mengekspresikan emosi yang kuat, baik positif maupun negatif.'
-            },
-            'inquiry': {
-                'name': 'Pertanyaan Mendalam (Inquiry)',
-                'description': 'mengajukan pertanyaan yang lembut dan tulus untuk membantu orang lain (dan dirimu) lebih memahami perasaan dan pikiran mereka.',
-                'example': 'Bisa ceritakan lebih banyak, bagian mana yang terasa paling berat untukmu?',
-                'when_to_use': 'Untuk mendorong seseorang berbagi lebih dalam, atau saat mereka tampak bingung dan tertutup.'
-            },
-            'i_feel': {
-                'name': 'Pernyataan "Aku Merasa" (I Feel Statements)',
-                'description': 'mengekspresikan perasaanmu sendiri secara jujur tanpa menyalahkan atau mengkritik orang lain.',
-                'example': 'Aku merasa sedikit cemas dan sedih saat kita membahas masa depan.',
-                'when_to_use': 'Saat kamu perlu mengungkapkan emosimu secara konstruktif tanpa memicu pertengkaran.'
-            },
-            'stroking': {
-                'name': 'Pujian Tulus (Stroking)',
-                'description': 'menyampaikan rasa hormat, penghargaan, dan kebaikan, bahkan di tengah perbedaan pendapat yang tajam.',
-                'example': 'Aku sangat menghargai kejujuran dan keberanianmu untuk menceritakan ini kepadaku.',
-                'when_to_use': 'Di sepanjang percakapan untuk menjaga hubungan tetap positif, terutama saat membahas topik yang sulit.'
-            }
-        }
-        self.cognitive_distortions = {
-            'all_or_nothing': {
-                'name': 'Pemikiran Hitam-Putih (All-or-Nothing Thinking)',
-                'description': 'Melihat segala sesuatu sebagai hitam atau putih, tanpa ada area abu-abu. Jika tidak sempurna, maka gagal total.',
-                'example': '"Kalau aku tidak dapat nilai A di ujian ini, aku adalah mahasiswa gagal."',
-                'reframe_question': 'Adakah kemungkinan lain di antara "sukses sempurna" dan "gagal total"? Di mana posisi pencapaianmu jika dilihat dalam skala 1 sampai 100?'
-            },
-            'overgeneralization': {
-                'name': 'Generalisasi Berlebihan (Overgeneralization)',
-                'description': 'Menganggap satu kejadian negatif sebagai pola kekalahan yang tidak akan pernah berakhir.',
-                'example': '"Aku ditolak sekali, artinya aku tidak akan pernah punya pacar."',
-                'reframe_question': 'Apakah satu pengalaman ini benar-benar bisa memprediksi seluruh masa depanmu? Bisakah kamu mengingat saat di mana hasilnya berbeda?'
-            },
-            'mental_filter': {
-                'name': 'Filter Mental (Mental Filter)',
-                'description': 'Memilih satu detail negatif dan memikirkannya terus-menerus, sehingga pandangan terhadap realitas menjadi gelap.',
-                'example': 'Dosen memuji presentasiku, tapi dia memberi satu kritik kecil. Aku tidak bisa berhenti memikirkan kritik itu, presentasiku pasti buruk sekali.',
-                'reframe_question': 'Selain detail negatif itu, apa lagi yang terjadi? Mari kita coba lihat gambaran yang lebih besar dan seimbang.'
-            },
-            'discounting_the_positive': {
-                'name': 'Mengesampingkan Hal Positif (Discounting the Positive)',
-                'description': 'Menolak pengalaman positif dengan bersikeras bahwa itu "tidak dihitung" karena suatu alasan.',
-                'example': '"Aku lulus ujian itu, tapi itu cuma keberuntungan saja, bukan karena aku pintar."',
-                'reframe_question': 'Bagaimana jika kamu mencoba menerima pujian atau pencapaian itu tanpa "tapi"? Apa peran usahamu sendiri dalam hasil positif tersebut?'
-            },
-            'jumping_to_conclusions': {
-                'name': 'Lompat ke Kesimpulan (Jumping to Conclusions)',
-                'description': 'Membuat interpretasi negatif tanpa ada fakta yang mendukung, termasuk Membaca Pikiran (Mind Reading) dan Meramal (Fortune Telling).',
-                'example': '"Dia tidak membalas pesanku, dia pasti marah padaku." (Mind Reading) atau "Aku pasti akan gugup dan mengacaukan wawancara besok." (Fortune Telling)',
-                'reframe_question': 'Apa bukti nyata yang kamu miliki untuk kesimpulan itu? Adakah penjelasan alternatif yang lebih mungkin?'
-            },
-            'magnification_minimization': {
-                'name': 'Pembesaran dan Pengecilan (Magnification and Minimization)',
-                'description': 'Membesar-besarkan kesalahan sendiri (magnification) dan mengecilkan kelebihan diri sendiri (minimization).',
-                'example': '"Aku membuat kesalahan ketik di email, ini memalukan sekali!" sambil berpikir "Prestasi yang kuraih kemarin itu bukan apa-apa."',
-                'reframe_question': 'Jika temanmu yang melakukan kesalahan ini, apakah kamu akan melihatnya sebesar ini? Bagaimana jika kamu mencoba melihat kelebihanmu sebesar caramu melihat kesalahanmu?'
-            },
-            'emotional_reasoning': {
-                'name': 'Penalaran Emosional (Emotional Reasoning)',
-                'description': 'Menganggap bahwa apa yang kamu rasakan pastilah cerminan dari kenyataan.',
-                'example': '"Aku merasa seperti pecundang, jadi aku pasti seorang pecundang."',
-                'reframe_question': 'Perasaan adalah sinyal, bukan fakta. Selain perasaan itu, apa fakta dari situasi ini? Apakah perasaan bisa berubah?'
-            },
-            'should_statements': {
-                'name': 'Pernyataan "Harusnya" (Should Statements)',
-                'description': 'Menyiksa diri sendiri atau orang lain dengan kata "harusnya", "seharusnya", "wajib". Ini menimbulkan rasa bersalah dan frustrasi.',
-                'example': '"Aku seharusnya lebih rajin belajar." atau "Dia seharusnya tidak berkata seperti itu padaku!"',
-                'reframe_question': 'Apa yang terjadi jika kata "harusnya" diganti dengan "aku berharap" atau "akan lebih baik jika"? Bagaimana itu mengubah perasaanmu?'
-            },
-            'labeling': {
-                'name': 'Melabeli (Labeling and Mislabeling)',
-                'description': 'Bentuk ekstrem dari generalisasi berlebihan. Bukannya berkata "aku membuat kesalahan", kamu melabeli diri: "aku adalah seorang yang bodoh".',
-                'example': '"Aku bodoh." "Dia orang yang jahat."',
-                'reframe_question': 'Apakah satu tindakan bisa mendefinisikan keseluruhan dirimu atau diri orang lain? Bisakah kita fokus pada perilakunya ("aku membuat kesalahan") daripada melabeli individunya?'
-            },
-            'blame': {
-                'name': 'Menyalahkan (Blame)',
-                'description': 'Menyalahkan orang lain atas masalah yang kita hadapi, atau sebaliknya, menyalahkan diri sendiri atas sesuatu yang bukan sepenuhnya salah kita.',
-                'example': '"Hubungan ini gagal karena salahnya dia!" atau "Semua ini salahku."',
-                'reframe_question': 'Dalam situasi ini, berapa persen tanggung jawabmu, tanggung jawabnya, dan tanggung jawab faktor lain? Mari kita lihat peran masing-masing pihak secara adil.'
-            }
-        }
-
-        self.theme_patterns = {
-            'masalah hubungan': ['putus', 'pacar', 'cinta', 'diputusin', 'pasangan', 'bertengkar', 'konflik', 'berantem', 'hubungan', 'dijauhi', 'diselingkuhi'],
-            'self-esteem rendah': ['jelek', 'gagal', 'bodoh', 'pecundang', 'payah', 'gak berguna', 'gak pantes', 'insecure'],
-            'stres akademik': ['kuliah', 'tugas', 'deadline', 'semester', 'nilai', 'lulus', 'skripsi', 'dosen', 'ujian', 'kampus'],
-            'kelelahan': ['lelah', 'capek', 'burnout', 'exhausted', 'kewalahan', 'ga ada energi', 'drain', 'nggak sanggup'],
-            'kecemasan': ['cemas', 'khawatir', 'anxious', 'takut', 'panik', 'overthinking', 'gugup', 'gelisah'],
-            'kesedihan': ['sedih', 'down', 'putus asa', 'hampa', 'kecewa', 'nangis', 'hancur', 'patah hati'],
-            'kebingungan': ['bingung', 'tersesat', 'confused', 'tidak tahu', 'galau', 'bimbang', 'arah'],
-            'kemarahan': ['marah', 'kesal', 'jengkel', 'frustrasi', 'benci', 'dongkol', 'muak'],
-            'kesepian': ['sendiri', 'sunyi', 'kesepian', 'tak ada teman', 'merasa sendiri'],
-            'trauma': ['trauma', 'kejadian buruk', 'masa lalu kelam', 'flashback', 'terluka'],
-            'demotivasi': ['tidak semangat', 'malas', 'tidak termotivasi', 'putus asa belajar', 'bingung tujuan'],
-            'rasa bersalah': ['bersalah', 'penyesalan', 'salahku', 'aku menyesal', 'harusnya tidak'],
-            'masalah keluarga': ['ayah', 'ibu', 'orang tua', 'adik', 'kakak', 'keluarga', 'rumah tangga'],
-            'kehilangan': ['meninggal', 'kehilangan', 'ditinggal', 'berduka', 'rindu orang tua']
-                }
-
-        self.deep_inquiries = {
-            'masalah hubungan': [
-                "Bagaimana perpisahan ini memengaruhi caramu memandang dirimu sendiri?",
-                "Apa satu hal yang paling kamu rindukan dari hubungan itu?",
-                "Dalam hubungan itu, kapan kamu merasa paling didengarkan dan kapan kamu merasa paling tidak didengarkan?",
-                "Terlepas dari apa yang terjadi, hubungan seperti apa yang sebenarnya kamu dambakan di masa depan?"
-            ],
-            'self-esteem rendah': [
-                "Sejak kapan suara kritis di kepalamu itu mulai berkata seperti itu?",
-                "Jika kamu berbicara kepada seorang teman yang merasakan hal yang sama, apa yang akan kamu katakan padanya?",
-                "Selain perasaan 'gagal' atau 'jelek' ini, bisakah kamu menyebutkan satu saja kualitas atau pencapaian yang kamu banggakan dari dirimu, sekecil apapun itu?",
-                "Perasaan ini, apakah ia terasa seperti 100% fakta, atau ada sedikit bagian dari dirimu yang meragukannya?"
-            ],
-            'kelelahan': [
-                "Selain lelah fisik, adakah kelelahan emosional yang kamu rasakan? Seperti apa rasanya?",
-                "Kelelahan ini, apakah datang tiba-tiba atau sudah menumpuk sejak lama?",
-                "Aktivitas apa yang biasanya bisa membuatmu kembali bersemangat, yang sekarang terasa tidak mempan lagi?",
-                "Jika tubuh dan pikiranmu bisa bicara, kira-kira istirahat seperti apa yang paling mereka butuhkan saat ini?",
-                "Pikiran apa yang membuatmu merasa paling terkuras energinya?"
-            ],
-            'stres akademik': [
-                 "Pikiran apa yang paling sering muncul di kepalamu saat kamu merasa tertekan karena urusan akademik?",
-                 "Bagaimana stres akademik ini memengaruhi kehidupanmu di luar kampus, misalnya hubungan dengan teman atau keluarga?",
-                 "Jika kamu bisa mengubah satu hal tentang situasimu di kuliah saat ini, apa itu dan mengapa?",
-                 "Seperti apa rasanya stres itu di tubuhmu? Di mana kamu paling merasakannya?",
-                 "Apa yang biasanya kamu lakukan untuk mengatasi stres itu? Apakah cara itu membantu?"
-            ],
-            'kesepian': [
-                "Kapan kamu merasa paling kesepian akhir-akhir ini?",
-                "Apa yang biasanya kamu lakukan ketika rasa sepi itu muncul?",
-                "Adakah momen kecil yang membuatmu merasa sedikit lebih terhubung dengan orang lain?",
-                "Jika kamu bisa meminta seseorang untuk hadir, siapa yang paling ingin kamu temui?"
-            ],
-            'trauma': [
-                "Apakah ada momen tertentu dari masa lalu yang sering muncul kembali di pikiranmu?",
-                "Bagaimana perasaan tubuhmu saat memikirkan pengalaman itu?",
-                "Apakah ada hal kecil yang membantumu merasa lebih aman ketika kenangan itu datang?",
-                "Siapa orang yang paling kamu percaya untuk berbagi tentang pengalaman ini?"
-            ],
-            'demotivasi': [
-                "Kapan terakhir kali kamu merasa benar-benar bersemangat?",
-                "Hal kecil apa yang biasanya membuatmu merasa lebih hidup?",
-                "Adakah faktor tertentu yang menurutmu menguras motivasimu belakangan ini?",
-                "Kalau besok kamu bangun dengan energi penuh, apa hal pertama yang ingin kamu lakukan?"
-            ],
-            'rasa bersalah': [
-                "Apa yang membuatmu merasa bersalah sampai sekarang?",
-                "Jika temanmu melakukan hal yang sama, apa yang akan kamu katakan padanya?",
-                "Apakah rasa bersalah ini membantumu tumbuh, atau justru menahanmu?",
-                "Apa langkah kecil yang bisa kamu lakukan untuk memperbaiki situasi ini?"
-            ],
-            'masalah keluarga': [
-                "Bagaimana hubunganmu dengan anggota keluargamu belakangan ini?",
-                "Apa momen yang paling membuatmu merasa didukung oleh keluargamu?",
-                "Kalau bisa menyampaikan satu hal kepada keluargamu tanpa takut disalahpahami, apa itu?",
-                "Apa harapanmu tentang hubungan keluargamu di masa depan?"
-            ],
-            'kehilangan': [
-                "Apa kenangan terindahmu bersama orang yang kamu rindukan?",
-                "Bagaimana perubahan hidupmu setelah kehilangan itu?",
-                "Apakah ada cara khusus yang kamu lakukan untuk mengenang orang tersebut?",
-                "Kalau kamu bisa bicara sekali lagi dengannya, apa yang ingin kamu katakan?"
-            ]
-        }
-        
-        # PERBAIKAN: Memastikan list ini tidak kosong
-        self.motivational_quotes = [
-            "Perubahan sejati datang dari kemauan untuk melihat diri sendiri dengan jujur dan welas asih.",
-            "Setiap langkah kecil untuk memahami perasaanmu adalah sebuah kemenangan besar.",
-            "Kamu memiliki kekuatan untuk mengubah dinamika hubunganmu, dimulai dari caramu berkomunikasi.",
-            "Keberanian bukanlah ketiadaan rasa takut, tetapi kemauan untuk menghadapinya demi hubungan yang lebih baik."
-        ]
-        
+    """Konten terapeutik statis. Immutable setelah dibuat sehingga aman dibagi antar sesi."""
+
+    def __init__(self, content: Optional[Dict[str, Any]] = None,
+                 matcher: Optional[KeywordMatcher] = None, version: str = ''):
+        # Konten berasal dari knowledge pack (src/core/data/knowledge_pack.json)
+        if content is None:
+            content, matcher, version = load_pack()
+        self.version = version
+        # Bagian kunci DetectionCache: KB dari pack yang sama berbagi entri, konten ad-hoc
+        # (tanpa versi) mendapat token unik sehingga hasilnya tidak pernah tertukar
+        self.cache_token: Hashable = version or object()
+        self.five_secrets = _freeze(content['five_secrets'])
+        self.cognitive_distortions = _freeze(content['cognitive_distortions'])
+        self.theme_patterns = _freeze(content['theme_patterns'])
+        self.deep_inquiries = _freeze(content['deep_inquiries'])
+        self.motivational_quotes = _freeze(content['motivational_quotes'])
+        self.validations = _freeze(content['validations'])
+        self.default_validation: str = content['default_validation']
+        self.suggestions = _freeze(content['suggestions'])
+        self.default_suggestion: str = content['default_suggestion']
+        self._theme_matcher = matcher or KeywordMatcher(get_normalizer().normalize_keywords(self.theme_patterns))
+        # Pertanyaan mendalam sering menjadi respons utuh (tanpa validasi/gema) dan layak diberi ID
+        RESPONSES.register(question for questions in self.deep_inquiries.values() for question in questions)
+        self._frozen = True
+
+    @classmethod
+    def from_pack(cls, pack: KnowledgePack) -> 'KnowledgeBase':
+        return cls(pack.content, pack.matcher, pack.digest)
+
+    def __setattr__(self, name: str, value: Any):
+        if getattr(self, '_frozen', False):
+            raise AttributeError(f"KnowledgeBase bersifat immutable, tidak bisa mengubah '{name}'")
+        super().__setattr__(name, value)
+
     def get_emotional_validation(self, theme: str) -> str:
         """Memberikan validasi empatik untuk tema emosional yang terdeteksi."""
-        validations = {
-            'masalah hubungan': "Putus cinta itu sangat menyakitkan dan rumit. Wajar sekali jika kamu merasa hancur. Perasaanmu sangat valid.",
-            'self-esteem rendah': "Sakit sekali rasanya ketika suara di dalam kepala kita sendiri menyerang diri kita. Terima kasih sudah berani membagikan perasaan yang sangat personal ini.",
-            'kelelahan': "Tentu saja kamu merasa lelah. Beban yang kamu pikul itu nyata, dan kelelahan adalah sinyal bahwa kamu butuh jeda.",
-            'stres akademik': "Tekanan akademik itu nyata dan sangat menguras energi. Wajar sekali jika kamu merasa stres dan terbebani.",
-            'kesepian': "Kesepian bisa terasa sangat menyakitkan, seolah tidak ada yang benar-benar memahami. Perasaanmu valid.",
-            'trauma': "Menghadapi trauma masa lalu bukan hal yang mudah. Aku menghargai keberanianmu untuk menceritakannya.",
-            'demotivasi': "Hilangnya motivasi adalah tanda tubuh dan pikiranmu sedang butuh jeda. Itu wajar dan manusiawi.",
-            'rasa bersalah': "Rasa bersalah bisa terasa sangat berat. Itu pertanda kamu punya hati nurani yang peka, bukan berarti kamu orang yang buruk.",
-            'masalah keluarga': "Konflik dalam keluarga bisa sangat kompleks dan menguras emosi. Wajar jika kamu merasa bingung atau terluka.",
-            'kehilangan': "Kehilangan orang tercinta adalah salah satu pengalaman paling berat dalam hidup. Perasaan berduka itu sangat manusiawi."
-        }
-        return validations.get(theme, f"Aku dengar kamu. Merasa {theme.replace('_', ' ')} itu pasti tidak mudah. Perasaanmu penting dan valid.")
+        validation = self.validations.get(theme)
+        if validation is None:
+            return self.default_validation.format(theme=theme.replace('_', ' '))
+        return validation
 
     def get_contextual_suggestion(self, theme: str) -> str:
         """Memberikan saran/refleksi yang relevan dengan topik."""
-        suggestions = {
-            'masalah hubungan': "Seringkali dalam konflik, kita terjebak dalam menyalahkan. Coba refleksikan: selain menyalahkan, apa satu hal kecil yang bisa kamu lakukan untuk merawat dirimu sendiri saat ini? Mungkin melakukan hobi yang sempat terlupakan, atau menghubungi teman yang bisa memberimu energi positif.",
-            'self-esteem rendah': "Pikiran negatif seringkali terasa seperti fakta, padahal sebenarnya hanya 'opini' dari otak kita. Coba identifikasi tiga kualitas positif dalam dirimu, sekecil apapun itu. Menuliskannya bisa membantu melatih otak untuk melihat sisi lain dari dirimu.",
-            'kelelahan': "Kelelahan yang menumpuk seringkali bukan hanya soal kurang tidur, tapi juga terkurasnya energi emosional. Mungkin akan membantu jika kamu menjadwalkan 'waktu istirahat tanpa rasa bersalah' selama 15-30 menit setiap hari, di mana kamu melakukan sesuatu yang kamu nikmati tanpa memikirkan kewajiban.",
-            'kesepian': "Mungkin cobalah menghubungi seseorang yang sudah lama tidak kamu ajak bicara, atau ikut komunitas kecil yang sesuai minatmu. Langkah kecil bisa membuatmu merasa lebih terhubung.",
-            'trauma': "Mungkin akan membantu jika kamu menuliskan pengalaman itu di jurnal pribadi. Menuliskan bisa menjadi cara aman untuk merangkul emosi yang sulit.",
-            'demotivasi': "Cobalah fokus pada satu tugas kecil yang bisa kamu selesaikan hari ini. Kadang momentum dibangun dari langkah kecil.",
-            'rasa bersalah': "Cobalah bedakan antara rasa bersalah yang membangun dan rasa bersalah yang menahanmu. Mana yang sedang kamu rasakan?",
-            'masalah keluarga': "Cobalah pilih waktu tenang untuk bicara dengan anggota keluargamu. Gunakan kalimat 'aku merasa...' daripada menyalahkan.",
-            'kehilangan': "Izinkan dirimu merasakan duka itu, tapi juga rayakan kenangan indah yang kamu miliki bersama orang tersebut."
-        }
-        return suggestions.get(theme, "Mengakui perasaan ini adalah langkah pertama yang sangat kuat. Teruslah bersikap baik pada dirimu sendiri.")
-
-    def detect_emotional_themes(self, text: str) -> List[str]:
-        """Mendeteksi tema emosional dari teks."""
-        themes = []
-        text_lower = text.lower()
-        # Mengurutkan berdasarkan panjang kata kunci untuk prioritas (misal: 'putus cinta' > 'cinta')
-        sorted_themes = sorted(self.theme_patterns.items(), key=lambda x: -len(x[0]))
-        for theme, keywords in sorted_themes:
-            if any(keyword in text_lower for keyword in keywords):
-                themes.append(theme)
-        return list(set(themes))
-
-    def get_deep_inquiry(self, theme: str, asked_questions: Set[str]) -> Optional[str]:
-        """Mengambil pertanyaan mendalam yang relevan dan belum ditanyakan."""
+        return self.suggestions.get(theme, self.default_suggestion)
+
+    def detect_emotional_themes(self, text: str, key: Optional[str] = None) -> List[str]:
+        """Mendeteksi tema emosional dari teks, urut dari yang paling menonjol."""
+        return [hit.theme for hit in self.scan_emotional_themes(text, key)]
+
+    @_metrics.timed(ENGINE_OPERATION_SECONDS, 'theme_scan')
+    def scan_emotional_themes(self, text: str, key: Optional[str] = None) -> List[ThemeHit]:
+        """
+        Satu lintasan automaton atas teks yang dinormalisasi: setiap tema beserta jumlah
+        dan posisi kecocokan. `key` (bentuk normal) diisi jika pemanggil sudah menormalisasi;
+        pesan panjang tidak masuk cache normalizer, jadi tanpa itu dinormalisasi ulang.
+        """
+        return self._theme_matcher.scan(normalize_text(text) if key is None else key)
+
+    def detect_emotional_themes_batch(self, texts: Sequence[str]) -> List[List[str]]:
+        """Deteksi tema untuk banyak pesan sekaligus."""
+        return [[hit.theme for hit in hits] for hits in self.scan_emotional_themes_batch(texts)]
+
+    def scan_emotional_themes_batch(self, texts: Sequence[str],
+                                    keys: Optional[Sequence[str]] = None) -> List[List[ThemeHit]]:
+        """Deteksi tema per pesan unik: pesan identik di batch hanya dipindai sekali."""
+        normalized = [normalize_text(text) for text in texts] if keys is None else keys
+        unique = list(dict.fromkeys(normalized))
+        scanned = dict(zip(unique, self._theme_matcher.scan_many(unique)))
+        return [scanned[text] for text in normalized]
+
+    @_metrics.timed(ENGINE_OPERATION_SECONDS, 'deep_inquiry')
+    def get_deep_inquiry(self, theme: str, asked_questions: Set[str],
+                         rng: Optional[random.Random] = None) -> Optional[str]:
+        """Mengambil pertanyaan mendalam yang relevan dan belum ditanyakan (`rng` milik sesi, jika ada)."""
         possible_questions = self.deep_inquiries.get(theme, [])
         unasked_questions = [q for q in possible_questions if q not in asked_questions]
         
         if not unasked_questions:
             return None # Mengembalikan None jika kehabisan pertanyaan
             
-        return random.choice(unasked_questions)
+        return (rng or random).choice(unasked_questions)
         
-    def get_motivational_quote(self) -> str:
+    def get_motivational_quote(self, rng: Optional[random.Random] = None) -> str:
         """Mengambil kutipan motivasi secara acak."""
-        return random.choice(self.motivational_quotes)
+        return (rng or random).choice(self.motivational_quotes)
+
+
+_shared_knowledge_base: Optional[KnowledgeBase] = None
+_shared_lock = threading.Lock()
+
+def get_shared_knowledge_base() -> KnowledgeBase:
+    """Mengembalikan KnowledgeBase tunggal per proses (dibuat saat pertama kali diminta)."""
+    global _shared_knowledge_base
+    if _shared_knowledge_base is None:
+        with _shared_lock:
+            if _shared_knowledge_base is None:
+                _shared_knowledge_base = KnowledgeBase()
+    return _shared_knowledge_base
+
+def reload_shared_knowledge_base(source_path: Optional[str] = None) -> KnowledgeBase:
+    """Memuat ulang knowledge pack lalu menukar instance bersama secara atomik.
 
+    Pack baru dibangun penuh sebelum ditukar, jadi jika sumbernya rusak instance
+    lama tetap dipakai. Sesi yang sedang berjalan memakai konten baru mulai giliran berikutnya.
+    """
+    global _shared_knowledge_base
+    knowledge_base = KnowledgeBase.from_pack(load_pack(source_path))
+    with _shared_lock:
+        _shared_knowledge_base = knowledge_base
+    return knowledge_base
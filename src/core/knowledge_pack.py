@@ -0,0 +1,135 @@
+# src/core/knowledge_pack.py
+"""
+Knowledge Pack - Sumber JSON & Snapshot Terkompilasi
+Konten terapeutik disimpan sebagai file JSON yang bisa diedit tanpa deploy.
+Indeks (automaton tema) dikompilasi sekali lalu diserialisasi ke snapshot
+yang dimuat dengan satu kali baca saat startup berikutnya. Snapshot hanya
+berisi tabel biasa dalam JSON, bukan pickle: membaca file yang diganti orang
+lain paling buruk memicu kompilasi ulang, tidak pernah menjalankan kode.
+
+    python -m src.core.knowledge_pack [sumber.json] [snapshot]
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from .matcher import KeywordMatcher
+from .normalizer import get_normalizer
+
+DEFAULT_PACK_PATH = os.path.join(os.path.dirname(__file__), 'data', 'knowledge_pack.json')
+SNAPSHOT_FORMAT = 3
+
+REQUIRED_KEYS = (
+    'five_secrets', 'cognitive_distortions', 'theme_patterns', 'deep_inquiries',
+    'motivational_quotes', 'validations', 'default_validation',
+    'suggestions', 'default_suggestion',
+)
+
+logger = logging.getLogger(__name__)
+
+class KnowledgePack(NamedTuple):
+    content: Dict[str, Any]
+    matcher: KeywordMatcher
+    digest: str
+
+def default_pack_path() -> str:
+    return os.getenv('KNOWLEDGE_PACK_PATH') or DEFAULT_PACK_PATH
+
+def snapshot_path_for(source_path: str) -> str:
+    """Snapshot diletakkan di samping sumbernya kecuali KNOWLEDGE_SNAPSHOT_PATH diatur."""
+    return os.getenv('KNOWLEDGE_SNAPSHOT_PATH') or os.path.splitext(source_path)[0] + '.snapshot'
+
+def _parse_source(raw: bytes, source_path: str) -> Dict[str, Any]:
+    content = json.loads(raw.decode('utf-8'))
+    missing = [key for key in REQUIRED_KEYS if key not in content]
+    if missing:
+        raise ValueError(f"Knowledge pack {source_path} tidak memiliki kunci: {', '.join(missing)}")
+    for theme, keywords in content['theme_patterns'].items():
+        if not isinstance(keywords, list) or not all(isinstance(k, str) for k in keywords):
+            raise ValueError(f"Kata kunci untuk tema '{theme}' harus berupa list string")
+    if not content['motivational_quotes']:
+        raise ValueError("motivational_quotes tidak boleh kosong")
+    return content
+
+def _read_source(source_path: str) -> Tuple[bytes, str]:
+    with open(source_path, 'rb') as f:
+        raw = f.read()
+    return raw, hashlib.sha256(raw).hexdigest()
+
+def _write_snapshot(pack: KnowledgePack, snapshot_path: str):
+    """Tulis ke file sementara lalu os.replace, sehingga pembaca tidak pernah melihat file setengah jadi."""
+    payload = {'format': SNAPSHOT_FORMAT, 'digest': pack.digest, 'normalizer': get_normalizer().fingerprint,
+               'content': pack.content, 'matcher': pack.matcher.to_tables()}
+    # tempfile hanya dibutuhkan saat kompilasi; startup biasa cukup membaca snapshot
+    import tempfile
+    data = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    directory = os.path.dirname(os.path.abspath(snapshot_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.kb-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, snapshot_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def _read_snapshot(snapshot_path: str, digest: str) -> Optional[KnowledgePack]:
+    try:
+        with open(snapshot_path, 'rb') as f:
+            payload = json.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Snapshot {snapshot_path} tidak bisa dibaca, dikompilasi ulang: {e}")
+        return None
+    if not isinstance(payload, dict) or payload.get('format') != SNAPSHOT_FORMAT or payload.get('digest') != digest:
+        return None
+    # Kata kunci di automaton sudah dinormalisasi dengan leksikon saat snapshot dibuat
+    if payload.get('normalizer') != get_normalizer().fingerprint:
+        return None
+    try:
+        content = payload['content']
+        missing = [key for key in REQUIRED_KEYS if key not in content]
+        if missing:
+            raise KeyError(', '.join(missing))
+        return KnowledgePack(content, KeywordMatcher.from_tables(payload['matcher']), digest)
+    except (KeyError, TypeError, ValueError, IndexError) as e:
+        # Snapshot terpotong atau dari versi lain: sama saja dengan tidak ada snapshot
+        logger.warning(f"Snapshot {snapshot_path} tidak lengkap, dikompilasi ulang: {e!r}")
+        return None
+
+def compile_pack(source_path: Optional[str] = None, snapshot_path: Optional[str] = None) -> KnowledgePack:
+    """Membaca sumber JSON, membangun indeks, dan menyimpan snapshot-nya."""
+    source_path = source_path or default_pack_path()
+    snapshot_path = snapshot_path or snapshot_path_for(source_path)
+    raw, digest = _read_source(source_path)
+    content = _parse_source(raw, source_path)
+    pack = KnowledgePack(content, KeywordMatcher(get_normalizer().normalize_keywords(content['theme_patterns'])), digest)
+    try:
+        _write_snapshot(pack, snapshot_path)
+    except OSError as e:
+        # Direktori read-only tidak boleh menggagalkan startup; cukup kompilasi di memori
+        logger.warning(f"Gagal menulis snapshot {snapshot_path}: {e}")
+    return pack
+
+def load_pack(source_path: Optional[str] = None, snapshot_path: Optional[str] = None) -> KnowledgePack:
+    """Memuat pack dari snapshot jika masih sesuai dengan sumbernya, selain itu kompilasi ulang."""
+    source_path = source_path or default_pack_path()
+    snapshot_path = snapshot_path or snapshot_path_for(source_path)
+    _, digest = _read_source(source_path)
+    pack = _read_snapshot(snapshot_path, digest)
+    if pack is not None:
+        return pack
+    return compile_pack(source_path, snapshot_path)
+
+if __name__ == '__main__':
+    source = sys.argv[1] if len(sys.argv) > 1 else None
+    target = sys.argv[2] if len(sys.argv) > 2 else None
+    compiled = compile_pack(source, target)
+    print(f"{len(compiled.content['theme_patterns'])} tema dikompilasi (sha256 {compiled.digest[:12]})")
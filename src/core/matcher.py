@@ -0,0 +1,126 @@
+# src/core/matcher.py
+"""
+Keyword Matcher - Automaton Aho-Corasick
+Dikompilasi sekali dari pemetaan tema -> kata kunci, lalu memindai teks dalam
+satu lintasan tanpa bergantung pada jumlah kata kunci.
+"""
+
+from collections import deque
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+
+class ThemeHit(NamedTuple):
+    """Satu tema yang ditemukan di teks beserta posisi awal setiap kecocokan."""
+    theme: str
+    count: int
+    positions: Tuple[int, ...]
+
+
+class KeywordMatcher:
+    """Automaton Aho-Corasick untuk banyak tema sekaligus.
+
+    Hasil `scan` diurutkan secara deterministik: jumlah kecocokan terbanyak,
+    lalu kemunculan paling awal, lalu urutan deklarasi tema.
+    """
+
+    def __init__(self, keyword_map: Dict[str, Sequence[str]]):
+        self.themes: Tuple[str, ...] = tuple(keyword_map)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[Tuple[int, int], ...]] = [()]
+
+        for theme_index, keywords in enumerate(keyword_map.values()):
+            for keyword in keywords:
+                self._add(keyword.lower(), theme_index)
+        self._build_fail_links()
+
+    def to_tables(self) -> Tuple:
+        """Tabel automaton sebagai tipe bawaan saja, untuk diserialisasi ke snapshot."""
+        return (self.themes, self._goto, self._fail, self._out)
+
+    @classmethod
+    def from_tables(cls, tables: Sequence) -> 'KeywordMatcher':
+        """Membangun ulang matcher dari `to_tables` (atau salinan JSON-nya) tanpa mengompilasi ulang.
+
+        Tabel yang tidak konsisten ditolak dengan ValueError/TypeError, bukan gagal saat scan.
+        """
+        themes, goto, fail, out = tables
+        matcher = cls.__new__(cls)
+        matcher.themes = tuple(str(theme) for theme in themes)
+        matcher._goto = [{str(ch): int(node) for ch, node in edges.items()} for edges in goto]
+        matcher._fail = [int(node) for node in fail]
+        # JSON mengubah tuple menjadi list; output per node dikembalikan ke tuple (theme_index, panjang)
+        matcher._out = [tuple((int(theme), int(length)) for theme, length in entries) for entries in out]
+        nodes = len(matcher._goto)
+        if not nodes or len(matcher._fail) != nodes or len(matcher._out) != nodes:
+            raise ValueError("tabel automaton tidak konsisten")
+        if any(not 0 <= node < nodes for edges in matcher._goto for node in edges.values()) \
+                or any(not 0 <= node < nodes for node in matcher._fail) \
+                or any(not 0 <= theme < len(matcher.themes) for entries in matcher._out for theme, _ in entries):
+            raise ValueError("tabel automaton merujuk node atau tema yang tidak ada")
+        return matcher
+
+    def _add(self, keyword: str, theme_index: int):
+        if not keyword:
+            return
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        entry = (theme_index, len(keyword))
+        if entry not in self._out[node]:
+            self._out[node] += (entry,)
+
+    def _build_fail_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                # Gabungkan output dari suffix terpanjang agar scan tidak perlu menelusuri fail link
+                self._out[child] += self._out[self._fail[child]]
+
+    def scan(self, text: str) -> List[ThemeHit]:
+        """Memindai teks (sudah lowercase) dan mengembalikan semua tema yang cocok."""
+        return self._rank(self._positions(text))
+
+    def scan_many(self, texts: Sequence[str]) -> List[List[ThemeHit]]:
+        """Sama dengan `scan` untuk setiap teks; tidak ada lintasan gabungan.
+
+        Setiap teks dipindai terpisah dari root, tanpa karakter pemisah, sehingga
+        pesan berisi karakter apa pun (termasuk NUL) tetap aman. Biayanya sama dengan
+        memanggil `scan` berulang; posisi relatif terhadap awal masing-masing teks.
+        """
+        return [self._rank(self._positions(text)) for text in texts]
+
+    def _positions(self, text: str) -> Dict[int, List[int]]:
+        goto, fail, out = self._goto, self._fail, self._out
+        positions: Dict[int, List[int]] = {}
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for theme_index, length in out[node]:
+                positions.setdefault(theme_index, []).append(i - length + 1)
+        return positions
+
+    def _rank(self, positions: Dict[int, List[int]]) -> List[ThemeHit]:
+        hits = []
+        for theme_index, starts in positions.items():
+            starts.sort()
+            hits.append((-len(starts), starts[0], theme_index, starts))
+        hits.sort()
+        return [ThemeHit(self.themes[idx], -neg_count, tuple(starts))
+                for neg_count, _, idx, starts in hits]
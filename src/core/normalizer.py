@@ -0,0 +1,127 @@
+# src/core/normalizer.py
+"""
+Text Normalizer - Bahasa Gaul ke Bentuk Baku
+User menulis "capeeek", "cpk bgt", "gk tau", "ga sanggup lg". Sebelum semua
+detektor (automaton tema, dispatcher pola, pemicu alur) pesan dinormalisasi
+sekali: lowercase, huruf yang dipanjangkan dipendekkan, singkatan dan varian
+negasi diganti lewat tabel leksikon, lalu spasi dirapikan. Kata kunci detektor
+dinormalisasi dengan fungsi yang sama saat dikompilasi, jadi keduanya selalu cocok.
+"""
+
+import hashlib
+import logging
+import os
+import re
+from typing import Dict, List, Mapping, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Semua varian negasi disatukan ke "tidak"
+NEGATIONS = ('nggak', 'ngga', 'nggk', 'gak', 'ga', 'gk', 'gx', 'enggak', 'engga', 'ndak', 'nda', 'tdk', 'tak')
+
+# Singkatan dan ejaan gaul yang sering muncul di chat; bisa ditambah lewat SLANG_LEXICON_PATH
+DEFAULT_LEXICON: Dict[str, str] = {
+    **{word: 'tidak' for word in NEGATIONS},
+    'gpp': 'tidak apa apa', 'gapapa': 'tidak apa apa', 'ngapa': 'kenapa', 'knp': 'kenapa',
+    'bgt': 'banget', 'bngt': 'banget', 'bener': 'benar', 'bnr': 'benar',
+    'lg': 'lagi', 'udh': 'sudah', 'udah': 'sudah', 'dah': 'sudah', 'sdh': 'sudah', 'blm': 'belum',
+    'tau': 'tahu', 'tw': 'tahu', 'yg': 'yang', 'dgn': 'dengan', 'sm': 'sama', 'krn': 'karena',
+    'karna': 'karena', 'jd': 'jadi', 'jdi': 'jadi', 'aja': 'saja', 'aj': 'saja', 'bs': 'bisa',
+    'trs': 'terus', 'tp': 'tapi', 'klo': 'kalau', 'kalo': 'kalau', 'kl': 'kalau',
+    'sy': 'saya', 'gw': 'aku', 'gue': 'aku', 'gua': 'aku', 'ak': 'aku', 'aq': 'aku',
+    'km': 'kamu', 'lu': 'kamu', 'lo': 'kamu', 'org': 'orang', 'ortu': 'orang tua',
+    'cpk': 'capek', 'cape': 'capek', 'cpe': 'capek', 'bgng': 'bingung',
+    'males': 'malas', 'mls': 'malas', 'kesel': 'kesal', 'ksl': 'kesal', 'tgs': 'tugas',
+    'pcr': 'pacar', 'skrg': 'sekarang', 'skrng': 'sekarang',
+    'ngerasa': 'merasa', 'ngrasa': 'merasa', 'pengen': 'ingin', 'pengin': 'ingin', 'pgn': 'ingin',
+    'makasi': 'makasih', 'mksh': 'makasih', 'thx': 'thanks', 'maf': 'maaf', 'mf': 'maaf',
+}
+
+_WORD = re.compile(r'[a-z0-9]+')
+# Tiga huruf sama atau lebih berturut-turut dianggap dipanjangkan ("capeeek")
+_ELONGATION = re.compile(r'([a-z])\1{2,}')
+
+class TextNormalizer:
+    """
+    Satu lintasan regex atas pesan yang sudah di-lowercase: setiap kata dipendekkan
+    dari elongasi lalu dicari di leksikon (dict). Hasil disimpan dalam cache terbatas,
+    termasuk bentuk normalnya sendiri, sehingga memanggil ulang dengan teks yang sudah
+    normal cukup satu lookup dict.
+    """
+
+    def __init__(self, lexicon: Mapping[str, str] = DEFAULT_LEXICON,
+                 max_entries: int = 8192, max_key_length: int = 160):
+        self.lexicon: Dict[str, str] = {key.lower(): value.lower() for key, value in lexicon.items()}
+        self.max_entries = max_entries
+        self.max_key_length = max_key_length
+        # Ikut disimpan di snapshot knowledge pack: leksikon lain berarti kata kunci harus dikompilasi ulang
+        self.fingerprint = hashlib.sha256(repr(sorted(self.lexicon.items())).encode('utf-8')).hexdigest()[:16]
+        self._cache: Dict[str, str] = {}
+
+    def _word(self, match) -> str:
+        word = match.group()
+        replacement = self.lexicon.get(word)
+        if replacement is not None:
+            return replacement
+        if _ELONGATION.search(word):
+            word = _ELONGATION.sub(r'\1', word)
+            return self.lexicon.get(word, word)
+        return word
+
+    def _normalize(self, text: str) -> str:
+        return ' '.join(_WORD.sub(self._word, text.lower()).split())
+
+    def normalize(self, text: str) -> str:
+        cache = self._cache
+        result = cache.get(text)
+        if result is not None:
+            return result
+        result = self._normalize(text)
+        if len(text) <= self.max_key_length:
+            # Dua entri per pesan: teks asli dan bentuk normalnya
+            while len(cache) > self.max_entries - 2:
+                # Buang entri tertua (dict menjaga urutan sisip); aman dipanggil dari banyak thread
+                try:
+                    del cache[next(iter(cache))]
+                except (KeyError, RuntimeError, StopIteration):
+                    break
+            cache[text] = result
+            cache[result] = result
+        return result
+
+    def normalize_keywords(self, keyword_map: Mapping[str, Sequence[str]]) -> Dict[str, List[str]]:
+        """Kata kunci per tema dalam bentuk normal, tanpa duplikat yang muncul setelah normalisasi."""
+        return {theme: list(dict.fromkeys(self._normalize(keyword) for keyword in keywords))
+                for theme, keywords in keyword_map.items()}
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {'entries': len(self._cache), 'max_entries': self.max_entries, 'lexicon': len(self.lexicon)}
+
+def load_lexicon(path: Optional[str] = None) -> Dict[str, str]:
+    """DEFAULT_LEXICON ditambah (atau ditimpa) entri dari file JSON {"singkatan": "bentuk baku"}."""
+    path = path or os.getenv('SLANG_LEXICON_PATH')
+    lexicon = dict(DEFAULT_LEXICON)
+    if path:
+        import json
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                extra = json.load(f)
+            if not isinstance(extra, dict) or not all(isinstance(v, str) for v in extra.values()):
+                raise ValueError("leksikon harus berupa objek JSON string -> string")
+            lexicon.update(extra)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Leksikon {path} tidak bisa dimuat, memakai bawaan: {e}")
+    return lexicon
+
+# Dibuat saat import: kata kunci automaton dan pemicu alur dikompilasi dengan leksikon ini
+_normalizer = TextNormalizer(load_lexicon())
+
+def get_normalizer() -> TextNormalizer:
+    return _normalizer
+
+def normalize_text(text: str) -> str:
+    """Bentuk normal satu pesan; dipakai sebagai kunci oleh semua detektor."""
+    return _normalizer.normalize(text)
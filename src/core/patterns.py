@@ -4,7 +4,12 @@ Simplified patterns untuk response yang lebih natural
 Fokus pada empati dan pertanyaan follow-up yang thoughtful
 """
 
+import random
 import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .history import RESPONSES
+from .normalizer import normalize_text
 
 # Simplified patterns - lebih natural, kurang robotic
 EMOTION_PATTERNS = {
@@ -89,26 +94,81 @@ EMPATHETIC_RESPONSES = [
     "Aku dengerin. Apa yang paling challenging dari situasi ini?"
 ]
 
-def get_pattern_response(user_input: str, conversation_context: dict = None) -> str:
+class PatternRule(NamedTuple):
+    name: str
+    priority: int
+    responses: Tuple[str, ...]
+
+class PatternDispatcher:
     """
-    Simple pattern matching yang menghasilkan response natural
+    Semua pola emosi dan kata kunci topik digabung menjadi satu regex.
+    Setiap aturan dibungkus named group di dalam lookahead, sehingga satu kali
+    finditer melaporkan aturan berprioritas tertinggi di setiap posisi tanpa
+    "memakan" teks milik aturan lain.
     """
-    user_input_lower = user_input.lower()
-    
-    # Check emotion patterns first
-    for emotion, data in EMOTION_PATTERNS.items():
-        for pattern in data['patterns']:
-            if re.search(pattern, user_input_lower):
-                import random
-                return random.choice(data['responses'])
-    
-    # Check topic patterns
-    for topic, data in TOPIC_RESPONSES.items():
-        for keyword in data['keywords']:
-            if keyword in user_input_lower:
-                import random
-                return random.choice(data['responses'])
-    
-    # Fallback to empathetic response
-    import random
-    return random.choice(EMPATHETIC_RESPONSES)
\ No newline at end of file
+
+    def __init__(self, emotion_patterns: Dict[str, Dict], topic_responses: Dict[str, Dict],
+                 fallback_responses: List[str]):
+        self.rules: List[PatternRule] = []
+        alternatives = []
+        # Urutan = prioritas: pola emosi dulu, lalu topik, sesuai urutan deklarasi
+        for emotion, data in emotion_patterns.items():
+            body = '|'.join(f'(?:{pattern})' for pattern in data['patterns'])
+            alternatives.append(self._add_rule(emotion, body, data['responses']))
+        for topic, data in topic_responses.items():
+            body = '|'.join(re.escape(normalize_text(keyword)) for keyword in data['keywords'])
+            alternatives.append(self._add_rule(f'topic:{topic}', body, data['responses']))
+        self._regex = re.compile('(?=' + '|'.join(alternatives) + ')')
+        self.fallback_responses: Tuple[str, ...] = tuple(fallback_responses)
+
+    def _add_rule(self, name: str, body: str, responses: List[str]) -> str:
+        priority = len(self.rules)
+        self.rules.append(PatternRule(name, priority, tuple(responses)))
+        return f'(?P<r{priority}>{body})'
+
+    def match(self, user_input: str, key: Optional[str] = None) -> Optional[PatternRule]:
+        """
+        Mengembalikan aturan pemenang (prioritas terkecil) dalam satu kali pemindaian.
+        `key` adalah bentuk normal pesan jika pemanggil sudah menormalisasinya.
+        """
+        best = None
+        for m in self._regex.finditer(normalize_text(user_input) if key is None else key):
+            priority = int(m.lastgroup[1:])
+            if best is None or priority < best:
+                best = priority
+                if best == 0:
+                    break
+        return None if best is None else self.rules[best]
+
+    def choose(self, rule: Optional[PatternRule], conversation_context: Optional[dict] = None,
+               rng: Optional[random.Random] = None) -> str:
+        """Memilih respons dari aturan (atau fallback), menghindari respons yang baru saja dipakai."""
+        pool = rule.responses if rule else self.fallback_responses
+        recent: Iterable[str] = (conversation_context or {}).get('recent_responses', ())
+        fresh = [response for response in pool if response not in recent]
+        return (rng or random).choice(fresh or pool)
+
+    def respond(self, user_input: str, conversation_context: Optional[dict] = None,
+                rng: Optional[random.Random] = None) -> str:
+        return self.choose(self.match(user_input), conversation_context, rng)
+
+_dispatcher = PatternDispatcher(EMOTION_PATTERNS, TOPIC_RESPONSES, EMPATHETIC_RESPONSES)
+RESPONSES.register(response for rule in _dispatcher.rules for response in rule.responses)
+RESPONSES.register(_dispatcher.fallback_responses)
+
+def match_pattern_rule(user_input: str, key: Optional[str] = None) -> Optional[PatternRule]:
+    return _dispatcher.match(user_input, key)
+
+def choose_pattern_response(rule: Optional[PatternRule], conversation_context: Optional[dict] = None,
+                            rng: Optional[random.Random] = None) -> str:
+    """Memilih respons untuk aturan yang sudah dicocokkan (None = fallback empatik)."""
+    return _dispatcher.choose(rule, conversation_context, rng)
+
+def get_pattern_response(user_input: str, conversation_context: dict = None,
+                         rng: Optional[random.Random] = None) -> str:
+    """
+    Simple pattern matching yang menghasilkan response natural.
+    `conversation_context['recent_responses']` berisi respons bot terakhir agar tidak diulang.
+    `rng` (random.Random) membuat pilihan respons bisa diulang; default-nya RNG global.
+    """
+    return _dispatcher.respond(user_input, conversation_context, rng)
@@ -2,30 +2,87 @@
 """
 Simplified reflection untuk natural conversation flow
 Fokus pada yang essential aja
+
+Kata ganti dibalik dalam satu lintasan regex: semua kata ganti ada dalam satu
+alternation dan penggantinya diambil dari tabel, sehingga hasil penggantian
+tidak pernah dipindai ulang (aku -> kamu tidak kembali menjadi aku).
 """
 
 import re
+from typing import Optional
 
 # Basic pronoun reflections untuk Indonesian
 BASIC_REFLECTIONS = {
-    r'\bsaya\b': 'kamu',
-    r'\baku\b': 'kamu', 
-    r'\bku\b': 'mu',
-    r'\bkamu\b': 'aku',
-    r'\bmu\b': 'ku',
-    r'\banda\b': 'saya'
+    'saya': 'kamu',
+    'aku': 'kamu',
+    'ku': 'mu',
+    'kamu': 'aku',
+    'mu': 'ku',
+    'anda': 'saya',
 }
 
+# Klitik posesif/objek yang melekat ("pacarku" -> "pacarmu")
+CLITIC_REFLECTIONS = {'ku': 'mu', 'mu': 'ku'}
+# Kata yang kebetulan berakhiran -ku/-mu tetapi bukan klitik
+NOT_CLITIC = frozenset({
+    'berlaku', 'selaku', 'mengaku', 'ngaku', 'membeku', 'tungku',
+    'bertemu', 'ketemu', 'menemu', 'bertamu', 'menjamu',
+})
+
+REFLECTION_TRIGGERS = ('saya merasa', 'aku merasa', 'saya ingin', 'aku ingin')
+# Hanya pernyataan perasaan yang digemakan; "aku ingin ..." bisa berupa niat yang tidak pantas diulang
+ECHO_TRIGGERS = ('saya merasa', 'aku merasa')
+# Klausa yang menyinggung krisis tidak pernah digemakan
+CRISIS_TERMS = (
+    'bunuh diri', 'mati', 'mengakhiri hidup', 'akhiri hidup', 'tidak ingin hidup', 'tidak mau hidup',
+    'menyakiti diri', 'melukai diri', 'lukai diri', 'self harm', 'gantung diri', 'overdosis',
+    'suicide', 'menghilang selamanya', 'tidak ada gunanya hidup',
+)
+
+_PRONOUN_RE = re.compile(
+    r'\b(?:(' + '|'.join(sorted(BASIC_REFLECTIONS, key=len, reverse=True)) + r')'
+    r'|([a-z]{3,}?)(' + '|'.join(CLITIC_REFLECTIONS) + r'))\b')
+
+def _trie_pattern(phrases) -> str:
+    """Regex dari trie frasa, sehingga prefiks bersama ("aku ", "saya ") hanya dicocokkan sekali."""
+    trie: dict = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+# Automaton pemicu: semua frasa dalam satu regex, satu kali scan berapa pun jumlah pemicunya
+_TRIGGER_RE = re.compile(_trie_pattern(REFLECTION_TRIGGERS))
+_ECHO_RE = re.compile(_trie_pattern(ECHO_TRIGGERS))
+_CRISIS_RE = re.compile(r'\b' + _trie_pattern(CRISIS_TERMS) + r'\b')
+# Refleksi hanya digemakan untuk pernyataan pendek; paragraf panjang terdengar seperti membeo
+MAX_ECHO_WORDS = 14
+_CLAUSE_END = re.compile(r'[.!?\n]|\b(?:tapi|tetapi|namun)\b')
+
+def _swap(match) -> str:
+    pronoun = match.group(1)
+    if pronoun is not None:
+        return BASIC_REFLECTIONS[pronoun]
+    word = match.group()
+    if word in NOT_CLITIC:
+        return word
+    return match.group(2) + CLITIC_REFLECTIONS[match.group(3)]
+
 def reflect_pronouns(text: str) -> str:
     """
     Simple pronoun reflection - hanya untuk kasus yang really needed
     """
-    reflected = text.lower()
-    
-    for pattern, replacement in BASIC_REFLECTIONS.items():
-        reflected = re.sub(pattern, replacement, reflected, flags=re.IGNORECASE)
-    
-    return reflected
+    return _PRONOUN_RE.sub(_swap, text.lower())
 
 def should_use_reflection(user_input: str) -> bool:
     """
@@ -33,12 +90,24 @@ def should_use_reflection(user_input: str) -> bool:
     Seringkali natural response tanpa reflection lebih baik
     """
     # Hanya gunakan reflection untuk kasus spesifik
-    reflection_triggers = [
-        'saya merasa',
-        'aku merasa', 
-        'saya ingin',
-        'aku ingin'
-    ]
-    
-    user_lower = user_input.lower()
-    return any(trigger in user_lower for trigger in reflection_triggers)
\ No newline at end of file
+    return _TRIGGER_RE.search(user_input.lower()) is not None
+
+def reflect_statement(user_input: str) -> Optional[str]:
+    """
+    Klausa "aku merasa ..." dari pesan user dengan sudut pandang dibalik
+    ("aku merasa pacarku menjauh" -> "kamu merasa pacarmu menjauh"), atau None
+    jika tidak ada pemicu, klausanya kosong, terlalu panjang, atau menyinggung krisis.
+    """
+    text = user_input.lower()
+    trigger = _ECHO_RE.search(text)
+    # Krisis dicek di seluruh pesan, bukan hanya di klausa yang akan digemakan
+    if trigger is None or _CRISIS_RE.search(text):
+        return None
+    clause = text[trigger.start():]
+    end = _CLAUSE_END.search(clause)
+    if end:
+        clause = clause[:end.start()]
+    words = clause.replace(',', ' ').split()
+    if len(words) <= 2 or len(words) > MAX_ECHO_WORDS:
+        return None
+    return reflect_pronouns(' '.join(words))
@@ -0,0 +1,276 @@
+# src/core/replay.py
+"""
+Replay Engine - Gerbang Regresi Perilaku dan Latensi
+Korpus berisi bentuk sesi nyata (urutan pesan user per sesi). Setiap sesi
+dijalankan ulang lewat MentalHealthChatbot dengan RNG per sesi yang diturunkan
+dari seed tetap, sehingga keluarannya bisa dibandingkan byte-per-byte dengan
+golden file. Latensi setiap giliran dicatat (minimum dari beberapa ulangan,
+masing-masing dengan cache deteksi dan normalizer yang dingin) dan
+dibandingkan dengan baseline.
+
+    python main.py replay build logs/sessions --output korpus.jsonl
+    python main.py replay run korpus.jsonl --golden golden.jsonl --update-golden --output baseline.json
+    python main.py replay run korpus.jsonl --golden golden.jsonl --baseline baseline.json --threshold 0.2
+"""
+
+import argparse
+import difflib
+import json
+import platform
+import random
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .cache import DetectionCache
+from .chatbot import MentalHealthChatbot, warm_up
+from .normalizer import get_normalizer
+from .transcript_analytics import iter_lines, iter_transcript_files
+
+DEFAULT_SEED = 1234
+_REDACTED_PREFIX = '<redacted len='
+
+# Statistik latensi yang dibandingkan dengan baseline (semakin kecil semakin baik)
+GATED_STATS = ('p50_us', 'p95_us')
+
+def session_rng(seed: int, session: Any) -> random.Random:
+    """RNG sesi yang sama untuk seed dan id sesi yang sama, di proses mana pun."""
+    return random.Random(f"{seed}:{session}")
+
+def build_corpus(paths: Iterable[str], name: str = "User") -> Iterator[Dict[str, Any]]:
+    """
+    Mengubah log sesi JSONL (format ChatLogger) menjadi korpus replay: satu entri per
+    sesi, dipisah oleh session_end. Sesi dengan pesan yang disamarkan dilewati karena
+    tidak bisa diputar ulang. Memori sebanding dengan sesi yang belum berakhir.
+    """
+    open_sessions: Dict[str, Dict[str, Any]] = {}
+    counts: Dict[str, int] = {}
+
+    def finish(key: str) -> Optional[Dict[str, Any]]:
+        entry = open_sessions.pop(key)
+        if entry.pop('redacted') or len(entry['inputs']) < 2:
+            return None
+        return entry
+
+    for line in iter_lines(iter_transcript_files(paths)):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(record, dict) or 'session' not in record:
+            continue
+        key = str(record['session'])
+        event = record.get('event', 'turn')
+        if event == 'session_end':
+            if key in open_sessions:
+                entry = finish(key)
+                if entry:
+                    yield entry
+            continue
+        text = record.get('user')
+        if event != 'turn' or not isinstance(text, str):
+            continue
+        entry = open_sessions.get(key)
+        if entry is None:
+            counts[key] = counts.get(key, 0) + 1
+            # Sapaan pembuka tidak tercatat di log; dibuat ulang seperti saat sesi dibuka
+            entry = open_sessions[key] = {'session': f"{key}#{counts[key]}", 'name': name,
+                                          'inputs': [f"halo, nama saya {name}"], 'redacted': False}
+        entry['redacted'] = entry['redacted'] or text.startswith(_REDACTED_PREFIX)
+        entry['inputs'].append(text)
+    for key in list(open_sessions):
+        entry = finish(key)
+        if entry:
+            yield entry
+
+def load_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def replay_session(entry: Dict[str, Any], seed: int, repeats: int = 1) -> Dict[str, Any]:
+    """
+    Menjalankan satu sesi korpus. Respons diambil dari ulangan pertama; latensi tiap
+    giliran adalah minimum dari semua ulangan (paling tahan terhadap noise).
+    Setiap ulangan memakai DetectionCache baru dan cache normalizer yang dikosongkan,
+    agar ulangan kedua dan seterusnya tetap mengukur deteksi, bukan lookup cache.
+    Ulangan yang menghasilkan respons berbeda menandakan sumber acak yang tidak terkendali.
+    """
+    normalizer = get_normalizer()
+    timer = time.perf_counter
+    responses: List[str] = []
+    stages: List[str] = []
+    latencies: List[float] = []
+    deterministic = True
+    for attempt in range(repeats):
+        normalizer.clear()
+        chatbot = MentalHealthChatbot(entry.get('name', 'User'), rng=session_rng(seed, entry['session']),
+                                      detection_cache=DetectionCache())
+        for i, text in enumerate(entry['inputs']):
+            start = timer()
+            response = chatbot.get_response(text)
+            elapsed = timer() - start
+            if attempt == 0:
+                responses.append(response)
+                stages.append(chatbot.stage.name)
+                latencies.append(elapsed)
+            else:
+                deterministic = deterministic and response == responses[i]
+                latencies[i] = min(latencies[i], elapsed)
+    return {'session': entry['session'], 'responses': responses, 'stages': stages,
+            'latencies': latencies, 'deterministic': deterministic}
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+def latency_stats(latencies: List[float]) -> Dict[str, float]:
+    return {
+        'turns': len(latencies),
+        'p50_us': percentile(latencies, 50) * 1e6,
+        'p95_us': percentile(latencies, 95) * 1e6,
+        'p99_us': percentile(latencies, 99) * 1e6,
+        'max_us': max(latencies, default=0.0) * 1e6,
+    }
+
+def diff_session(result: Dict[str, Any], golden: Optional[Dict[str, Any]], context: int = 1) -> List[str]:
+    """Perbedaan dengan golden per giliran; list kosong jika identik."""
+    if golden is None:
+        return [f"{result['session']}: tidak ada di golden"]
+    problems = []
+    expected, actual = golden['responses'], result['responses']
+    if len(expected) != len(actual):
+        problems.append(f"{result['session']}: {len(actual)} giliran, golden {len(expected)}")
+    for turn, (want, got) in enumerate(zip(expected, actual)):
+        if want != got:
+            lines = difflib.unified_diff(want.splitlines(), got.splitlines(), 'golden', 'replay',
+                                         n=context, lineterm='')
+            problems.append(f"{result['session']} giliran {turn}:\n" + '\n'.join(lines))
+    for turn, (want, got) in enumerate(zip(golden.get('stages', ()), result['stages'])):
+        if want != got:
+            problems.append(f"{result['session']} giliran {turn}: stage {got}, golden {want}")
+    return problems
+
+def compare_latency(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Regresi relatif di atas `threshold` (0.2 = 20%), keseluruhan maupun per stage."""
+    regressions = []
+    groups = [('semua', current['overall'], baseline.get('overall', {}))]
+    for stage, stats in current['by_stage'].items():
+        groups.append((stage.lower(), stats, baseline.get('by_stage', {}).get(stage, {})))
+    for name, cur, base in groups:
+        for key in GATED_STATS:
+            if not base.get(key):
+                continue
+            change = (cur[key] - base[key]) / base[key]
+            marker = "REGRESI" if change > threshold else "ok"
+            print(f"  {name + ' ' + key:<28}{base[key]:>12,.1f} -> {cur[key]:>12,.1f}  ({change:+.1%}) {marker}")
+            if change > threshold:
+                regressions.append(f"{name}:{key}")
+    return regressions
+
+def run_replay(corpus: Iterable[Dict[str, Any]], seed: int = DEFAULT_SEED, repeats: int = 3,
+               golden: Optional[Dict[str, Dict[str, Any]]] = None, golden_out=None,
+               max_diffs: int = 20) -> Dict[str, Any]:
+    """Replay seluruh korpus; golden_out (file terbuka) menerima hasil baru per sesi."""
+    warm_up()
+    latencies: List[float] = []
+    by_stage: Dict[str, List[float]] = {}
+    diffs: List[str] = []
+    sessions = nondeterministic = 0
+    for entry in corpus:
+        result = replay_session(entry, seed, repeats)
+        sessions += 1
+        nondeterministic += not result['deterministic']
+        latencies.extend(result['latencies'])
+        for stage, latency in zip(result['stages'], result['latencies']):
+            by_stage.setdefault(stage, []).append(latency)
+        if golden is not None and len(diffs) < max_diffs:
+            diffs.extend(diff_session(result, golden.get(result['session'])))
+        if golden_out is not None:
+            golden_out.write(json.dumps({'session': result['session'], 'responses': result['responses'],
+                                         'stages': result['stages']}, ensure_ascii=False) + '\n')
+    return {
+        'meta': {'python': platform.python_version(), 'seed': seed, 'repeats': repeats,
+                 'sessions': sessions, 'timestamp': time.time()},
+        'overall': latency_stats(latencies),
+        'by_stage': {stage: latency_stats(values) for stage, values in sorted(by_stage.items())},
+        'nondeterministic_sessions': nondeterministic,
+        'diffs': diffs[:max_diffs],
+    }
+
+def print_report(report: Dict[str, Any]):
+    meta, overall = report['meta'], report['overall']
+    print(f"sesi: {meta['sessions']}  giliran: {overall['turns']}  seed: {meta['seed']}  ulangan: {meta['repeats']}")
+    print(f"{'stage':<18}{'giliran':>9}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}{'max us':>10}")
+    for name, stats in [('SEMUA', overall)] + list(report['by_stage'].items()):
+        print(f"{name:<18}{stats['turns']:>9,}{stats['p50_us']:>10,.1f}{stats['p95_us']:>10,.1f}"
+              f"{stats['p99_us']:>10,.1f}{stats['max_us']:>10,.1f}")
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Replay deterministik korpus sesi untuk regresi perilaku dan latensi")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help="bangun korpus dari log sesi JSONL")
+    build.add_argument('paths', nargs='+')
+    build.add_argument('--output', required=True)
+
+    run = sub.add_parser('run', help="jalankan korpus, bandingkan dengan golden dan baseline latensi")
+    run.add_argument('corpus')
+    run.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    run.add_argument('--repeats', type=int, default=3, help="ulangan per sesi; latensi = minimum")
+    run.add_argument('--golden', help="file golden JSONL (respons dan stage per giliran)")
+    run.add_argument('--update-golden', action='store_true', help="tulis ulang golden dari hasil replay ini")
+    run.add_argument('--baseline', help="laporan JSON sebelumnya untuk perbandingan latensi")
+    run.add_argument('--threshold', type=float, default=0.2, help="ambang regresi relatif (default 0.2 = 20%%)")
+    run.add_argument('--output', help="tulis laporan JSON (bisa dipakai sebagai baseline berikutnya)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        written = 0
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for entry in build_corpus(args.paths):
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                written += 1
+        print(f"{written:,} sesi ditulis ke {args.output}")
+        return
+
+    golden = None
+    if args.golden and not args.update_golden:
+        golden = {entry['session']: entry for entry in load_jsonl(args.golden)}
+    golden_out = open(args.golden, 'w', encoding='utf-8') if args.golden and args.update_golden else None
+    try:
+        report = run_replay(load_jsonl(args.corpus), args.seed, args.repeats, golden, golden_out)
+    finally:
+        if golden_out is not None:
+            golden_out.close()
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    failed = False
+    if report['nondeterministic_sessions']:
+        print(f"\n{report['nondeterministic_sessions']} sesi tidak deterministik antar ulangan")
+        failed = True
+    if report['diffs']:
+        print(f"\nPerbedaan dengan golden ({len(report['diffs'])} pertama):")
+        for problem in report['diffs']:
+            print(problem)
+        failed = True
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\nLatensi dibanding {args.baseline} (ambang {args.threshold:.0%}):")
+        regressions = compare_latency(report, baseline, args.threshold)
+        if regressions:
+            print(f"Regresi latensi: {', '.join(regressions)}")
+            failed = True
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
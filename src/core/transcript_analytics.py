@@ -0,0 +1,402 @@
+# src/core/transcript_analytics.py
+"""
+Transcript Analytics - Agregat Offline dari Transkrip JSONL
+Membaca transkrip (format log sesi ChatLogger: satu record JSON per baris dengan
+`session`, `event`, `user`, `stage`) sebagai pipeline generator: baris -> chunk
+berukuran tetap -> deteksi tema di process pool -> agregat parsial per chunk ->
+digabung berurutan. Memori dibatasi oleh ukuran chunk, jumlah chunk yang sedang
+diproses, dan jumlah sesi yang belum berakhir; bukan oleh ukuran input.
+
+    python -m src.core.transcript_analytics logs/sessions --workers 4 --csv laporan/
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .analyzer import ConversationAnalyzer, ConversationInsights
+from .chatbot import CLOSING_KEYWORDS, SUGGESTION_THRESHOLD
+from .knowledge_base import get_shared_knowledge_base
+from .normalizer import normalize_text
+
+REFLECTION_STAGES = frozenset({'REFLECTION', 'POST_REFLECTION'})
+_CLOSING_KEYWORDS = frozenset(normalize_text(keyword) for keyword in CLOSING_KEYWORDS)
+_REDACTED_PREFIX = '<redacted len='
+
+def _ranked(counter: Counter) -> List[Tuple]:
+    """Urut jumlah menurun, seri diurutkan menurut kuncinya, agar hasil tidak bergantung pada urutan chunk."""
+    return sorted(counter.items(), key=lambda item: (-item[1], item[0]))
+
+class SessionPart:
+    """
+    Potongan satu sesi di dalam satu chunk. Cukup ringkas untuk disambung dengan
+    potongan berikutnya tanpa menyimpan pesannya: topik pertama/terakhir, panjang
+    run topik di awal dan akhir, serta stage pertama/terakhir.
+    """
+    __slots__ = ('session', 'turns', 'pre_topic_turns', 'first_topic', 'last_topic', 'lead_run',
+                 'tail_run', 'max_run', 'changed', 'first_stage', 'last_stage', 'themes',
+                 'reflected', 'closed', 'ended')
+
+    def __init__(self, session: str):
+        self.session = session
+        self.turns = 0
+        self.pre_topic_turns = 0
+        self.first_topic: Optional[str] = None
+        self.last_topic: Optional[str] = None
+        self.lead_run = self.tail_run = self.max_run = 0
+        self.changed = False
+        self.first_stage: Optional[str] = None
+        self.last_stage: Optional[str] = None
+        self.themes: Tuple[str, ...] = ()
+        self.reflected = self.closed = self.ended = False
+
+class ChunkResult:
+    """Agregat parsial satu chunk; semua counter bisa dijumlahkan langsung."""
+    __slots__ = ('records', 'malformed', 'turns', 'analyzed', 'redacted', 'theme_hits',
+                 'theme_messages', 'topic_transitions', 'stage_transitions', 'parts')
+
+    def __init__(self):
+        self.records = self.malformed = self.turns = self.analyzed = self.redacted = 0
+        self.theme_hits: Counter = Counter()
+        self.theme_messages: Counter = Counter()
+        self.topic_transitions: Counter = Counter()
+        self.stage_transitions: Counter = Counter()
+        self.parts: List[SessionPart] = []
+
+def _observe_topic(part: SessionPart, themes: List[str], result: ChunkResult):
+    # Sama seperti engine: topik "lengket", pesan tanpa tema tetap dihitung untuk topik aktif
+    current = themes[0] if themes else part.last_topic
+    if current is None:
+        part.pre_topic_turns += 1
+        return
+    if part.first_topic is None:
+        part.first_topic = current
+        part.tail_run = part.lead_run = 1
+    elif current != part.last_topic:
+        result.topic_transitions[(part.last_topic, current)] += 1
+        part.changed = True
+        part.tail_run = 1
+    else:
+        part.tail_run += 1
+        if not part.changed:
+            part.lead_run += 1
+    part.last_topic = current
+    part.max_run = max(part.max_run, part.tail_run)
+
+def analyze_chunk(lines: List[str]) -> ChunkResult:
+    """Dijalankan di worker: parsing, deteksi tema satu batch, lalu agregat per potongan sesi."""
+    knowledge_base = get_shared_knowledge_base()
+    analyzer = ConversationAnalyzer(knowledge_base)
+    result = ChunkResult()
+
+    turns = []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            result.malformed += 1
+            continue
+        if not isinstance(record, dict) or 'session' not in record:
+            result.malformed += 1
+            continue
+        result.records += 1
+        turns.append(record)
+
+    texts = [r['user'] for r in turns if isinstance(r.get('user'), str) and not r['user'].startswith(_REDACTED_PREFIX)
+             and r.get('event', 'turn') == 'turn']
+    scanned = iter(knowledge_base.scan_emotional_themes_batch(texts))
+
+    open_parts: Dict[str, SessionPart] = {}
+    insights: Dict[str, ConversationInsights] = {}
+    for record in turns:
+        session = str(record['session'])
+        part = open_parts.get(session)
+        if part is None:
+            part = open_parts[session] = SessionPart(session)
+            insights[session] = ConversationInsights()
+            result.parts.append(part)
+        event = record.get('event', 'turn')
+        if event == 'session_end':
+            part.ended = True
+            part.themes = tuple(insights.pop(session).themes)
+            del open_parts[session]
+            continue
+        if event != 'turn':
+            continue
+
+        result.turns += 1
+        part.turns += 1
+        stage = record.get('stage')
+        if isinstance(stage, str):
+            stage = stage.upper()
+            if part.first_stage is None:
+                part.first_stage = stage
+            elif stage != part.last_stage:
+                result.stage_transitions[(part.last_stage, stage)] += 1
+            part.last_stage = stage
+            part.reflected = part.reflected or stage in REFLECTION_STAGES
+            part.closed = part.closed or stage == 'CLOSING'
+
+        text = record.get('user')
+        if not isinstance(text, str):
+            continue
+        if text.startswith(_REDACTED_PREFIX):
+            result.redacted += 1
+            continue
+        hits = next(scanned)
+        if normalize_text(text) in _CLOSING_KEYWORDS:
+            part.closed = True
+            continue
+        result.analyzed += 1
+        analyzer.observe_turn(insights[session], part.turns, text, hits)
+        for hit in hits:
+            result.theme_hits[hit.theme] += hit.count
+            result.theme_messages[hit.theme] += 1
+        _observe_topic(part, [hit.theme for hit in hits], result)
+
+    for session, part in open_parts.items():
+        part.themes = tuple(insights[session].themes)
+    return result
+
+class _SessionState:
+    __slots__ = ('turns', 'last_topic', 'tail_run', 'max_run', 'last_stage', 'themes',
+                 'reflected', 'closed', 'has_stage')
+
+    def __init__(self):
+        self.turns = 0
+        self.last_topic: Optional[str] = None
+        self.tail_run = self.max_run = 0
+        self.last_stage: Optional[str] = None
+        self.themes: set = set()
+        self.reflected = self.closed = self.has_stage = False
+
+class TranscriptAggregate:
+    """Hasil gabungan. Chunk harus digabung sesuai urutan baca agar sesi tersambung benar."""
+
+    def __init__(self, reflection_threshold: int = SUGGESTION_THRESHOLD):
+        self.reflection_threshold = reflection_threshold
+        self.records = self.malformed = self.turns = self.analyzed = self.redacted = 0
+        self.theme_hits: Counter = Counter()
+        self.theme_messages: Counter = Counter()
+        self.theme_sessions: Counter = Counter()
+        self.topic_transitions: Counter = Counter()
+        self.stage_transitions: Counter = Counter()
+        self.sessions = self.sessions_ended = self.sessions_closed = self.sessions_reflected = 0
+        self.session_turns = 0
+        self._open: Dict[str, _SessionState] = {}
+        self.max_open_sessions = 0
+
+    def merge(self, chunk: ChunkResult):
+        self.records += chunk.records
+        self.malformed += chunk.malformed
+        self.turns += chunk.turns
+        self.analyzed += chunk.analyzed
+        self.redacted += chunk.redacted
+        self.theme_hits.update(chunk.theme_hits)
+        self.theme_messages.update(chunk.theme_messages)
+        self.topic_transitions.update(chunk.topic_transitions)
+        self.stage_transitions.update(chunk.stage_transitions)
+        for part in chunk.parts:
+            self._stitch(part)
+        self.max_open_sessions = max(self.max_open_sessions, len(self._open))
+
+    def _stitch(self, part: SessionPart):
+        state = self._open.get(part.session)
+        if state is None:
+            state = self._open[part.session] = _SessionState()
+        state.turns += part.turns
+        state.themes.update(part.themes)
+        state.reflected = state.reflected or part.reflected
+        state.closed = state.closed or part.closed
+
+        if state.last_topic is not None:
+            # Pesan tanpa tema di awal potongan ikut topik yang masih aktif
+            state.tail_run += part.pre_topic_turns
+            state.max_run = max(state.max_run, state.tail_run)
+        if part.first_topic is not None:
+            if state.last_topic is None:
+                state.tail_run = part.tail_run
+            elif part.first_topic == state.last_topic:
+                joined = state.tail_run + part.lead_run
+                state.max_run = max(state.max_run, joined)
+                state.tail_run = part.tail_run if part.changed else joined
+            else:
+                self.topic_transitions[(state.last_topic, part.first_topic)] += 1
+                state.tail_run = part.tail_run
+            state.max_run = max(state.max_run, part.max_run)
+            state.last_topic = part.last_topic
+
+        if part.first_stage is not None:
+            state.has_stage = True
+            if state.last_stage is not None and part.first_stage != state.last_stage:
+                self.stage_transitions[(state.last_stage, part.first_stage)] += 1
+            state.last_stage = part.last_stage
+
+        if part.ended:
+            self.sessions_ended += 1
+            self._finish(self._open.pop(part.session))
+
+    def _finish(self, state: _SessionState):
+        self.sessions += 1
+        self.session_turns += state.turns
+        self.theme_sessions.update(state.themes)
+        self.sessions_closed += state.closed
+        # Stage yang tercatat lebih akurat; tanpa stage, perkiraan dari panjang run topik
+        reflected = state.reflected if state.has_stage else state.max_run >= self.reflection_threshold
+        self.sessions_reflected += reflected
+
+    def finish(self) -> 'TranscriptAggregate':
+        """Sesi yang belum memiliki session_end dihitung apa adanya."""
+        while self._open:
+            self._finish(self._open.popitem()[1])
+        return self
+
+    def summary(self) -> Dict[str, float]:
+        sessions = self.sessions or 1
+        return {
+            'records': self.records,
+            'malformed': self.malformed,
+            'turns': self.turns,
+            'analyzed_turns': self.analyzed,
+            'redacted_turns': self.redacted,
+            'sessions': self.sessions,
+            'avg_turns_per_session': self.session_turns / sessions,
+            'reflection_rate': self.sessions_reflected / sessions,
+            'closing_rate': self.sessions_closed / sessions,
+            'session_end_rate': self.sessions_ended / sessions,
+            'max_open_sessions': self.max_open_sessions,
+        }
+
+    def theme_rows(self) -> List[Tuple[str, int, int, int]]:
+        return [(theme, hits, self.theme_messages[theme], self.theme_sessions[theme])
+                for theme, hits in _ranked(self.theme_hits)]
+
+# --- Pipeline ---
+
+def iter_transcript_files(paths: Iterable[str]) -> Iterator[str]:
+    """File .jsonl dari path file/direktori; dalam direktori urut mtime agar file hasil rotasi dibaca lebih dulu."""
+    for path in paths:
+        if os.path.isdir(path):
+            found = []
+            for root, _, files in os.walk(path):
+                found.extend(os.path.join(root, name) for name in files if name.endswith('.jsonl'))
+            yield from sorted(found, key=lambda f: (os.path.getmtime(f), f))
+        else:
+            yield path
+
+def iter_lines(files: Iterable[str]) -> Iterator[str]:
+    for path in files:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if line.strip():
+                    yield line
+
+def iter_chunks(lines: Iterable[str], chunk_bytes: int = 4 * 2**20) -> Iterator[List[str]]:
+    chunk: List[str] = []
+    size = 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield chunk
+            chunk, size = [], 0
+    if chunk:
+        yield chunk
+
+def ordered_map(fn: Callable, items: Iterable, workers: int, max_pending: Optional[int] = None) -> Iterator:
+    """
+    Seperti pool.map, tetapi input dibaca hanya sejauh `max_pending` tugas di depan hasil
+    yang belum diambil (Pool.imap membaca seluruh input secepat mungkin).
+    """
+    if workers <= 1:
+        yield from map(fn, items)
+        return
+    max_pending = max_pending or workers * 2
+    # Konten dimuat sebelum fork agar worker berbagi halaman memorinya
+    get_shared_knowledge_base()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def analyze_transcripts(paths: Iterable[str], workers: int = 1, chunk_bytes: int = 4 * 2**20) -> TranscriptAggregate:
+    aggregate = TranscriptAggregate()
+    chunks = iter_chunks(iter_lines(iter_transcript_files(paths)), chunk_bytes)
+    for result in ordered_map(analyze_chunk, chunks, workers):
+        aggregate.merge(result)
+    return aggregate.finish()
+
+# --- Output ---
+
+def format_report(aggregate: TranscriptAggregate, top: int = 15) -> str:
+    summary = aggregate.summary()
+    lines = ["=" * 60, "ANALITIK TRANSKRIP", "=" * 60]
+    lines.append(f"Record: {summary['records']:,}  (rusak: {summary['malformed']:,})")
+    lines.append(f"Giliran: {summary['turns']:,}  dianalisis: {summary['analyzed_turns']:,}"
+                 f"  disamarkan: {summary['redacted_turns']:,}")
+    lines.append(f"Sesi: {summary['sessions']:,}  rata-rata {summary['avg_turns_per_session']:.1f} giliran/sesi")
+    lines.append(f"Mencapai refleksi: {summary['reflection_rate']:.1%}   Ditutup dengan ringkasan: "
+                 f"{summary['closing_rate']:.1%}   Tercatat berakhir: {summary['session_end_rate']:.1%}")
+
+    lines.append(f"\n{'tema':<24}{'kecocokan':>11}{'pesan':>10}{'sesi':>9}")
+    for theme, hits, messages, sessions in aggregate.theme_rows()[:top]:
+        lines.append(f"{theme:<24}{hits:>11,}{messages:>10,}{sessions:>9,}")
+
+    lines.append(f"\n{'transisi topik':<44}{'jumlah':>9}")
+    for (source, target), count in _ranked(aggregate.topic_transitions)[:top]:
+        lines.append(f"{source + ' -> ' + target:<44}{count:>9,}")
+
+    if aggregate.stage_transitions:
+        lines.append(f"\n{'transisi stage':<44}{'jumlah':>9}")
+        for (source, target), count in _ranked(aggregate.stage_transitions)[:top]:
+            lines.append(f"{source + ' -> ' + target:<44}{count:>9,}")
+    lines.append("=" * 60)
+    return '\n'.join(lines)
+
+def write_csv(aggregate: TranscriptAggregate, directory: str) -> List[str]:
+    """Menulis summary.csv, themes.csv, topic_transitions.csv dan stage_transitions.csv."""
+    os.makedirs(directory, exist_ok=True)
+    tables = {
+        'summary.csv': (('metric', 'value'), aggregate.summary().items()),
+        'themes.csv': (('theme', 'hits', 'messages', 'sessions'), aggregate.theme_rows()),
+        'topic_transitions.csv': (('from_topic', 'to_topic', 'count'),
+                                  [(s, t, c) for (s, t), c in _ranked(aggregate.topic_transitions)]),
+        'stage_transitions.csv': (('from_stage', 'to_stage', 'count'),
+                                  [(s, t, c) for (s, t), c in _ranked(aggregate.stage_transitions)]),
+    }
+    written = []
+    for name, (header, rows) in tables.items():
+        path = os.path.join(directory, name)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+        written.append(path)
+    return written
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Agregat tema, transisi, refleksi dan penutupan dari transkrip JSONL")
+    parser.add_argument('paths', nargs='+', help="file .jsonl atau direktori (mis. logs/sessions)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="jumlah proses deteksi")
+    parser.add_argument('--chunk-mb', type=float, default=4.0, help="ukuran chunk per tugas worker")
+    parser.add_argument('--csv', metavar='DIR', help="tulis tabel CSV ke direktori ini")
+    parser.add_argument('--top', type=int, default=15, help="baris per tabel ringkasan")
+    args = parser.parse_args(argv)
+
+    aggregate = analyze_transcripts(args.paths, args.workers, int(args.chunk_mb * 2**20))
+    print(format_report(aggregate, args.top))
+    if args.csv:
+        for path in write_csv(aggregate, args.csv):
+            print(f"CSV: {path}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -10,6 +10,7 @@ import asyncio
 import logging
 import os
 import sys
+from typing import TYPE_CHECKING, Optional, Tuple
 from dotenv import load_dotenv
 
 # Menambahkan parent directory ke path untuk import
@@ -18,12 +19,31 @@ parent_dir = os.path.dirname(current_dir)
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
+from core.cache import get_detection_cache
 from core.chatbot import MentalHealthChatbot, ConversationStage
+from core.knowledge_base import reload_shared_knowledge_base
+from core.knowledge_pack import default_pack_path
+from core.metrics import get_registry
+from integrations.executor import EngineExecutor, run_engine_turn
+from integrations.send_scheduler import SendScheduler, split_message
+from integrations.session_worker import (PreforkSessions, SessionExpiredError, build_session_registry,
+                                         greeting_input, start_session_workers)
+from utils.logger import ChatLogger, TEXT_FORMAT, start_queue_logging, stop_queue_logging
+
+if TYPE_CHECKING:
+    from integrations.worker_pool import PreforkPool
 
 load_dotenv()
 
+# Batas panjang deskripsi embed Discord
+EMBED_DESCRIPTION_LIMIT = 4096
+
+def is_direct_message(channel) -> bool:
+    """DM dikenali dari tipe channel, bukan kelasnya, agar channel tiruan (uji beban) ikut dikenali."""
+    return getattr(channel, 'type', None) == discord.ChannelType.private
+
 class MentalHealthBot(commands.Bot):
-    def __init__(self):
+    def __init__(self, workers: Optional['PreforkPool'] = None):
         intents = discord.Intents.default()
         intents.message_content = True
         intents.members = True
@@ -35,8 +55,155 @@ class MentalHealthBot(commands.Bot):
             help_command=None
         )
         
-        self.chatbots: Dict[int, MentalHealthChatbot] = {} # Kunci: user_id, Value: instance chatbot
+        # Kunci: user_id, Value: instance chatbot. Dibatasi oleh SESSION_MAX dan SESSION_IDLE_TTL.
+        # Dengan worker prefork (SESSION_WORKERS), sesi berada di worker dan di sini hanya indeksnya.
+        self.workers = workers
+        if workers is not None:
+            self.session_store = None
+            self.chatbots = PreforkSessions(workers, float(os.getenv('SESSION_IDLE_TTL', '3600')))
+        else:
+            self.chatbots, self.session_store = build_session_registry()
+        self.session_sweep_interval = float(os.getenv('SESSION_SWEEP_INTERVAL', '60'))
         self.logger = logging.getLogger(__name__)
+        # Engine dijalankan di pool; ENGINE_EXECUTOR=thread|process, ENGINE_WORKERS=n
+        self.executor = EngineExecutor()
+
+        # METRICS_ENABLED=1 mengaktifkan instrumentasi; METRICS_PORT membuka endpoint /metrics
+        self.metrics = get_registry()
+        self.metrics.gauge('bot_active_sessions', 'Sesi chat aktif di memori').set_function(lambda: len(self.chatbots))
+        self.metrics.gauge('bot_engine_queued_turns', 'Giliran yang menunggu di antrean executor').set_function(
+            lambda: self.executor.queued_turns)
+        self.metrics.gauge('bot_event_loop_lag_seconds', 'Lag event loop terakhir').set_function(
+            lambda: self.executor.loop_lag_last)
+        # Semua balasan lewat antrean kirim per channel (token bucket + backoff 429)
+        send_seconds = self.metrics.histogram('bot_send_queue_seconds', 'Waktu dari antre sampai balasan terkirim')
+        global_rate = float(os.getenv('SEND_GLOBAL_RATE', '50'))
+        self.sender = SendScheduler(
+            channel_rate=float(os.getenv('SEND_CHANNEL_RATE', '1')),
+            channel_burst=float(os.getenv('SEND_CHANNEL_BURST', '5')),
+            global_rate=global_rate,
+            global_burst=global_rate,
+            observer=lambda seconds: send_seconds.observe(seconds) if self.metrics.enabled else None,
+        )
+        self.metrics.gauge('bot_send_queued_jobs', 'Balasan yang menunggu di antrean kirim').set_function(
+            lambda: self.sender.queued_jobs)
+        self.metrics_port = int(os.getenv('METRICS_PORT', '0'))
+        self.metrics_server = None
+
+        # Log percakapan JSONL per sesi, ditulis di thread latar belakang (CHAT_LOG_ENABLED=1)
+        self.chat_log: Optional[ChatLogger] = None
+        if os.getenv('CHAT_LOG_ENABLED', '0').lower() in ('1', 'true', 'yes'):
+            self.chat_log = ChatLogger(
+                os.getenv('CHAT_LOG_DIR', 'logs'),
+                redact=os.getenv('CHAT_LOG_REDACT', '1').lower() in ('1', 'true', 'yes'),
+                attach_handlers=False,
+                max_queue=int(os.getenv('CHAT_LOG_QUEUE', '10000')),
+                max_bytes=int(os.getenv('CHAT_LOG_MAX_BYTES', str(5 * 2**20))),
+                max_age=float(os.getenv('CHAT_LOG_MAX_AGE', '86400')),
+                journal=os.getenv('CHAT_LOG_JOURNAL', '0').lower() in ('1', 'true', 'yes'),
+            )
+            self.metrics.gauge('bot_chat_log_dropped', 'Record log percakapan yang dibuang karena antrean penuh'
+                               ).set_function(lambda: self.chat_log.sessions.dropped)
+
+        self.knowledge_pack_path = default_pack_path()
+        self.knowledge_reload_interval = float(os.getenv('KNOWLEDGE_RELOAD_INTERVAL', '30'))
+        self._knowledge_pack_mtime: Optional[float] = None
+
+    async def setup_hook(self):
+        """Dipanggil sekali sebelum terhubung ke gateway."""
+        self.logger.info("Setting up Mental Health Bot...")
+        await self.reload_knowledge()
+        self.executor.start_lag_monitor()
+        if self.metrics.enabled and self.metrics_port:
+            # http.server hanya dimuat jika endpoint /metrics memang dibuka
+            from integrations.metrics_server import start_metrics_server
+            self.metrics_server = start_metrics_server(self.metrics, self.metrics_port,
+                                                       os.getenv('METRICS_HOST', '127.0.0.1'))
+        if self.workers is not None:
+            restored = await self.chatbots.restore_index()
+            if restored:
+                self.logger.info(f"{restored} sesi tersimpan ditemukan di worker")
+        self.loop.create_task(self.chatbots.sweep_forever(self.session_sweep_interval))
+        if self.session_store is not None:
+            self.loop.create_task(self.session_store.flush_forever(float(os.getenv('SESSION_FLUSH_INTERVAL', '1'))))
+        if self.knowledge_reload_interval > 0:
+            self.loop.create_task(self._watch_knowledge_pack())
+        if self.workers is not None:
+            self.loop.create_task(self.workers.health_check_forever(float(os.getenv('SESSION_WORKER_HEALTH_INTERVAL', '10'))))
+
+    async def reload_knowledge(self) -> bool:
+        """Memuat ulang knowledge pack di thread terpisah lalu menukarnya secara atomik."""
+        try:
+            mtime = os.path.getmtime(self.knowledge_pack_path)
+            knowledge_base = await asyncio.to_thread(reload_shared_knowledge_base, self.knowledge_pack_path)
+        except Exception as e:
+            self.logger.error(f"Gagal memuat knowledge pack {self.knowledge_pack_path}: {e}")
+            return False
+        self._knowledge_pack_mtime = mtime
+        self.logger.info(f"Knowledge pack dimuat (versi {knowledge_base.version[:12]})")
+        return True
+
+    async def _watch_knowledge_pack(self):
+        """Memantau perubahan file pack agar editor konten tidak perlu menunggu deploy."""
+        while not self.is_closed():
+            await asyncio.sleep(self.knowledge_reload_interval)
+            try:
+                mtime = os.path.getmtime(self.knowledge_pack_path)
+            except OSError:
+                continue
+            if mtime != self._knowledge_pack_mtime:
+                await self.reload_knowledge()
+
+    async def close(self):
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+        await self.executor.shutdown()
+        await self.sender.shutdown()
+        if self.workers is not None:
+            await self.workers.shutdown()
+        if self.session_store is not None:
+            self.session_store.close()
+        if self.chat_log is not None:
+            await asyncio.to_thread(self.chat_log.close)
+        await super().close()
+
+    async def _open_session(self, user_id: int, display_name: str) -> str:
+        """Membuat sesi baru dan mengembalikan sapaan pertama dari bot."""
+        if self.workers is not None:
+            return await self.chatbots.open(user_id, display_name)
+        self.chatbots[user_id] = MentalHealthChatbot(display_name)
+        response, _ = await self._engine_response(user_id, greeting_input(display_name))
+        return response
+
+    async def _engine_response(self, user_id: int, user_input: str) -> Tuple[str, ConversationStage]:
+        """Menjalankan satu giliran engine di pool (atau worker) lalu menyimpan state sesi terbarunya."""
+        if self.workers is not None:
+            return await self.chatbots.turn(user_id, user_input)
+        chatbot = await self.chatbots.get_async(user_id)
+        if chatbot is None:
+            raise KeyError(user_id)
+        chatbot, response = await self.executor.call(run_engine_turn, chatbot, user_input)
+        self.chatbots[user_id] = chatbot
+        return response, chatbot.stage
+
+    async def _end_session(self, user_id: int):
+        if self.workers is not None:
+            await self.chatbots.close(user_id)
+        elif user_id in self.chatbots:
+            del self.chatbots[user_id]
+
+    def _closing_embeds(self, display_name: str, summary: str, footer: str) -> list:
+        """Ringkasan penutup sebagai embed; ringkasan yang sangat panjang dipecah per kalimat."""
+        parts = split_message(summary, EMBED_DESCRIPTION_LIMIT) or [summary]
+        embeds = []
+        for i, part in enumerate(parts):
+            embeds.append(discord.Embed(
+                title=f"Refleksi Sesi untuk {display_name}" + (f" ({i + 1}/{len(parts)})" if len(parts) > 1 else ""),
+                description=part,
+                color=discord.Color.dark_green()
+            ))
+        embeds[-1].set_footer(text=footer)
+        return embeds
 
     async def on_ready(self):
         """Dipanggil saat bot siap."""
@@ -54,7 +221,7 @@ class MentalHealthBot(commands.Bot):
             return
         
         # Jika di DM, atau jika sesi sudah aktif, langsung tangani sebagai pesan chat.
-        if isinstance(message.channel, discord.DMChannel) or message.author.id in self.chatbots:
+        if is_direct_message(message.channel) or message.author.id in self.chatbots:
             # Abaikan command lain jika sedang dalam sesi chat
             if message.content.startswith('!') and not message.content.lower().startswith(('!stop', '!selesai')):
                 return
@@ -65,62 +232,68 @@ class MentalHealthBot(commands.Bot):
 
     async def handle_chat_message(self, message: discord.Message):
         """Menangani semua pesan dalam sesi chat yang aktif."""
+        # Slot antrean diambil sebelum await apa pun agar urutan pesan user terjaga
+        await self.executor.submit(message.author.id, lambda: self._process_chat_message(message))
+
+    async def _process_chat_message(self, message: discord.Message):
         user_id = message.author.id
         
         # Mulai sesi baru secara otomatis jika belum ada (terutama di DM)
         if user_id not in self.chatbots:
-            self.chatbots[user_id] = MentalHealthChatbot(message.author.display_name)
             # Dapatkan sapaan pertama dari bot
-            response = self.chatbots[user_id].get_response(f"halo, nama saya {message.author.display_name}")
-            await message.channel.send(response)
+            response = await self._open_session(user_id, message.author.display_name)
+            await self.sender.send(message.channel, response)
+            if self.chat_log:
+                self.chat_log.log_session_start(user_id)
             return
 
-        chatbot = self.chatbots[user_id]
-        
         try:
             async with message.channel.typing():
-                response = chatbot.get_response(message.content)
+                response, stage = await self._engine_response(user_id, message.content)
+            if self.chat_log:
+                self.chat_log.log_conversation(user_id, message.content, response, stage=stage.name)
 
             # Jika respons adalah penutup, akhiri sesi
-            if chatbot.stage == ConversationStage.CLOSING:
-                embed = discord.Embed(
-                    title=f"Refleksi Sesi untuk {message.author.display_name}",
-                    description=response,
-                    color=discord.Color.dark_green()
-                )
-                embed.set_footer(text="Sesi telah berakhir. Mulai lagi kapan saja dengan mengirim pesan baru.")
-                await message.channel.send(embed=embed)
-                del self.chatbots[user_id]
+            if stage == ConversationStage.CLOSING:
+                embeds = self._closing_embeds(message.author.display_name, response,
+                                              "Sesi telah berakhir. Mulai lagi kapan saja dengan mengirim pesan baru.")
+                await self.sender.send(message.channel, embeds=embeds)
+                await self._end_session(user_id)
+                if self.chat_log:
+                    self.chat_log.log_session_end(user_id)
                 return
 
-            # Kirim respons normal
-            if len(response) > 2000:
-                parts = [response[i:i+1900] for i in range(0, len(response), 1900)]
-                for part in parts:
-                    await message.channel.send(part)
-            else:
-                await message.channel.send(response)
+            # Kirim respons normal; respons panjang dipecah di batas kalimat oleh scheduler
+            await self.sender.send(message.channel, response)
 
+        except SessionExpiredError:
+            # Sesi hilang di worker (kedaluwarsa atau worker diganti): mulai lagi dari sapaan
+            response = await self._open_session(user_id, message.author.display_name)
+            await self.sender.send(message.channel, response)
         except Exception as e:
             self.logger.error(f"Error saat memproses pesan: {e}")
-            await message.channel.send("Maaf, terjadi kesalahan internal. Sesi akan dihentikan.")
-            if user_id in self.chatbots:
-                del self.chatbots[user_id]
+            await self.sender.send(message.channel, "Maaf, terjadi kesalahan internal. Sesi akan dihentikan.")
+            try:
+                await self._end_session(user_id)
+            except Exception as e:
+                self.logger.error(f"Gagal menutup sesi {user_id}: {e}")
 
     @commands.command(name='chat', help='Mulai sesi chat kesehatan mental di server channel.')
     async def start_chat(self, ctx: commands.Context):
         """Memulai sesi chat di channel server."""
-        if isinstance(ctx.channel, discord.DMChannel):
-            await ctx.send("Kamu sudah di DM. Langsung saja mulai bercerita, tidak perlu perintah `!chat`.")
+        await self.executor.submit(ctx.author.id, lambda: self._start_chat(ctx))
+
+    async def _start_chat(self, ctx: commands.Context):
+        if is_direct_message(ctx.channel):
+            await self.sender.send(ctx.channel, "Kamu sudah di DM. Langsung saja mulai bercerita, tidak perlu perintah `!chat`.")
             return
 
         if ctx.author.id in self.chatbots:
-            await ctx.send(f"{ctx.author.mention}, kamu sudah memiliki sesi aktif. Lanjutkan percakapanmu atau ketik 'stop' untuk mengakhiri.")
+            await self.sender.send(ctx.channel, f"{ctx.author.mention}, kamu sudah memiliki sesi aktif. Lanjutkan percakapanmu atau ketik 'stop' untuk mengakhiri.")
             return
 
         # Langsung mulai sesi dan kirim sapaan pertama dari bot
-        self.chatbots[ctx.author.id] = MentalHealthChatbot(ctx.author.display_name)
-        initial_response = self.chatbots[ctx.author.id].get_response(f"halo, nama saya {ctx.author.display_name}")
+        initial_response = await self._open_session(ctx.author.id, ctx.author.display_name)
 
         embed = discord.Embed(
             title="Sesi Chat Dimulai!",
@@ -130,56 +303,90 @@ class MentalHealthBot(commands.Bot):
             ),
             color=discord.Color.blue()
         )
-        await ctx.send(embed=embed)
-        await ctx.send(initial_response)
+        # Embed dan sapaan pertama dikirim sebagai satu pesan
+        await self.sender.send(ctx.channel, initial_response, embed=embed)
+        if self.chat_log:
+            self.chat_log.log_session_start(ctx.author.id)
 
     @commands.command(name='stop', aliases=['selesai'], help='Mengakhiri sesi chat kesehatan mental.')
     async def stop_chat(self, ctx: commands.Context):
         """Mengakhiri sesi chat secara eksplisit."""
+        await self.executor.submit(ctx.author.id, lambda: self._stop_chat(ctx))
+
+    async def _stop_chat(self, ctx: commands.Context):
         user_id = ctx.author.id
         if user_id not in self.chatbots:
-            await ctx.send(f"{ctx.author.mention}, kamu tidak sedang dalam sesi chat aktif.")
+            await self.sender.send(ctx.channel, f"{ctx.author.mention}, kamu tidak sedang dalam sesi chat aktif.")
             return
         
-        chatbot = self.chatbots[user_id]
-        closing_response = chatbot.get_response('selesai')
+        closing_response, _ = await self._engine_response(user_id, 'selesai')
         
-        embed = discord.Embed(
-            title=f"Refleksi Sesi untuk {ctx.author.display_name}",
-            description=closing_response,
-            color=discord.Color.dark_green()
-        )
-        embed.set_footer(text="Sesi telah berakhir. Mulai lagi dengan `!chat` (di server) atau kirim pesan (di DM).")
-        await ctx.send(embed=embed)
-        del self.chatbots[user_id]
+        embeds = self._closing_embeds(ctx.author.display_name, closing_response,
+                                      "Sesi telah berakhir. Mulai lagi dengan `!chat` (di server) atau kirim pesan (di DM).")
+        await self.sender.send(ctx.channel, embeds=embeds)
+        await self._end_session(user_id)
+        if self.chat_log:
+            self.chat_log.log_conversation(user_id, 'selesai', closing_response, stage='CLOSING')
+            self.chat_log.log_session_end(user_id)
+
+    @commands.command(name='enginestats', help='Statistik executor engine (khusus pemilik bot).')
+    @commands.is_owner()
+    async def engine_stats(self, ctx: commands.Context):
+        """Lag event loop dan kedalaman antrean, untuk menentukan ukuran pool."""
+        stats = {**self.executor.stats(), **{f"sessions_{k}": v for k, v in self.chatbots.stats().items()}}
+        for name, cache_stats in get_detection_cache().stats().items():
+            stats[f"cache_{name}_hit_rate"] = cache_stats['hit_rate']
+        stats.update(self.sender.stats())
+        if self.chat_log:
+            stats.update({f"chat_log_{k}": v for k, v in self.chat_log.stats().items()})
+        lines = [f"**{key}**: {value:.2f}" if isinstance(value, float) else f"**{key}**: {value}"
+                 for key, value in stats.items()]
+        await self.sender.send(ctx.channel, "\n".join(lines))
+
+    @commands.command(name='reload', help='Memuat ulang knowledge pack (khusus pemilik bot).')
+    @commands.is_owner()
+    async def reload_command(self, ctx: commands.Context):
+        """Memuat ulang konten tanpa restart; sesi yang aktif tetap berjalan."""
+        if await self.reload_knowledge():
+            await ctx.send("Knowledge pack berhasil dimuat ulang.")
+        else:
+            await ctx.send("Gagal memuat knowledge pack, konten lama tetap dipakai. Cek log untuk detailnya.")
 
     # ... (fungsi help_mental, info, techniques, dll bisa tetap sama)
 
 def setup_logging():
-    """Mengatur konfigurasi logging."""
+    """
+    Mengatur konfigurasi logging. File dan console ditulis oleh thread QueueListener,
+    sehingga logging dari event loop tidak pernah menunggu disk.
+    """
     os.makedirs('logs', exist_ok=True)
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('logs/bot.log'),
-            logging.StreamHandler()
-        ]
-    )
+    formatter = logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.FileHandler('logs/bot.log'), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO))
+    return start_queue_logging(root, handlers, int(os.getenv('LOG_QUEUE_SIZE', '10000')))
 
 async def main():
     """Fungsi utama untuk menjalankan bot."""
+    # Worker di-fork sebelum thread logging/executor berjalan; konten dimuat sekali di induk
+    session_workers = int(os.getenv('SESSION_WORKERS', '0'))
+    workers = start_session_workers(session_workers) if session_workers > 0 else None
     setup_logging()
-    bot = MentalHealthBot()
+    bot = MentalHealthBot(workers)
     token = os.getenv('DISCORD_TOKEN')
     if not token:
         logging.error("DISCORD_TOKEN tidak ditemukan di environment variables!")
+        stop_queue_logging(logging.getLogger())
         return
     
     try:
         await bot.start(token)
     except Exception as e:
         logging.error(f"Bot error: {e}")
+    finally:
+        stop_queue_logging(logging.getLogger())
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,130 @@
+"""
+Engine Executor - Eksekusi Non-Blocking
+Memindahkan pemanggilan engine keluar dari event loop ke thread/process pool.
+Setiap user punya antrean berurutan sehingga gilirannya tidak tertukar,
+sementara user yang berbeda diproses paralel.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+def run_engine_turn(chatbot: Any, user_input: str) -> Tuple[Any, str]:
+    """Satu giliran engine. Mengembalikan chatbot karena di process pool yang diubah adalah salinannya."""
+    response = chatbot.get_response(user_input)
+    return chatbot, response
+
+class EngineExecutor:
+    def __init__(self, mode: Optional[str] = None, max_workers: Optional[int] = None,
+                 lag_interval: float = 0.5):
+        self.mode = (mode or os.getenv('ENGINE_EXECUTOR', 'thread')).lower()
+        self.max_workers = max_workers or int(os.getenv('ENGINE_WORKERS', '0')) or min(32, (os.cpu_count() or 1) + 4)
+        if self.mode == 'process':
+            # multiprocessing hanya dimuat untuk mode process
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool: Executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        elif self.mode == 'thread':
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='engine')
+        else:
+            raise ValueError(f"Mode executor tidak dikenal: {self.mode} (pilih 'thread' atau 'process')")
+
+        self.logger = logging.getLogger(__name__)
+        self.lag_interval = lag_interval
+        self._tails: Dict[Hashable, asyncio.Task] = {}
+        self._depth: Dict[Hashable, int] = {}
+        self._lag_task: Optional[asyncio.Task] = None
+
+        self.in_flight = 0
+        self.completed = 0
+        # Dihitung berjalan di event loop; gauge metrics dibaca dari thread lain dan
+        # tidak boleh mengiterasi _depth yang sedang diubah
+        self.queued_turns = 0
+        self.max_queue_depth = 0
+        self.total_call_seconds = 0.0
+        self.loop_lag_last = 0.0
+        self.loop_lag_max = 0.0
+        self.loop_lag_avg = 0.0
+
+    def submit(self, key: Hashable, job: Callable[[], Awaitable[Any]]) -> 'asyncio.Task':
+        """
+        Menjadwalkan `job` setelah semua job sebelumnya dengan key yang sama selesai.
+        Harus dipanggil sebelum `await` apa pun di handler agar urutan kedatangan terjaga.
+        """
+        previous = self._tails.get(key)
+        depth = self._depth.get(key, 0) + 1
+        self._depth[key] = depth
+        self.queued_turns += 1
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        task = asyncio.get_running_loop().create_task(self._run_after(previous, key, job))
+        self._tails[key] = task
+        return task
+
+    async def _run_after(self, previous: Optional[asyncio.Task], key: Hashable,
+                         job: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            if previous is not None:
+                # Kegagalan job sebelumnya ditangani oleh pemiliknya, bukan oleh job ini
+                await asyncio.wait([previous])
+            return await job()
+        finally:
+            self.queued_turns -= 1
+            self._depth[key] -= 1
+            if self._depth[key] == 0:
+                del self._depth[key]
+                if self._tails.get(key) is asyncio.current_task():
+                    del self._tails[key]
+
+    async def call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Menjalankan fungsi blocking di pool tanpa menahan event loop."""
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._pool, functools.partial(fn, *args))
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.total_call_seconds += time.perf_counter() - start
+
+    def start_lag_monitor(self):
+        if self._lag_task is None:
+            self._lag_task = asyncio.get_running_loop().create_task(self._monitor_loop_lag())
+
+    async def _monitor_loop_lag(self):
+        """Lag = seberapa terlambat event loop membangunkan sleep yang dijadwalkan."""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, loop.time() - expected)
+            self.loop_lag_last = lag
+            self.loop_lag_max = max(self.loop_lag_max, lag)
+            self.loop_lag_avg = lag if not self.loop_lag_avg else 0.9 * self.loop_lag_avg + 0.1 * lag
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'workers': self.max_workers,
+            'in_flight': self.in_flight,
+            'completed': self.completed,
+            'avg_call_ms': (self.total_call_seconds / self.completed * 1000) if self.completed else 0.0,
+            'queued_users': len(self._depth),
+            'queued_turns': self.queued_turns,
+            'max_queue_depth': self.max_queue_depth,
+            'loop_lag_ms': self.loop_lag_last * 1000,
+            'loop_lag_avg_ms': self.loop_lag_avg * 1000,
+            'loop_lag_max_ms': self.loop_lag_max * 1000,
+        }
+
+    async def shutdown(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._lag_task = None
+        pending = list(self._tails.values())
+        if pending:
+            await asyncio.wait(pending)
+        self._pool.shutdown(wait=False)
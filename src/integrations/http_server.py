@@ -0,0 +1,389 @@
+"""
+HTTP & WebSocket Server - Akses Langsung ke Engine
+Server asyncio murni (tanpa dependensi tambahan) untuk klien web/mobile:
+  POST   /sessions/<id>/turns   satu giliran: {"text": "...", "name": "..."} -> respons JSON
+  DELETE /sessions/<id>         mengakhiri sesi dan mengembalikan ringkasan penutup
+  GET    /ws/<id>?name=...      WebSocket: setiap pesan teks adalah satu giliran
+  GET    /health                statistik server, executor, dan sesi
+Koneksi HTTP/1.1 dipertahankan (keep-alive) dengan batas waktu menganggur, dan
+jumlah koneksi dibatasi. Engine berjalan di EngineExecutor sehingga accept loop
+tidak pernah menunggu engine.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import struct
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from core.chatbot import ConversationStage, MentalHealthChatbot, warm_up
+from integrations.executor import EngineExecutor, run_engine_turn
+from integrations.session_worker import build_session_registry, greeting_input
+
+WS_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           408: 'Request Timeout', 413: 'Payload Too Large', 431: 'Request Header Fields Too Large',
+           500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+class ChatService:
+    """Sesi engine untuk server: registry yang sama dengan bot, satu antrean berurutan per sesi."""
+
+    def __init__(self, executor: Optional[EngineExecutor] = None):
+        self.sessions, self.session_store = build_session_registry()
+        self.executor = executor or EngineExecutor()
+
+    def turn(self, session_id: Hashable, text: str, name: Optional[str] = None) -> 'asyncio.Task':
+        # Slot antrean diambil saat dipanggil, sebelum await apa pun, agar urutan giliran terjaga
+        return self.executor.submit(session_id, lambda: self._turn(session_id, text, name))
+
+    async def _turn(self, session_id: Hashable, text: str, name: Optional[str]) -> Dict[str, Any]:
+        chatbot = await self.sessions.get_async(session_id)
+        created = chatbot is None
+        if created:
+            # Sesi baru selalu dibuka dengan sapaan, seperti DM pertama di Discord
+            chatbot = MentalHealthChatbot(name or "User")
+            text = greeting_input(chatbot.user_name)
+        chatbot, response = await self.executor.call(run_engine_turn, chatbot, text)
+        closed = chatbot.stage == ConversationStage.CLOSING
+        if closed:
+            if session_id in self.sessions:
+                del self.sessions[session_id]
+        else:
+            self.sessions[session_id] = chatbot
+        return {'session': session_id, 'response': response, 'stage': chatbot.stage.name.lower(),
+                'created': created, 'closed': closed}
+
+    def end(self, session_id: Hashable) -> 'asyncio.Task':
+        return self.executor.submit(session_id, lambda: self._end(session_id))
+
+    async def _end(self, session_id: Hashable) -> Optional[Dict[str, Any]]:
+        if session_id not in self.sessions:
+            return None
+        return await self._turn(session_id, 'selesai', None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.executor.stats(), **{f"sessions_{k}": v for k, v in self.sessions.stats().items()}}
+
+    async def close(self):
+        await self.executor.shutdown()
+        if self.session_store is not None:
+            self.session_store.close()
+
+class _Request:
+    __slots__ = ('method', 'path', 'query', 'version', 'headers', 'body')
+
+    def __init__(self, method: str, target: str, version: str, headers: Dict[str, str], body: bytes):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = unquote(parts.path)
+        self.query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        self.version = version
+        self.headers = headers
+        self.body = body
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    def json(self) -> Dict[str, Any]:
+        try:
+            data = json.loads(self.body or b'{}')
+        except ValueError:
+            raise HttpError(400, "Body harus JSON")
+        if not isinstance(data, dict):
+            raise HttpError(400, "Body harus objek JSON")
+        return data
+
+class ChatServer:
+    def __init__(self, service: ChatService, host: str = '127.0.0.1', port: int = 8080,
+                 max_connections: int = 1000, keepalive_timeout: float = 15.0,
+                 max_body: int = 64 * 1024, max_header: int = 16 * 1024,
+                 sweep_interval: float = 60.0, flush_interval: float = 1.0):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.max_body = max_body
+        self.max_header = max_header
+        self.sweep_interval = sweep_interval
+        self.flush_interval = flush_interval
+        self.logger = logging.getLogger(__name__)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: set = set()
+        # Sweep sesi menganggur dan flush store SQLite, seperti setup_hook di bot Discord
+        self._background: list = []
+        self.started_at = time.time()
+
+        self.connections_total = 0
+        self.connections_rejected = 0
+        self.requests = 0
+        self.websocket_messages = 0
+
+    async def start(self) -> 'ChatServer':
+        # Konten dimuat sebelum menerima koneksi, bukan saat giliran pertama
+        await asyncio.to_thread(warm_up)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  limit=self.max_header, backlog=min(self.max_connections, 4096))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.service.executor.start_lag_monitor()
+        self._background.append(asyncio.create_task(self.service.sessions.sweep_forever(self.sweep_interval)))
+        if self.service.session_store is not None:
+            self._background.append(asyncio.create_task(
+                self.service.session_store.flush_forever(self.flush_interval)))
+        self.logger.info(f"Server chat berjalan di http://{self.host}:{self.port}")
+        return self
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for writer in list(self._connections):
+            writer.close()
+        for task in self._background:
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        self._background.clear()
+        await self.service.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'uptime_s': time.time() - self.started_at,
+            'connections_open': len(self._connections),
+            'connections_total': self.connections_total,
+            'connections_rejected': self.connections_rejected,
+            'requests': self.requests,
+            'websocket_messages': self.websocket_messages,
+            **self.service.stats(),
+        }
+
+    # --- HTTP ---
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        if len(self._connections) >= self.max_connections:
+            self.connections_rejected += 1
+            await self._respond(writer, 503, {'error': "Terlalu banyak koneksi"}, keep_alive=False)
+            writer.close()
+            return
+        self._connections.add(writer)
+        self.connections_total += 1
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), self.keepalive_timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except HttpError as e:
+                    await self._respond(writer, e.status, {'error': str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                self.requests += 1
+                if request.headers.get('upgrade', '').lower() == 'websocket':
+                    await self._websocket(request, reader, writer)
+                    break
+                status, payload = await self._dispatch(request)
+                await self._respond(writer, status, payload, keep_alive=request.keep_alive)
+                if not request.keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        except Exception as e:
+            self.logger.error(f"Error koneksi: {e}")
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[_Request]:
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.LimitOverrunError:
+            raise HttpError(431, "Header terlalu besar")
+        except asyncio.IncompleteReadError as e:
+            if not e.partial:
+                return None  # klien menutup koneksi keep-alive
+            raise
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ', 2)
+        except ValueError:
+            raise HttpError(400, "Request line tidak valid")
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                key, value = line.split(':', 1)
+                headers[key.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get('content-length', '0'))
+        except ValueError:
+            raise HttpError(400, "Content-Length tidak valid")
+        if length > self.max_body:
+            raise HttpError(413, f"Body lebih dari {self.max_body} byte")
+        body = await reader.readexactly(length) if length else b''
+        return _Request(method.upper(), target, version, headers, body)
+
+    async def _dispatch(self, request: _Request) -> Tuple[int, Dict[str, Any]]:
+        parts = [p for p in request.path.split('/') if p]
+        try:
+            if parts == ['health']:
+                if request.method != 'GET':
+                    raise HttpError(405, "Gunakan GET")
+                return 200, self.stats()
+            if len(parts) == 3 and parts[0] == 'sessions' and parts[2] == 'turns':
+                if request.method != 'POST':
+                    raise HttpError(405, "Gunakan POST")
+                data = request.json()
+                text = data.get('text')
+                if not isinstance(text, str) or not text.strip():
+                    raise HttpError(400, "Field 'text' wajib diisi")
+                return 200, await self.service.turn(parts[1], text, data.get('name'))
+            if len(parts) == 2 and parts[0] == 'sessions':
+                if request.method != 'DELETE':
+                    raise HttpError(405, "Gunakan DELETE")
+                result = await self.service.end(parts[1])
+                if result is None:
+                    raise HttpError(404, "Sesi tidak ditemukan")
+                return 200, result
+            raise HttpError(404, "Endpoint tidak ditemukan")
+        except HttpError as e:
+            return e.status, {'error': str(e)}
+        except Exception as e:
+            self.logger.error(f"Error saat memproses {request.method} {request.path}: {e}")
+            return 500, {'error': "Terjadi kesalahan internal"}
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any], keep_alive: bool):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        headers = [
+            f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            "Connection: keep-alive" if keep_alive else "Connection: close",
+        ]
+        if keep_alive:
+            headers.append(f"Keep-Alive: timeout={int(self.keepalive_timeout)}")
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    # --- WebSocket (RFC 6455) ---
+
+    async def _websocket(self, request: _Request, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        parts = [p for p in request.path.split('/') if p]
+        key = request.headers.get('sec-websocket-key')
+        if len(parts) != 2 or parts[0] != 'ws' or not key:
+            await self._respond(writer, 400 if key else 404, {'error': "Gunakan /ws/<session_id>"}, keep_alive=False)
+            return
+        session_id, name = parts[1], request.query.get('name')
+        accept = base64.b64encode(hashlib.sha1(key.encode('latin-1') + WS_GUID).digest()).decode()
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode('latin-1'))
+        await writer.drain()
+
+        fragments = []
+        while True:
+            try:
+                fin, opcode, payload = await asyncio.wait_for(self._read_frame(reader), self.keepalive_timeout * 4)
+            except asyncio.TimeoutError:
+                await self._send_frame(writer, 0x8, struct.pack('!H', 1001))
+                return
+            except HttpError as e:
+                await self._send_frame(writer, 0x8, struct.pack('!H', e.status) + str(e).encode('utf-8'))
+                return
+            if opcode == 0x8:
+                await self._send_frame(writer, 0x8, payload[:2])
+                return
+            if opcode == 0x9:
+                await self._send_frame(writer, 0xA, payload)
+                continue
+            if opcode == 0xA:
+                continue
+            fragments.append(payload)
+            if not fin:
+                if sum(len(f) for f in fragments) > self.max_body:
+                    await self._send_frame(writer, 0x8, struct.pack('!H', 1009))
+                    return
+                continue
+            message, fragments = b''.join(fragments), []
+            self.websocket_messages += 1
+
+            text = message.decode('utf-8', errors='replace')
+            if text.startswith('{'):
+                try:
+                    text = json.loads(text).get('text', '')
+                except (ValueError, AttributeError):
+                    pass
+            if not isinstance(text, str) or not text.strip():
+                await self._send_frame(writer, 0x1, json.dumps({'error': "Pesan kosong"}).encode('utf-8'))
+                continue
+            try:
+                result = await self.service.turn(session_id, text, name)
+            except Exception as e:
+                self.logger.error(f"Error WebSocket sesi {session_id}: {e}")
+                result = {'error': "Terjadi kesalahan internal"}
+            await self._send_frame(writer, 0x1, json.dumps(result, ensure_ascii=False).encode('utf-8'))
+            if result.get('closed'):
+                await self._send_frame(writer, 0x8, struct.pack('!H', 1000))
+                return
+
+    async def _read_frame(self, reader: asyncio.StreamReader) -> Tuple[bool, int, bytes]:
+        first, second = await reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack('!H', await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', await reader.readexactly(8))[0]
+        if length > self.max_body:
+            raise HttpError(1009, "Pesan terlalu besar")
+        mask = await reader.readexactly(4) if second & 0x80 else None
+        payload = await reader.readexactly(length)
+        if mask and length:
+            # XOR seluruh payload sekaligus sebagai satu bilangan besar
+            repeated = (mask * (length // 4 + 1))[:length]
+            payload = (int.from_bytes(payload, 'big') ^ int.from_bytes(repeated, 'big')).to_bytes(length, 'big')
+        return bool(first & 0x80), first & 0x0F, payload
+
+    async def _send_frame(self, writer: asyncio.StreamWriter, opcode: int, payload: bytes):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack('!BB', 0x80 | opcode, length)
+        elif length < 2 ** 16:
+            header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+        writer.write(header + payload)
+        await writer.drain()
+
+async def main(host: Optional[str] = None, port: Optional[int] = None):
+    """Menjalankan server sampai dihentikan (Ctrl+C)."""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    server = ChatServer(
+        ChatService(),
+        host=host or os.getenv('SERVER_HOST', '127.0.0.1'),
+        port=port if port is not None else int(os.getenv('SERVER_PORT', '8080')),
+        max_connections=int(os.getenv('SERVER_MAX_CONNECTIONS', '1000')),
+        keepalive_timeout=float(os.getenv('SERVER_KEEPALIVE_TIMEOUT', '15')),
+        sweep_interval=float(os.getenv('SESSION_SWEEP_INTERVAL', '60')),
+        flush_interval=float(os.getenv('SESSION_FLUSH_INTERVAL', '1')),
+    )
+    await server.start()
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
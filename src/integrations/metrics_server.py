@@ -0,0 +1,43 @@
+"""
+Metrics Server - Endpoint HTTP Lokal untuk Scrape Prometheus
+Menyajikan MetricsRegistry dalam format teks Prometheus di GET /metrics.
+Berjalan di thread daemon terpisah agar tidak menyentuh event loop bot.
+"""
+
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: Any = None
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrape berkala tidak perlu memenuhi log bot
+        pass
+
+def start_metrics_server(registry: Any, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """
+    Menjalankan server metrics di background untuk `registry` (core.metrics.MetricsRegistry);
+    `server.shutdown()` untuk menghentikannya. Port 0 memilih port bebas.
+    """
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True)
+    thread.start()
+    logging.getLogger(__name__).info(f"Metrics tersedia di http://{host}:{server.server_address[1]}/metrics")
+    return server
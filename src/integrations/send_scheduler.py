@@ -0,0 +1,282 @@
+"""
+Send Scheduler - Pengiriman Balasan yang Sadar Rate Limit
+Semua balasan ke Discord lewat sini: konten dipecah di batas kalimat dan
+dikemas ke sesedikit mungkin pesan (teks + embed dalam satu pesan), lalu
+diantrekan per channel. Setiap channel punya token bucket sendiri di atas
+satu bucket global, dan respons 429 membuat bucket terkait berhenti sejenak
+sesuai retry_after (dengan backoff) alih-alih langsung dicoba ulang.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Sequence
+
+# Batas API Discord
+MAX_CONTENT_LENGTH = 2000
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_TOTAL_LENGTH = 6000
+
+# Titik potong: setelah tanda akhir kalimat yang diikuti spasi, atau setelah baris baru
+_BREAKS = re.compile(r'(?<=[.!?…])(?=\s)|(?<=\n)')
+
+def split_message(text: str, limit: int = MAX_CONTENT_LENGTH) -> List[str]:
+    """Memecah teks menjadi potongan <= limit, sebisa mungkin di batas kalimat."""
+    if len(text) <= limit:
+        return [text] if text.strip() else []
+    chunks: List[str] = []
+    current = ''
+    for piece in _BREAKS.split(text):
+        if len(current) + len(piece) <= limit:
+            current += piece
+            continue
+        if current.strip():
+            chunks.append(current.strip())
+        current = piece.lstrip()
+        # Satu kalimat yang lebih panjang dari limit dipotong di spasi terakhir
+        while len(current) > limit:
+            cut = current.rfind(' ', 0, limit + 1)
+            if cut <= 0:
+                cut = limit
+            chunks.append(current[:cut].rstrip())
+            current = current[cut:].lstrip()
+    if current.strip():
+        chunks.append(current.strip())
+    return chunks
+
+def _embed_length(embed: Any) -> int:
+    try:
+        return len(embed)  # discord.Embed menghitung total karakternya sendiri
+    except TypeError:
+        return len(getattr(embed, 'description', None) or '')
+
+def plan_messages(content: Optional[str] = None, embeds: Sequence[Any] = (),
+                  limit: int = MAX_CONTENT_LENGTH) -> List[Dict[str, Any]]:
+    """
+    Menyusun argumen `send` seminimal mungkin: potongan teks berurutan, dan kelompok
+    embed pertama ikut dalam pesan teks terakhir (teks tampil di atas embed).
+    """
+    groups: List[List[Any]] = []
+    size = 0
+    for embed in embeds:
+        length = _embed_length(embed)
+        if not groups or len(groups[-1]) >= MAX_EMBEDS_PER_MESSAGE or size + length > MAX_EMBED_TOTAL_LENGTH:
+            groups.append([])
+            size = 0
+        groups[-1].append(embed)
+        size += length
+
+    messages: List[Dict[str, Any]] = [{'content': chunk} for chunk in split_message(content or '', limit)]
+    for i, group in enumerate(groups):
+        if i == 0 and messages:
+            target = messages[-1]
+        else:
+            target = {}
+            messages.append(target)
+        if len(group) == 1:
+            target['embed'] = group[0]
+        else:
+            target['embeds'] = group
+    return messages
+
+class TokenBucket:
+    """Token bucket sederhana; `block` menahan bucket selama retry_after dari respons 429."""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Detik sampai satu token tersedia (0 berarti bisa langsung dipakai)."""
+        now = self._clock()
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def take(self):
+        self.tokens -= 1
+
+    def block(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, self._clock() + seconds)
+
+    def is_idle(self) -> bool:
+        return self.delay() == 0 and self.tokens >= self.capacity
+
+def rate_limit_delay(error: Exception) -> Optional[float]:
+    """retry_after dari error 429 (discord.HTTPException/RateLimited), None jika bukan rate limit."""
+    if getattr(error, 'status', None) != 429 and not hasattr(error, 'retry_after'):
+        return None
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after is None:
+        headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+        retry_after = headers.get('Retry-After')
+    try:
+        return float(retry_after) if retry_after is not None else 1.0
+    except (TypeError, ValueError):
+        return 1.0
+
+def _is_global(error: Exception) -> bool:
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    return str(headers.get('X-RateLimit-Global', '')).lower() == 'true'
+
+class _SendJob:
+    __slots__ = ('channel', 'messages', 'future', 'enqueued_at')
+
+    def __init__(self, channel: Any, messages: List[Dict[str, Any]], future: asyncio.Future, enqueued_at: float):
+        self.channel = channel
+        self.messages = messages
+        self.future = future
+        self.enqueued_at = enqueued_at
+
+class SendScheduler:
+    """
+    Antrean kirim per channel. Default mengikuti batas Discord: 5 pesan per 5 detik
+    per channel dan 50 request per detik secara global.
+    """
+
+    def __init__(self, channel_rate: float = 1.0, channel_burst: float = 5,
+                 global_rate: float = 50.0, global_burst: float = 50,
+                 max_retries: int = 5, backoff_base: float = 0.5,
+                 observer: Optional[Callable[[float], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.channel_rate = channel_rate
+        self.channel_burst = channel_burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.observer = observer
+        self._clock = clock
+        self.global_bucket = TokenBucket(global_rate, global_burst, clock)
+        self._buckets: Dict[Hashable, TokenBucket] = {}
+        self._queues: Dict[Hashable, Deque[_SendJob]] = {}
+        self._workers: Dict[Hashable, asyncio.Task] = {}
+        self._latencies: Deque[float] = deque(maxlen=2048)
+        # stats() dan gauge metrics bisa dibaca dari thread lain: mereka hanya melihat
+        # penghitung dan salinan latensi yang diperbarui di event loop, bukan deque/dict-nya
+        self._latency_snapshot: tuple = ()
+        self.logger = logging.getLogger(__name__)
+
+        self.queued_jobs = 0
+        self.messages_sent = 0
+        self.jobs_completed = 0
+        self.rate_limited = 0
+        self.failures = 0
+
+    def _key(self, channel: Any) -> Hashable:
+        return getattr(channel, 'id', None) or id(channel)
+
+    def send(self, channel: Any, content: Optional[str] = None, embed: Any = None,
+             embeds: Sequence[Any] = ()) -> 'asyncio.Future':
+        """
+        Mengantrekan satu balasan (boleh panjang, boleh dengan embed) ke `channel`.
+        Mengembalikan future yang selesai setelah semua bagiannya terkirim.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        messages = plan_messages(content, ([embed] if embed is not None else []) + list(embeds))
+        if not messages:
+            future.set_result(None)
+            return future
+        key = self._key(channel)
+        self._queues.setdefault(key, deque()).append(_SendJob(channel, messages, future, self._clock()))
+        self.queued_jobs += 1
+        if key not in self._workers:
+            self._workers[key] = loop.create_task(self._drain(key))
+        return future
+
+    async def _acquire(self, bucket: TokenBucket):
+        while True:
+            wait = max(bucket.delay(), self.global_bucket.delay())
+            if wait <= 0:
+                bucket.take()
+                self.global_bucket.take()
+                return
+            await asyncio.sleep(wait)
+
+    async def _send_one(self, channel: Any, bucket: TokenBucket, kwargs: Dict[str, Any]):
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(bucket)
+            try:
+                await channel.send(**kwargs)
+                self.messages_sent += 1
+                return
+            except Exception as e:
+                retry_after = rate_limit_delay(e)
+                if retry_after is None or attempt == self.max_retries:
+                    raise
+                self.rate_limited += 1
+                pause = max(retry_after, self.backoff_base * 2 ** attempt)
+                (self.global_bucket if _is_global(e) else bucket).block(pause)
+                self.logger.warning(f"Rate limit di channel {self._key(channel)}, menunggu {pause:.2f}s")
+
+    async def _drain(self, key: Hashable):
+        queue = self._queues[key]
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.channel_rate, self.channel_burst, self._clock)
+        try:
+            while queue:
+                job = queue[0]
+                try:
+                    for kwargs in job.messages:
+                        await self._send_one(job.channel, bucket, kwargs)
+                except Exception as e:
+                    self.failures += 1
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                else:
+                    latency = self._clock() - job.enqueued_at
+                    self._latencies.append(latency)
+                    self._latency_snapshot = tuple(self._latencies)
+                    if self.observer is not None:
+                        self.observer(latency)
+                    self.jobs_completed += 1
+                    if not job.future.done():
+                        job.future.set_result(None)
+                queue.popleft()
+                self.queued_jobs -= 1
+        finally:
+            # Worker yang dibatalkan meninggalkan job yang tidak akan pernah dikirim
+            self.queued_jobs -= len(queue)
+            del self._workers[key]
+            del self._queues[key]
+            self._prune_buckets()
+
+    def _prune_buckets(self):
+        # Bucket yang sudah penuh kembali tidak menyimpan informasi; aman dibuang
+        if len(self._buckets) > 2 * len(self._workers) + 1024:
+            for key in [k for k, b in self._buckets.items() if k not in self._workers and b.is_idle()]:
+                del self._buckets[key]
+
+    def stats(self) -> Dict[str, Any]:
+        ordered = sorted(self._latency_snapshot)
+        def pct(p: float) -> float:
+            return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000 if ordered else 0.0
+        return {
+            'send_queued_channels': len(self._workers),
+            'send_queued_jobs': self.queued_jobs,
+            'send_messages': self.messages_sent,
+            'send_jobs': self.jobs_completed,
+            'send_rate_limited': self.rate_limited,
+            'send_failures': self.failures,
+            'send_latency_p50_ms': pct(50),
+            'send_latency_p95_ms': pct(95),
+            'send_latency_max_ms': ordered[-1] * 1000 if ordered else 0.0,
+        }
+
+    async def shutdown(self, timeout: Optional[float] = 10.0):
+        """Menunggu antrean yang tersisa terkirim."""
+        pending = list(self._workers.values())
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
@@ -0,0 +1,321 @@
+"""
+Session Registry - Sesi Terbatas dengan TTL & LRU
+Pengganti dict `chatbots`: sesi yang menganggur terlalu lama dikeluarkan,
+jumlah sesi di memori dibatasi (LRU), dan sesi yang dikeluarkan bisa
+disimpan ke disk lalu dipulihkan saat user mengirim pesan lagi.
+Dengan store persisten (SQLiteSessionStore) registry bekerja write-through.
+I/O spill tidak dijalankan di event loop: tulis dan hapus dikerjakan thread
+latar milik store, dan `get_async` membaca sesi dari disk di thread.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Set, Tuple
+
+_SUFFIX = '.session'
+
+class PickleSpillStore:
+    """
+    Menyimpan sesi yang dikeluarkan sebagai satu file pickle per user, dinamai
+    hash kuncinya. Kunci yang punya file dicatat di memori, jadi `in` dan `delete`
+    untuk user yang tidak pernah di-spill tidak menyentuh disk. Pickle, tulis dan
+    hapus berjalan berurutan di satu thread latar (diselesaikan saat interpreter
+    keluar); sesi yang masih antre ditulis dipulihkan langsung dari antrean.
+    File yang tidak diambil lebih lama dari `max_age` detik dihapus oleh `expire`.
+    """
+
+    def __init__(self, directory: str, max_age: Optional[float] = None):
+        self.directory = directory
+        self.max_age = max_age or None
+        os.makedirs(directory, exist_ok=True)
+        # Berisi nama file (hash), bukan kunci asli: kunci tidak bisa dibaca balik dari disk
+        self._keys: Set[str] = {name[:-len(_SUFFIX)] for name in os.listdir(directory) if name.endswith(_SUFFIX)}
+        # Sesi yang sudah di-spill tetapi belum ditulis; dikembalikan apa adanya oleh load
+        self._writing: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix='session-spill')
+        self.logger = logging.getLogger(__name__)
+
+        self.write_errors = 0
+        self.expired = 0
+
+    @staticmethod
+    def _name(key: Hashable) -> str:
+        # Kunci apa pun ("../x", "a/b", NUL) menjadi nama file yang aman
+        return hashlib.sha256(str(key).encode('utf-8')).hexdigest()[:32]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{_SUFFIX}")
+
+    def save(self, key: Hashable, session: Any):
+        key = self._name(key)
+        with self._lock:
+            self._keys.add(key)
+            self._writing[key] = session
+        self._io.submit(self._write, key, session)
+
+    def _write(self, key: str, session: Any):
+        try:
+            with self._lock:
+                # Sudah dipulihkan, dihapus, atau diganti spill yang lebih baru
+                if self._writing.get(key) is not session:
+                    return
+                # Di bawah lock: load tidak bisa mengambil alih sesi ini selagi di-pickle
+                data = pickle.dumps(session, protocol=pickle.HIGHEST_PROTOCOL)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(key))
+            except OSError:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except Exception as e:
+            # pickle.PicklingError/TypeError juga: hasil future executor tidak pernah dibaca
+            self.write_errors += 1
+            self.logger.error(f"Gagal menyimpan sesi {key} ke disk: {e}")
+            with self._lock:
+                if self._writing.get(key) is session:
+                    # File lama (jika ada) lebih tua dari sesi yang gagal ditulis; jangan dipulihkan
+                    self._keys.discard(key)
+                    del self._writing[key]
+            self._unlink(key)
+        finally:
+            with self._lock:
+                if self._writing.get(key) is session:
+                    del self._writing[key]
+
+    def load(self, key: Hashable) -> Optional[Any]:
+        key = self._name(key)
+        with self._lock:
+            if key not in self._keys:
+                return None
+            session = self._writing.pop(key, None)
+        if session is not None:
+            return session
+        try:
+            with open(self._path(key), 'rb') as f:
+                return pickle.loads(f.read())
+        except FileNotFoundError:
+            return None
+
+    def delete(self, key: Hashable):
+        key = self._name(key)
+        with self._lock:
+            if key not in self._keys:
+                return
+            self._keys.discard(key)
+            self._writing.pop(key, None)
+        self._io.submit(self._unlink, key)
+
+    def _unlink(self, key: str):
+        with self._lock:
+            if key in self._keys:
+                # Di-spill lagi sebelum penghapusan ini sempat berjalan
+                return
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._name(key) in self._keys
+
+    def expire(self):
+        """Menjadwalkan penghapusan file yang lebih tua dari max_age di thread latar."""
+        if self.max_age is not None:
+            self._io.submit(self._expire)
+
+    def _expire(self):
+        # Berjalan di thread I/O yang sama dengan _write, jadi tidak ada file yang sedang ditulis
+        deadline = time.time() - self.max_age
+        expired = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith((_SUFFIX, '.tmp')):
+                    continue
+                try:
+                    if entry.stat().st_mtime > deadline:
+                        continue
+                except FileNotFoundError:
+                    continue
+                key = entry.name[:-len(_SUFFIX)] if entry.name.endswith(_SUFFIX) else None
+                with self._lock:
+                    if key is not None:
+                        if key in self._writing:
+                            # Di-spill lagi dan menunggu ditulis ulang
+                            continue
+                        self._keys.discard(key)
+                try:
+                    os.unlink(entry.path)
+                    expired += 1
+                except FileNotFoundError:
+                    pass
+        self.expired += expired
+        if expired:
+            self.logger.info(f"{expired} file sesi kedaluwarsa dihapus dari {self.directory}")
+
+    def flush(self):
+        """Menunggu semua tulis dan hapus yang sudah diantrekan."""
+        self._io.submit(lambda: None).result()
+
+    def close(self):
+        self._io.shutdown(wait=True)
+
+class SessionRegistry:
+    def __init__(self, max_sessions: Optional[int] = None, idle_ttl: Optional[float] = None,
+                 spill_store: Optional[Any] = None, write_through: bool = False,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_sessions = max_sessions or None
+        self.idle_ttl = idle_ttl or None
+        self.spill_store = spill_store
+        # write_through: setiap penulisan langsung disimpan (store persisten, mis. SQLite)
+        self.write_through = write_through and spill_store is not None
+        self._clock = clock
+        # Urutan OrderedDict = urutan LRU (paling lama dipakai di depan)
+        self._sessions: 'OrderedDict[Hashable, Tuple[Any, float]]' = OrderedDict()
+        self.logger = logging.getLogger(__name__)
+
+        self.evictions = 0
+        self.expirations = 0
+        self.spills = 0
+        self.restores = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._sessions))
+
+    def __contains__(self, key: Hashable) -> bool:
+        if key in self._sessions:
+            return True
+        return self.spill_store is not None and key in self.spill_store
+
+    def __getitem__(self, key: Hashable) -> Any:
+        session = self.get(key)
+        if session is None:
+            raise KeyError(key)
+        return session
+
+    def __setitem__(self, key: Hashable, session: Any):
+        self._sessions[key] = (session, self._clock())
+        self._sessions.move_to_end(key)
+        if self.write_through:
+            self.spill_store.save(key, session)
+        elif self.spill_store is not None and key in self.spill_store:
+            # Memori adalah sumber kebenaran; salinan di disk (jika ada) sudah usang
+            self.spill_store.delete(key)
+        self._enforce_cap()
+
+    def __delitem__(self, key: Hashable):
+        found = self._sessions.pop(key, None) is not None
+        if self.spill_store is not None and key in self.spill_store:
+            self.spill_store.delete(key)
+            found = True
+        if not found:
+            raise KeyError(key)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._sessions.get(key)
+        if entry is not None:
+            self._sessions[key] = (entry[0], self._clock())
+            self._sessions.move_to_end(key)
+            return entry[0]
+        restored = self._restore(key)
+        return default if restored is None else restored
+
+    async def get_async(self, key: Hashable, default: Any = None) -> Any:
+        """Seperti `get`, tetapi sesi yang harus dipulihkan dibaca dari store di thread, bukan di event loop."""
+        if key in self._sessions or self.spill_store is None or key not in self.spill_store:
+            return self.get(key, default)
+        session = await asyncio.to_thread(self._load, key)
+        if key in self._sessions:
+            # Sudah ditulis ulang selagi menunggu; versi di memori lebih baru
+            return self.get(key, default)
+        return default if session is None else self._adopt(key, session)
+
+    def _load(self, key: Hashable) -> Optional[Any]:
+        try:
+            return self.spill_store.load(key)
+        except Exception as e:
+            self.logger.error(f"Gagal memulihkan sesi {key}: {e}")
+            return None
+
+    def _restore(self, key: Hashable) -> Optional[Any]:
+        if self.spill_store is None:
+            return None
+        session = self._load(key)
+        return None if session is None else self._adopt(key, session)
+
+    def _adopt(self, key: Hashable, session: Any) -> Any:
+        self.restores += 1
+        self._sessions[key] = (session, self._clock())
+        if not self.write_through:
+            self.spill_store.delete(key)
+        self._enforce_cap()
+        return session
+
+    def _evict(self, key: Hashable):
+        session, _ = self._sessions.pop(key)
+        if self.spill_store is None:
+            return
+        try:
+            self.spill_store.save(key, session)
+            self.spills += 1
+        except Exception as e:
+            self.logger.error(f"Gagal menyimpan sesi {key} ke disk: {e}")
+
+    def _enforce_cap(self):
+        if self.max_sessions is None:
+            return
+        while len(self._sessions) > self.max_sessions:
+            oldest = next(iter(self._sessions))
+            self._evict(oldest)
+            self.evictions += 1
+
+    def sweep(self) -> int:
+        """Mengeluarkan semua sesi yang menganggur lebih lama dari idle_ttl."""
+        if self.idle_ttl is None:
+            return 0
+        deadline = self._clock() - self.idle_ttl
+        expired = 0
+        # Entri terurut dari yang paling lama dipakai, jadi bisa berhenti di entri segar pertama
+        while self._sessions:
+            key, (_, last_used) = next(iter(self._sessions.items()))
+            if last_used > deadline:
+                break
+            self._evict(key)
+            expired += 1
+        self.expirations += expired
+        if self.spill_store is not None and not self.write_through:
+            # Sesi yang di-spill tetapi tidak pernah kembali juga kedaluwarsa
+            self.spill_store.expire()
+        return expired
+
+    async def sweep_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            expired = self.sweep()
+            if expired:
+                self.logger.info(f"{expired} sesi menganggur dikeluarkan, {len(self)} sesi aktif")
+
+    def stats(self) -> dict:
+        return {
+            'active': len(self._sessions),
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'spills': self.spills,
+            'restores': self.restores,
+        }
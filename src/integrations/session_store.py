@@ -0,0 +1,188 @@
+"""
+Session Store - Persistensi Sesi di SQLite
+State sesi diserialisasi ringkas (JSON) dan ditulis ke SQLite mode WAL.
+Penulisan per giliran dikumpulkan lalu di-commit bersama; sesi baru dibaca
+dari disk saat user-nya mengirim pesan lagi, bukan saat startup. Yang dimuat
+saat startup hanya himpunan kuncinya, untuk cek keanggotaan tanpa query.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Set
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_key TEXT PRIMARY KEY,
+    state BLOB NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+class SQLiteSessionStore:
+    """
+    Backend persisten untuk SessionRegistry (dipakai dengan write_through=True).
+
+    `save` hanya menaruh snapshot state terbaru (`to_state`) ke buffer; `flush`
+    memindahkan buffer ke peta in-flight, lalu meng-encode JSON dan menulisnya dalam
+    satu transaksi di luar `_lock`, sehingga `save`/`load` dari event loop tidak
+    menunggu encode maupun fsync. `load` melihat buffer dan peta in-flight lebih
+    dulu, jadi pembacaan tidak pernah melihat state yang lebih lama dari tulisan terakhir.
+    """
+
+    def __init__(self, path: str, factory: Callable[[Dict], Any], batch_size: int = 256):
+        self.path = path
+        self.factory = factory
+        self.batch_size = batch_size
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        # Koneksi baca terpisah: di mode WAL pembaca tidak menunggu transaksi flush
+        self._reader = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # _lock hanya menjaga struktur di memori; _flush_lock menjaga transaksi tulis,
+        # _read_lock koneksi baca
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        # Kunci -> snapshot state (dict tipe JSON), atau None untuk penghapusan yang belum ditulis
+        self._pending: Dict[str, Optional[Dict]] = {}
+        # Snapshot yang sedang ditulis oleh flush; tetap terbaca sampai COMMIT selesai
+        self._inflight: Dict[str, Optional[Dict]] = {}
+        # Semua kunci yang ada (di disk atau buffer): `in` tidak pernah menyentuh SQLite
+        self._keys: Set[str] = {row[0] for row in self._conn.execute("SELECT session_key FROM sessions")}
+        self._flush_scheduled = False
+        self.logger = logging.getLogger(__name__)
+
+        self.commits = 0
+        self.rows_written = 0
+
+    @staticmethod
+    def encode(state: Dict) -> bytes:
+        return json.dumps(state, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def save(self, key: Hashable, session: Any):
+        # to_state menyalin state ke tipe JSON baru, jadi aman di-encode nanti di thread lain
+        state = session.to_state()
+        key = str(key)
+        with self._lock:
+            self._pending[key] = state
+            self._keys.add(key)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._flush_soon()
+
+    def _flush_soon(self):
+        """Buffer penuh: flush di thread executor jika dipanggil dari event loop, selain itu langsung."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.run_in_executor(None, self._scheduled_flush)
+
+    def _scheduled_flush(self):
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            self.logger.error(f"Gagal menulis sesi ke {self.path}: {e}")
+        finally:
+            self._flush_scheduled = False
+
+    def delete(self, key: Hashable):
+        key = str(key)
+        with self._lock:
+            self._pending[key] = None
+            self._keys.discard(key)
+
+    def load(self, key: Hashable) -> Optional[Any]:
+        key = str(key)
+        with self._lock:
+            if key not in self._keys:
+                return None
+            if key in self._pending:
+                state = self._pending[key]
+            elif key in self._inflight:
+                state = self._inflight[key]
+            else:
+                state = ...
+        if state is ...:
+            # Tidak ada di memori, berarti tulisan terakhirnya sudah di-commit
+            with self._read_lock:
+                row = self._reader.execute("SELECT state FROM sessions WHERE session_key = ?", (key,)).fetchone()
+            state = json.loads(row[0]) if row else None
+        if state is None:
+            return None
+        return self.factory(state)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return str(key) in self._keys
+
+    def keys(self) -> Set[str]:
+        """Semua kunci sesi yang tersimpan, termasuk tulisan di buffer yang belum di-flush."""
+        with self._lock:
+            return set(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def flush(self) -> int:
+        """Menulis semua perubahan yang tertunda dalam satu transaksi."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                pending, self._pending = self._pending, {}
+                self._inflight = pending
+            try:
+                now = time.time()
+                upserts = [(key, self.encode(state), now) for key, state in pending.items() if state is not None]
+                deletes = [(key,) for key, state in pending.items() if state is None]
+                self._conn.execute("BEGIN")
+                try:
+                    if upserts:
+                        self._conn.executemany(
+                            "INSERT INTO sessions (session_key, state, updated_at) VALUES (?, ?, ?) "
+                            "ON CONFLICT(session_key) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                            upserts)
+                    if deletes:
+                        self._conn.executemany("DELETE FROM sessions WHERE session_key = ?", deletes)
+                    self._conn.execute("COMMIT")
+                except sqlite3.Error:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            except Exception:
+                with self._lock:
+                    # Kembalikan ke buffer tanpa menimpa tulisan yang lebih baru
+                    for key, data in pending.items():
+                        self._pending.setdefault(key, data)
+                    self._inflight = {}
+                raise
+            with self._lock:
+                self._inflight = {}
+            self.commits += 1
+            self.rows_written += len(pending)
+            return len(pending)
+
+    async def flush_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except sqlite3.Error as e:
+                self.logger.error(f"Gagal menulis sesi ke {self.path}: {e}")
+
+    def close(self):
+        self.flush()
+        with self._flush_lock, self._read_lock:
+            self._conn.close()
+            self._reader.close()
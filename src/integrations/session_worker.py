@@ -0,0 +1,235 @@
+"""
+Session Worker - Sesi Chat di Proses Worker Prefork
+SessionWorkerHandler berjalan di dalam worker PreforkPool dan memiliki sesi untuk
+user yang di-hash ke worker tersebut. PreforkSessions adalah sisinya di proses
+gateway: indeks user yang sedang aktif plus API async untuk membuka, melanjutkan
+dan menutup sesi.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Hashable, Optional, Set, Tuple
+
+from core.chatbot import ConversationStage, MentalHealthChatbot
+from core.knowledge_base import get_shared_knowledge_base, reload_shared_knowledge_base
+from core.knowledge_pack import default_pack_path
+from integrations.session_registry import PickleSpillStore, SessionRegistry
+from integrations.session_store import SQLiteSessionStore
+
+if TYPE_CHECKING:
+    from integrations.worker_pool import PreforkPool
+
+class SessionExpiredError(KeyError):
+    """Sesi tidak ada lagi di worker (kedaluwarsa, dikeluarkan, atau worker dimulai ulang)."""
+
+def shard_path(path: str, shard: Optional[int]) -> str:
+    """`sessions.db` -> `sessions.worker2.db`: setiap worker prefork punya file sendiri."""
+    if shard is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.worker{shard}{ext}"
+
+def build_session_registry(shard: Optional[int] = None) -> Tuple[SessionRegistry, Optional[SQLiteSessionStore]]:
+    """
+    Registry sesi sesuai environment: dibatasi SESSION_MAX dan SESSION_IDLE_TTL.
+    SESSION_DB_PATH: sesi persisten di SQLite; SESSION_SPILL_DIR: hanya spill saat dikeluarkan.
+    Dengan `shard` (id worker prefork) database dan folder spill dipisah per worker, sehingga
+    worker tidak saling menunggu lock tulis WAL untuk sesi yang memang bukan miliknya.
+    """
+    db_path = os.getenv('SESSION_DB_PATH')
+    spill_dir = os.getenv('SESSION_SPILL_DIR')
+    if db_path:
+        db_path = shard_path(db_path, shard)
+    if spill_dir and shard is not None:
+        spill_dir = os.path.join(spill_dir, f"worker{shard}")
+    session_store = SQLiteSessionStore(db_path, factory=MentalHealthChatbot.from_state) if db_path else None
+    # Bukan `session_store or ...`: store yang masih kosong bernilai False karena __len__
+    idle_ttl = float(os.getenv('SESSION_IDLE_TTL', '3600'))
+    spill_store = session_store if session_store is not None else (
+        PickleSpillStore(spill_dir, max_age=idle_ttl) if spill_dir else None)
+    registry = SessionRegistry(
+        max_sessions=int(os.getenv('SESSION_MAX', '5000')),
+        idle_ttl=idle_ttl,
+        spill_store=spill_store,
+        write_through=session_store is not None,
+    )
+    return registry, session_store
+
+def greeting_input(display_name: str) -> str:
+    return f"halo, nama saya {display_name}"
+
+def resume_message(display_name: str) -> str:
+    """Balasan 'open' untuk sesi yang ternyata masih tersimpan; state-nya tidak disentuh."""
+    return f"Halo lagi, {display_name}. Kita lanjutkan cerita sebelumnya, ya. Apa yang sedang kamu pikirkan sekarang?"
+
+class SessionWorkerHandler:
+    """Handler di dalam worker: operasi 'open', 'turn' dan 'close' untuk satu user, plus 'keys' untuk indeks gateway."""
+
+    def __init__(self, worker_id: int):
+        self.worker_id = worker_id
+        self.sessions, self.session_store = build_session_registry(worker_id)
+        self.sweep_interval = float(os.getenv('SESSION_SWEEP_INTERVAL', '60'))
+        self.knowledge_pack_path = default_pack_path()
+        self.knowledge_reload_interval = float(os.getenv('KNOWLEDGE_RELOAD_INTERVAL', '30'))
+        self.logger = logging.getLogger(__name__)
+        self._last_sweep = self._last_reload_check = time.monotonic()
+        self._knowledge_mtime = self._pack_mtime()
+
+    def _pack_mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.knowledge_pack_path)
+        except OSError:
+            return None
+
+    def handle(self, op: str, user_id: Hashable, payload: Any) -> Any:
+        if op == 'open':
+            # Sesi yang masih tersimpan (mis. setelah gateway dimulai ulang) dilanjutkan, bukan ditimpa
+            chatbot = self.sessions.get(user_id)
+            if chatbot is not None:
+                return resume_message(payload), chatbot.stage.name
+            chatbot = MentalHealthChatbot(payload)
+            response = chatbot.get_response(greeting_input(payload))
+            self.sessions[user_id] = chatbot
+            return response, chatbot.stage.name
+        if op == 'turn':
+            chatbot = self.sessions[user_id]  # KeyError: sesi sudah kedaluwarsa di worker ini
+            response = chatbot.get_response(payload)
+            self.sessions[user_id] = chatbot
+            return response, chatbot.stage.name
+        if op == 'close':
+            try:
+                del self.sessions[user_id]
+            except KeyError:
+                return False
+            return True
+        if op == 'keys':
+            # None: tidak ada store persisten, indeks gateway cukup dari memori
+            return self.session_store.keys() if self.session_store is not None else None
+        raise ValueError(f"Operasi worker tidak dikenal: {op}")
+
+    def tick(self):
+        now = time.monotonic()
+        if self.session_store is not None:
+            self.session_store.flush()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            self.sessions.sweep()
+        if self.knowledge_reload_interval > 0 and now - self._last_reload_check >= self.knowledge_reload_interval:
+            # Setiap worker memuat ulang sendiri; snapshot membuatnya murah
+            self._last_reload_check = now
+            mtime = self._pack_mtime()
+            if mtime is not None and mtime != self._knowledge_mtime:
+                try:
+                    reload_shared_knowledge_base(self.knowledge_pack_path)
+                    self._knowledge_mtime = mtime
+                except Exception as e:
+                    self.logger.error(f"Worker {self.worker_id} gagal memuat knowledge pack: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {'pid': os.getpid(), **self.sessions.stats()}
+
+    def close(self):
+        if self.session_store is not None:
+            self.session_store.close()
+
+def start_session_workers(workers: int) -> 'PreforkPool':
+    """Memuat konten di proses induk lalu fork worker sesi."""
+    # multiprocessing hanya dimuat jika SESSION_WORKERS dipakai
+    from integrations.worker_pool import PreforkPool
+    return PreforkPool(
+        SessionWorkerHandler, workers,
+        preload=get_shared_knowledge_base,
+        request_timeout=float(os.getenv('SESSION_WORKER_TIMEOUT', '30')),
+        max_missed_pings=int(os.getenv('SESSION_WORKER_MAX_MISSED_PINGS', '3')),
+    ).start()
+
+class PreforkSessions:
+    """
+    Pengganti SessionRegistry di gateway saat sesi berada di worker. Indeks hanya
+    menyimpan user id dan waktu terakhir dipakai, dengan TTL yang sama seperti worker.
+    Dengan SESSION_DB_PATH, kunci sesi yang tersimpan di store worker juga dihitung
+    sebagai sesi aktif, sama seperti SessionRegistry yang melihat store-nya.
+    """
+
+    def __init__(self, pool: 'PreforkPool', idle_ttl: Optional[float] = None):
+        self.pool = pool
+        self.idle_ttl = idle_ttl or None
+        self._active: 'OrderedDict[Hashable, float]' = OrderedDict()
+        # Kunci store (str) untuk sesi yang hanya ada di disk worker, bukan di _active
+        self._stored: Set[str] = set()
+        self.persistent = False
+        self.logger = logging.getLogger(__name__)
+
+    async def restore_index(self) -> int:
+        """
+        Membangun ulang indeks dari store worker; dipanggil sekali saat gateway dimulai.
+        Setiap worker punya shard sendiri. Jika SESSION_WORKERS diubah, sebagian kunci
+        berada di shard worker yang bukan lagi pemiliknya; kunci itu tidak dihitung,
+        karena 'turn' untuknya dikirim ke worker lain yang tidak menyimpannya.
+        """
+        for worker_id, keys in (await self.pool.broadcast('keys')).items():
+            if keys is not None:
+                self.persistent = True
+                self._stored.update(key for key in keys if self.pool.worker_for(key) == worker_id)
+        return len(self._stored)
+
+    def __contains__(self, user_id: Hashable) -> bool:
+        return user_id in self._active or str(user_id) in self._stored
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+    def _touch(self, user_id: Hashable):
+        self._stored.discard(str(user_id))
+        self._active[user_id] = time.monotonic()
+        self._active.move_to_end(user_id)
+
+    async def open(self, user_id: Hashable, display_name: str) -> str:
+        response, _ = await self.pool.request(user_id, 'open', display_name)
+        self._touch(user_id)
+        return response
+
+    async def turn(self, user_id: Hashable, text: str) -> Tuple[str, ConversationStage]:
+        try:
+            response, stage = await self.pool.request(user_id, 'turn', text)
+        except KeyError as e:
+            self._active.pop(user_id, None)
+            self._stored.discard(str(user_id))
+            raise SessionExpiredError(user_id) from e
+        self._touch(user_id)
+        return response, ConversationStage[stage]
+
+    async def close(self, user_id: Hashable):
+        self._active.pop(user_id, None)
+        self._stored.discard(str(user_id))
+        await self.pool.request(user_id, 'close')
+
+    def sweep(self) -> int:
+        if self.idle_ttl is None:
+            return 0
+        deadline = time.monotonic() - self.idle_ttl
+        expired = 0
+        while self._active:
+            user_id, last_used = next(iter(self._active.items()))
+            if last_used > deadline:
+                break
+            del self._active[user_id]
+            if self.persistent:
+                # Worker hanya mengeluarkan sesi ini dari memori; state-nya tetap di store
+                self._stored.add(str(user_id))
+            expired += 1
+        return expired
+
+    async def sweep_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {'active': len(self._active), 'stored': len(self._stored), **self.pool.stats()}
+        for worker_id, worker_stats in sorted(self.pool.last_worker_stats.items()):
+            stats[f"worker{worker_id}_sessions"] = worker_stats.get('active', 0)
+        return stats
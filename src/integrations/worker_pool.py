@@ -0,0 +1,410 @@
+"""
+Prefork Worker Pool - Sesi Tersebar ke Beberapa Proses
+Proses induk memuat konten sekali, membekukan GC (gc.freeze) agar halaman memori
+tetap dibagi copy-on-write, lalu fork satu proses zygote. Semua worker, termasuk
+pengganti, di-fork oleh zygote yang tetap single-threaded, bukan oleh gateway
+yang saat itu sudah menjalankan thread (executor, logging). Setiap key (user id)
+dipetakan ke worker tetap lewat consistent hash, dan permintaan dikirim lewat
+Pipe. Worker yang mati, atau yang beberapa kali berturut-turut tidak menjawab
+ping, diganti dengan worker baru ber-ID sama, sehingga pemetaan key tidak berubah.
+Fork dan handshake worker pengganti berjalan di thread executor, bukan di event
+loop gateway; permintaan untuk worker itu menunggu penggantinya siap.
+"""
+
+import asyncio
+import bisect
+import gc
+import hashlib
+import itertools
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import struct
+import threading
+import time
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+class WorkerCrashedError(RuntimeError):
+    """Worker mati sebelum menjawab; state sesi yang hanya ada di memorinya ikut hilang."""
+
+class HashRing:
+    """Consistent hash dengan virtual node; menambah/mengurangi node hanya memindahkan sebagian key."""
+
+    def __init__(self, nodes: List[int], replicas: int = 64):
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: List[int] = []
+        ring = sorted((self._hash(f"{node}:{i}"), node) for node in nodes for i in range(replicas))
+        for point, node in ring:
+            self._points.append(point)
+            self._owners.append(node)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+    def node_for(self, key: Hashable) -> int:
+        index = bisect.bisect(self._points, self._hash(str(key))) % len(self._points)
+        return self._owners[index]
+
+# Operasi internal pool; operasi lain diteruskan ke handler worker
+_PING = '__ping__'
+_STOP = '__stop__'
+
+def _worker_main(worker_id: int, conn, handler_factory: Callable[[int], Any], tick_interval: float):
+    # Ctrl+C ditangani proses induk, yang kemudian menghentikan worker dengan rapi
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Handler logging milik induk (thread QueueListener) tidak ikut hidup setelah fork
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    logging.basicConfig(level=logging.INFO, format=f'%(asctime)s - worker{worker_id} - %(levelname)s - %(message)s')
+
+    handler = handler_factory(worker_id)
+    next_tick = time.monotonic() + tick_interval
+    try:
+        while True:
+            if conn.poll(max(0.0, next_tick - time.monotonic())):
+                try:
+                    request_id, op, key, payload = conn.recv()
+                except EOFError:
+                    break
+                if op == _STOP:
+                    break
+                try:
+                    result = handler.stats() if op == _PING else handler.handle(op, key, payload)
+                    reply = (request_id, True, result)
+                except Exception as e:
+                    reply = (request_id, False, e)
+                try:
+                    conn.send(reply)
+                except Exception as e:
+                    # Hasil/eksepsi yang tidak bisa di-pickle tetap harus dijawab
+                    conn.send((request_id, False, RuntimeError(f"{type(e).__name__}: {e}")))
+            if time.monotonic() >= next_tick:
+                handler.tick()
+                next_tick = time.monotonic() + tick_interval
+    finally:
+        handler.close()
+        conn.close()
+
+def _zygote_main(sock: socket.socket, parent_sock: socket.socket,
+                 handler_factory: Callable[[int], Any], tick_interval: float):
+    """Menerima worker id dari induk, fork worker, lalu mengirim ujung Pipe induk beserta pid-nya."""
+    # Salinan ujung milik induk ditutup agar zygote melihat EOF saat induk menutup (atau mati)
+    parent_sock.close()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Worker yang keluar langsung dibersihkan kernel, jadi pid-nya tidak tersisa sebagai zombie
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    while True:
+        try:
+            data = sock.recv(4, socket.MSG_WAITALL)
+        except OSError:
+            break
+        if len(data) < 4:
+            break
+        worker_id, = struct.unpack('!i', data)
+        parent_conn, child_conn = multiprocessing.Pipe()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                sock.close()
+                parent_conn.close()
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                _worker_main(worker_id, child_conn, handler_factory, tick_interval)
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+        child_conn.close()
+        socket.send_fds(sock, [struct.pack('!q', pid)], [parent_conn.fileno()])
+        parent_conn.close()
+
+class _WorkerProcess:
+    """Worker yang di-fork zygote bukan anak gateway, jadi dipantau lewat pid-nya."""
+    __slots__ = ('pid',)
+
+    def __init__(self, pid: int):
+        self.pid = pid
+
+    def is_alive(self) -> bool:
+        try:
+            os.kill(self.pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def kill(self):
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def join(self, timeout: Optional[float] = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.is_alive() and (deadline is None or time.monotonic() < deadline):
+            time.sleep(0.01)
+
+class _Worker:
+    __slots__ = ('worker_id', 'process', 'conn', 'pending', 'attached', 'alive', 'missed_pings')
+
+    def __init__(self, worker_id: int, process, conn):
+        self.worker_id = worker_id
+        self.process = process
+        self.conn = conn
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.attached = False
+        self.alive = True
+        self.missed_pings = 0
+
+class PreforkPool:
+    """
+    `handler_factory(worker_id)` dipanggil di dalam worker dan harus mengembalikan objek
+    dengan `handle(op, key, payload)`, `tick()`, `stats()` dan `close()`.
+    `preload()` dipanggil sekali di proses induk sebelum fork (mis. memuat knowledge base).
+    Ping mengantre di belakang giliran dan `tick()`, jadi worker baru diganti setelah
+    `max_missed_pings` ping berturut-turut tidak terjawab.
+    """
+
+    def __init__(self, handler_factory: Callable[[int], Any], workers: Optional[int] = None,
+                 preload: Optional[Callable[[], Any]] = None, replicas: int = 64,
+                 request_timeout: float = 30.0, ping_timeout: float = 5.0, tick_interval: float = 1.0,
+                 max_missed_pings: int = 3):
+        self.handler_factory = handler_factory
+        self.size = workers or os.cpu_count() or 1
+        self.preload = preload
+        self.request_timeout = request_timeout
+        self.ping_timeout = ping_timeout
+        self.tick_interval = tick_interval
+        self.max_missed_pings = max(1, max_missed_pings)
+        self.ring = HashRing(list(range(self.size)), replicas)
+        self.logger = logging.getLogger(__name__)
+        self._context = multiprocessing.get_context('fork')
+        self._workers: List[_Worker] = []
+        self._zygote = None
+        self._zygote_sock: Optional[socket.socket] = None
+        # Handshake zygote (kirim id, terima fd) tidak boleh saling menyela antar thread
+        self._zygote_lock = threading.Lock()
+        self._respawning: Dict[int, asyncio.Task] = {}
+        self._request_ids = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.requests = 0
+        self.respawns = 0
+        self.missed_pings = 0
+        self.last_worker_stats: Dict[int, Any] = {}
+
+    def start(self) -> 'PreforkPool':
+        """Sebaiknya dipanggil sebelum thread lain (logging, executor) berjalan."""
+        if self.preload is not None:
+            self.preload()
+        # Objek yang sudah ada dipindah ke generasi permanen: GC di worker tidak
+        # menyentuhnya, sehingga halaman memorinya tidak ikut tersalin
+        gc.collect()
+        gc.freeze()
+        self._zygote_sock, zygote_sock = socket.socketpair()
+        self._zygote = self._context.Process(
+            target=_zygote_main, args=(zygote_sock, self._zygote_sock, self.handler_factory, self.tick_interval),
+            name="session-zygote", daemon=True)
+        self._zygote.start()
+        zygote_sock.close()
+        self._workers = [self._spawn(worker_id) for worker_id in range(self.size)]
+        return self
+
+    def _spawn(self, worker_id: int) -> _Worker:
+        """
+        Meminta zygote fork satu worker; yang diterima adalah ujung Pipe induk dan pid worker.
+        Blocking, jadi dari event loop hanya dipanggil lewat executor; belum di-attach ke loop.
+        """
+        with self._zygote_lock:
+            self._zygote_sock.sendall(struct.pack('!i', worker_id))
+            data, fds, _, _ = socket.recv_fds(self._zygote_sock, 8, 1)
+        if len(data) < 8 or not fds:
+            raise RuntimeError("Zygote worker berhenti; worker baru tidak bisa dibuat")
+        pid, = struct.unpack('!q', data)
+        return _Worker(worker_id, _WorkerProcess(pid), Connection(fds[0]))
+
+    def _attach(self, worker: _Worker):
+        self._loop.add_reader(worker.conn.fileno(), self._on_readable, worker)
+        worker.attached = True
+
+    def _ensure_attached(self):
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            for worker in self._workers:
+                self._attach(worker)
+
+    def _on_readable(self, worker: _Worker):
+        try:
+            while worker.conn.poll():
+                request_id, ok, value = worker.conn.recv()
+                future = worker.pending.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+        except (EOFError, OSError):
+            self._respawn(worker.worker_id, "pipe tertutup")
+
+    def worker_for(self, key: Hashable) -> int:
+        return self.ring.node_for(key)
+
+    async def request(self, key: Hashable, op: str, payload: Any = None, timeout: Optional[float] = None) -> Any:
+        """Mengirim satu operasi ke worker pemilik `key` dan menunggu hasilnya."""
+        return await self._request(self._workers[self.worker_for(key)], op, key, payload,
+                                   timeout or self.request_timeout)
+
+    async def _request(self, worker: _Worker, op: str, key: Hashable, payload: Any, timeout: float) -> Any:
+        self._ensure_attached()
+        if not worker.alive:
+            replacing = self._respawning.get(worker.worker_id)
+            if replacing is not None:
+                await asyncio.wait_for(asyncio.shield(replacing), timeout)
+            worker = self._workers[worker.worker_id]
+            if not worker.alive:
+                raise WorkerCrashedError(f"Worker {worker.worker_id} sedang dimulai ulang")
+        request_id = next(self._request_ids)
+        future = self._loop.create_future()
+        worker.pending[request_id] = future
+        self.requests += 1
+        try:
+            worker.conn.send((request_id, op, key, payload))
+        except (OSError, ValueError) as e:
+            worker.pending.pop(request_id, None)
+            self._respawn(worker.worker_id, f"gagal mengirim: {e}")
+            raise WorkerCrashedError(f"Worker {worker.worker_id} tidak bisa dihubungi") from e
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            worker.pending.pop(request_id, None)
+
+    async def broadcast(self, op: str, payload: Any = None, timeout: Optional[float] = None) -> Dict[int, Any]:
+        """Mengirim operasi yang sama ke semua worker; hasilnya per worker id."""
+        results = await asyncio.gather(*(self._request(worker, op, None, payload, timeout or self.request_timeout)
+                                         for worker in list(self._workers)))
+        return dict(enumerate(results))
+
+    def _respawn(self, worker_id: int, reason: str) -> Optional[asyncio.Task]:
+        """
+        Melepas worker lama di event loop (cepat), lalu menjadwalkan fork penggantinya
+        di executor. Mengembalikan task penggantian, atau None jika sudah berjalan.
+        """
+        if worker_id in self._respawning:
+            return None
+        old = self._workers[worker_id]
+        if old.alive:
+            old.alive = False
+            self.logger.warning(f"Worker {worker_id} (pid {old.process.pid}) diganti: {reason}")
+        if old.attached:
+            self._loop.remove_reader(old.conn.fileno())
+            old.attached = False
+        for future in old.pending.values():
+            if not future.done():
+                future.set_exception(WorkerCrashedError(f"Worker {worker_id} berhenti: {reason}"))
+        old.pending.clear()
+        old.conn.close()
+        if old.process.is_alive():
+            old.process.kill()
+        task = self._loop.create_task(self._replace(old))
+        self._respawning[worker_id] = task
+        return task
+
+    async def _replace(self, old: _Worker):
+        worker_id = old.worker_id
+        try:
+            worker = await self._loop.run_in_executor(None, self._reap_and_spawn, old)
+        except Exception as e:
+            # Worker tetap tercatat mati; check_health berikutnya mencoba lagi
+            self.logger.error(f"Worker {worker_id} gagal dimulai ulang: {e}")
+            return
+        finally:
+            self._respawning.pop(worker_id, None)
+        self._workers[worker_id] = worker
+        self._attach(worker)
+        self.respawns += 1
+
+    def _reap_and_spawn(self, old: _Worker) -> _Worker:
+        old.process.join(1)
+        return self._spawn(old.worker_id)
+
+    async def check_health(self) -> int:
+        """Ping setiap worker; yang mati atau tidak menjawab dalam ping_timeout diganti."""
+        self._ensure_attached()
+        replaced = 0
+        for worker in list(self._workers):
+            if worker.worker_id in self._respawning:
+                continue
+            if not worker.process.is_alive():
+                self._respawn(worker.worker_id, "proses sudah keluar")
+                replaced += 1
+                continue
+            try:
+                self.last_worker_stats[worker.worker_id] = await self._request(
+                    worker, _PING, None, None, self.ping_timeout)
+                worker.missed_pings = 0
+            except WorkerCrashedError:
+                replaced += 1
+            except asyncio.TimeoutError:
+                # Worker bisa saja sibuk dengan giliran panjang; satu ping terlewat belum berarti macet
+                worker.missed_pings += 1
+                self.missed_pings += 1
+                if worker.missed_pings >= self.max_missed_pings:
+                    self._respawn(worker.worker_id, f"{worker.missed_pings} ping berturut-turut tidak dijawab "
+                                                    f"dalam {self.ping_timeout}s")
+                    replaced += 1
+                else:
+                    self.logger.warning(f"Worker {worker.worker_id} tidak menjawab ping "
+                                        f"({worker.missed_pings}/{self.max_missed_pings})")
+        if self._respawning:
+            await asyncio.gather(*self._respawning.values(), return_exceptions=True)
+        return replaced
+
+    async def health_check_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.check_health()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.size,
+            'workers_alive': sum(1 for w in self._workers if w.process.is_alive()),
+            'worker_requests': self.requests,
+            'worker_pending': sum(len(w.pending) for w in self._workers),
+            'worker_respawns': self.respawns,
+            'worker_missed_pings': self.missed_pings,
+        }
+
+    async def shutdown(self, timeout: float = 5.0):
+        if self._respawning:
+            # Worker pengganti yang sedang di-fork ikut dihentikan di bawah
+            await asyncio.wait(list(self._respawning.values()), timeout=timeout)
+        for worker in self._workers:
+            if worker.attached:
+                self._loop.remove_reader(worker.conn.fileno())
+                worker.attached = False
+            try:
+                worker.conn.send((None, _STOP, None, None))
+            except (OSError, ValueError):
+                pass
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            await asyncio.to_thread(worker.process.join, max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                worker.process.kill()
+            worker.conn.close()
+            worker.alive = False
+        if self._zygote is not None:
+            # Socket tertutup = zygote keluar dari loop-nya
+            self._zygote_sock.close()
+            await asyncio.to_thread(self._zygote.join, max(0.0, deadline - time.monotonic()))
+            if self._zygote.is_alive():
+                self._zygote.kill()
+            self._zygote = None
@@ -2,64 +2,352 @@
 
 """
 Logging utilities for the chatbot
+
+Semua penulisan ke disk terjadi di thread latar belakang:
+  - log teks (FileHandler/console) lewat QueueHandler + QueueListener
+  - log percakapan terstruktur sebagai JSONL per sesi, ditulis per batch
+  - opsional: jurnal transkrip biner dengan indeks offset (transcript_journal)
+    sebagai pengganti JSONL per sesi, bukan tambahan
+Antrean dibatasi; saat kelebihan beban record dibuang dan dihitung, bukan
+menahan thread pemanggil (event loop bot atau worker engine).
 """
 
+import json
 import logging
 import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterable, List, Optional
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler dengan antrean terbatas: record dibuang (dan dihitung) jika antrean penuh."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def queue_listener(logger: logging.Logger) -> Optional[QueueListener]:
+    """Listener yang sedang berjalan untuk `logger`, jika start_queue_logging sudah dipanggil."""
+    for handler in logger.handlers:
+        if isinstance(handler, DroppingQueueHandler) and getattr(handler, 'listener', None):
+            return handler.listener
+    return None
+
+def start_queue_logging(logger: logging.Logger, handlers: Iterable[logging.Handler],
+                        max_queue: int = 10000) -> QueueListener:
+    """
+    Memasang satu DroppingQueueHandler ke `logger` dan menjalankan `handlers` di thread
+    QueueListener. Pemanggilan ulang untuk logger yang sama tidak menambah handler baru.
+    """
+    existing = queue_listener(logger)
+    if existing is not None:
+        return existing
+    log_queue: queue.Queue = queue.Queue(maxsize=max_queue)
+    queue_handler = DroppingQueueHandler(log_queue)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    queue_handler.listener = listener
+    logger.addHandler(queue_handler)
+    listener.start()
+    return listener
+
+def stop_queue_logging(logger: logging.Logger, listener: Optional[QueueListener] = None):
+    """
+    Mengosongkan antrean, menghentikan listener, dan melepas handler antrean dari `logger`.
+    Jika `listener` diisi, hanya handler milik listener itu yang dilepas.
+    """
+    for handler in list(logger.handlers):
+        if isinstance(handler, DroppingQueueHandler) and (listener is None or handler.listener is listener):
+            logger.removeHandler(handler)
+            listener = getattr(handler, 'listener', None)
+            if listener is not None:
+                handler.listener = None
+                listener.stop()
+
+_SAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]')
+
+class _OpenLog:
+    __slots__ = ('file', 'size', 'opened_at')
+
+    def __init__(self, file, size: int, opened_at: float):
+        self.file = file
+        self.size = size
+        self.opened_at = opened_at
+
+class JsonlSessionWriter:
+    """
+    Menulis record ke `<directory>/<session>.jsonl` dengan rotasi berdasarkan ukuran
+    (max_bytes) dan umur file (max_age detik). File lama diganti nama dengan akhiran
+    waktu rotasi. Jumlah file yang terbuka dibatasi (LRU).
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 5 * 2**20, max_age: Optional[float] = 86400,
+                 max_open_files: int = 256):
+        self.directory = directory
+        self.max_bytes = max_bytes or None
+        self.max_age = max_age or None
+        self.max_open_files = max_open_files
+        self._open: 'OrderedDict[str, _OpenLog]' = OrderedDict()
+        self.rotations = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.jsonl")
+
+    def _get(self, name: str) -> _OpenLog:
+        log = self._open.get(name)
+        if log is not None:
+            self._open.move_to_end(name)
+            return log
+        path = self._path(name)
+        file = open(path, 'a', encoding='utf-8')
+        # Seperti TimedRotatingFileHandler: umur file lama dihitung dari mtime-nya
+        opened_at = os.path.getmtime(path) if file.tell() else time.time()
+        log = self._open[name] = _OpenLog(file, file.tell(), opened_at)
+        while len(self._open) > self.max_open_files:
+            _, oldest = self._open.popitem(last=False)
+            oldest.file.close()
+        return log
+
+    def _should_rotate(self, log: _OpenLog, now: float) -> bool:
+        if log.size == 0:
+            return False
+        if self.max_bytes is not None and log.size >= self.max_bytes:
+            return True
+        return self.max_age is not None and now - log.opened_at >= self.max_age
+
+    def _rotate(self, name: str, log: _OpenLog, now: float):
+        log.file.close()
+        del self._open[name]
+        stamp = datetime.fromtimestamp(now).strftime('%Y%m%d-%H%M%S')
+        target = os.path.join(self.directory, f"{name}.{stamp}.jsonl")
+        suffix = 1
+        while os.path.exists(target):
+            target = os.path.join(self.directory, f"{name}.{stamp}-{suffix}.jsonl")
+            suffix += 1
+        os.replace(self._path(name), target)
+        self.rotations += 1
+
+    def write_batch(self, records: List[Dict[str, Any]]):
+        now = time.time()
+        grouped: Dict[str, List[str]] = {}
+        for record in records:
+            name = _SAFE_NAME.sub('_', str(record.get('session', 'global')))
+            grouped.setdefault(name, []).append(json.dumps(record, ensure_ascii=False))
+        for name, lines in grouped.items():
+            log = self._get(name)
+            if self._should_rotate(log, now):
+                self._rotate(name, log, now)
+                log = self._get(name)
+            data = '\n'.join(lines) + '\n'
+            log.file.write(data)
+            log.file.flush()
+            log.size += len(data.encode('utf-8'))
+
+    def close(self):
+        for log in self._open.values():
+            log.file.close()
+        self._open.clear()
+
+_STOP = object()
+
+class SessionLogPipeline:
+    """
+    Antrean terbatas + thread penulis. `emit` tidak pernah menunggu I/O: record
+    dimasukkan dengan put_nowait dan dibuang (dropped += 1) jika antrean penuh.
+    Thread penulis mengambil hingga batch_size record sekaligus, atau apa pun yang
+    ada setiap flush_interval detik. Jika `journal` diisi, setiap batch juga
+    ditulis ke jurnal sebagai satu commit; `writer` boleh None jika jurnal saja
+    yang dipakai.
+    """
+
+    REDACTED_FIELDS = ('user', 'bot')
+
+    def __init__(self, writer: Optional[JsonlSessionWriter], max_queue: int = 10000, batch_size: int = 512,
+                 flush_interval: float = 1.0, redact: bool = False, journal: Optional[Any] = None):
+        if writer is None and journal is None:
+            raise ValueError("SessionLogPipeline butuh writer atau journal")
+        self.writer = writer
+        self.journal = journal
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.redact = redact
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.logger = logging.getLogger(__name__)
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.write_errors = 0
+
+        self._thread = threading.Thread(target=self._run, name='session-log-writer', daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def redact_text(text: str) -> str:
+        # Hanya panjangnya yang disimpan; hash pesan pendek masih bisa ditebak
+        return f"<redacted len={len(text)}>"
+
+    def emit(self, session: Any, event: str, **fields: Any) -> bool:
+        record = {'ts': time.time(), 'session': session, 'event': event, **fields}
+        if self.redact:
+            for key in self.REDACTED_FIELDS:
+                if isinstance(record.get(key), str):
+                    record[key] = self.redact_text(record[key])
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            stop = first is _STOP
+            if not stop:
+                batch.append(first)
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    stop = True
+                else:
+                    batch.append(record)
+            if batch and self.writer is not None:
+                try:
+                    self.writer.write_batch(batch)
+                    self.written += len(batch)
+                    self.batches += 1
+                except Exception as e:
+                    self.write_errors += 1
+                    self.logger.error(f"Gagal menulis {len(batch)} log sesi: {e}")
+            if batch and self.journal is not None:
+                try:
+                    self.journal.write_batch(batch)
+                    if self.writer is None:
+                        self.written += len(batch)
+                        self.batches += 1
+                except Exception as e:
+                    self.write_errors += 1
+                    self.logger.error(f"Gagal menulis {len(batch)} record ke jurnal: {e}")
+            if stop:
+                if self.writer is not None:
+                    self.writer.close()
+                if self.journal is not None:
+                    self.journal.close()
+                return
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """Menunggu antrean habis ditulis lalu menutup file."""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_STOP, timeout=timeout)
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        stats = {
+            'queued': self._queue.qsize(),
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'rotations': self.writer.rotations if self.writer is not None else 0,
+            'write_errors': self.write_errors,
+        }
+        if self.journal is not None:
+            stats.update({f"journal_{k}": v for k, v in self.journal.stats().items()})
+        return stats
 
 class ChatLogger:
-    def __init__(self, log_dir: str = "logs"):
+    def __init__(self, log_dir: str = "logs", redact: bool = False, attach_handlers: bool = True,
+                 max_queue: int = 10000, max_bytes: int = 5 * 2**20, max_age: Optional[float] = 86400,
+                 journal: bool = False):
         self.log_dir = log_dir
         os.makedirs(log_dir, exist_ok=True)
-        
+
         # Create logger
         self.logger = logging.getLogger("MentalHealthBot")
         self.logger.setLevel(logging.INFO)
-        
-        # Create formatters
-        file_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        console_formatter = logging.Formatter(
-            '%(levelname)s: %(message)s'
-        )
-        
-        # File handler
-        log_file = os.path.join(
-            log_dir, 
-            f"chat_{datetime.now().strftime('%Y%m%d')}.log"
-        )
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(logging.INFO)
-        file_handler.setFormatter(file_formatter)
-        
-        # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        console_handler.setFormatter(console_formatter)
-        
-        # Add handlers
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
-    
-    def log_conversation(self, user_id: str, user_input: str, bot_response: str):
+
+        # Handler teks dipasang sekali per proses (dulu setiap instance menambah handler
+        # baru sehingga setiap baris tercetak berulang). attach_handlers=False jika root
+        # logger sudah dikonfigurasi, misalnya oleh setup_logging di bot Discord.
+        if attach_handlers:
+            file_handler = logging.FileHandler(
+                os.path.join(log_dir, f"chat_{datetime.now().strftime('%Y%m%d')}.log"), delay=True)
+            file_handler.setLevel(logging.INFO)
+            file_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+            console_handler = logging.StreamHandler()
+            console_handler.setLevel(logging.INFO)
+            console_handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
+
+            # Listener yang sudah dipasang instance lain dipakai bersama, tetapi hanya
+            # pemasangnya yang boleh menghentikannya
+            self._owns_listener = queue_listener(self.logger) is None
+            self.listener = start_queue_logging(self.logger, [file_handler, console_handler], max_queue)
+            self.logger.propagate = False
+        else:
+            self._owns_listener = False
+            self.listener = None
+
+        # Log percakapan terstruktur: satu file JSONL per sesi, atau jika diminta
+        # hanya jurnal transkrip di <log_dir>/journal untuk dibaca ulang/diekspor
+        writer, transcript_journal = None, None
+        if journal:
+            from .transcript_journal import TranscriptJournal
+            transcript_journal = TranscriptJournal(os.path.join(log_dir, 'journal'))
+        else:
+            writer = JsonlSessionWriter(os.path.join(log_dir, 'sessions'), max_bytes=max_bytes, max_age=max_age)
+        self.sessions = SessionLogPipeline(writer, max_queue=max_queue, redact=redact, journal=transcript_journal)
+
+    def log_conversation(self, user_id: str, user_input: str, bot_response: str, **fields: Any):
         """Log a conversation exchange"""
-        self.logger.info(f"User {user_id}: {user_input}")
-        self.logger.info(f"Bot: {bot_response}")
-    
+        self.sessions.emit(user_id, 'turn', user=user_input, bot=bot_response, **fields)
+
     def log_session_start(self, user_id: str):
         """Log session start"""
+        self.sessions.emit(user_id, 'session_start')
         self.logger.info(f"Session started for user {user_id}")
-    
+
     def log_session_end(self, user_id: str, duration: Optional[int] = None):
         """Log session end"""
+        self.sessions.emit(user_id, 'session_end', duration=duration)
         if duration:
             self.logger.info(f"Session ended for user {user_id} (Duration: {duration}s)")
         else:
             self.logger.info(f"Session ended for user {user_id}")
-    
+
     def log_error(self, error: Exception, context: str = ""):
         """Log an error"""
-        self.logger.error(f"Error in {context}: {str(error)}", exc_info=True)
\ No newline at end of file
+        self.logger.error(f"Error in {context}: {str(error)}", exc_info=True)
+
+    def stats(self) -> Dict[str, int]:
+        return self.sessions.stats()
+
+    def close(self):
+        self.sessions.close()
+        if self.listener is not None and self._owns_listener:
+            stop_queue_logging(self.logger, self.listener)
+        self.listener = None
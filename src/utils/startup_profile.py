@@ -0,0 +1,122 @@
+"""
+Startup Profile - Waktu Import dan Respons Pertama per Mode
+Setiap pengukuran dijalankan di interpreter baru agar modul yang sudah ter-cache
+tidak menyembunyikan biaya cold start:
+  - rincian waktu import (`python -X importtime`) dikelompokkan per paket,
+  - waktu dari proses dimulai sampai respons pertama engine.
+
+    python main.py startup-profile
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+SRC_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modul yang dimuat setiap mode main.py sebelum bisa melayani pesan
+MODE_MODULES = {
+    'cli': 'core.chatbot',
+    'server': 'integrations.http_server',
+    'discord': 'integrations.discord_bot',
+}
+
+# Dijalankan di proses anak: waktu (epoch) setelah import, setelah warm_up, dan setelah respons pertama
+_FIRST_RESPONSE_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {src!r})
+from core.chatbot import MentalHealthChatbot, warm_up
+imported = time.time()
+warm_up()
+warmed = time.time()
+MentalHealthChatbot('User').get_response('halo, nama saya User')
+print(json.dumps({{'imported': imported, 'warmed': warmed, 'responded': time.time()}}))
+"""
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    """Mengurai stderr `-X importtime` (baris 'import time: self | cumulative | nama')."""
+    records = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # baris judul
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        records.append(ImportRecord(stripped, int(fields[0]), int(fields[1]), (len(name) - len(stripped) - 1) // 2))
+    return records
+
+def _child_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = SRC_PATH + os.pathsep + env.get('PYTHONPATH', '')
+    # .pyc tetap dipakai seperti saat deploy; yang diukur hanya import, bukan kompilasi
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return env
+
+def import_breakdown(module: str) -> Dict:
+    """Rincian import satu modul di interpreter baru; `error` terisi jika import gagal."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, env=_child_env())
+    records = parse_importtime(result.stderr)
+    by_package: Dict[str, int] = {}
+    for record in records:
+        package = record.module.split('.')[0]
+        by_package[package] = by_package.get(package, 0) + record.self_us
+    error = None
+    if result.returncode != 0:
+        error = next((line for line in reversed(result.stderr.splitlines()) if line.strip()), 'import gagal')
+    return {
+        'module': module,
+        'total_ms': sum(record.self_us for record in records) / 1000,
+        'packages': sorted(by_package.items(), key=lambda item: item[1], reverse=True),
+        'modules': {record.module for record in records},
+        'error': error,
+    }
+
+def first_response_timing(repeats: int = 5) -> Dict[str, float]:
+    """Median (ms) dari proses dimulai sampai import selesai, warm-up selesai, dan respons pertama."""
+    samples: Dict[str, List[float]] = {'imported': [], 'warmed': [], 'responded': []}
+    script = _FIRST_RESPONSE_SCRIPT.format(src=SRC_PATH)
+    for _ in range(repeats):
+        started = time.time()
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True,
+                                env=_child_env(), check=True).stdout
+        marks = json.loads(output.strip().splitlines()[-1])
+        for key in samples:
+            samples[key].append((marks[key] - started) * 1000)
+    return {f"{key}_ms": statistics.median(values) for key, values in samples.items()}
+
+def run_startup_profile(modes: Optional[List[str]] = None, repeats: int = 5, top: int = 10):
+    """Mencetak rincian import per mode dan waktu sampai respons pertama."""
+    print("=" * 60)
+    print("STARTUP PROFILE")
+    print("=" * 60)
+    for mode in modes or list(MODE_MODULES):
+        breakdown = import_breakdown(MODE_MODULES[mode])
+        print(f"\n[{mode}] import {breakdown['module']}: {breakdown['total_ms']:.1f} ms")
+        if breakdown['error']:
+            print(f"  (tidak bisa dimuat: {breakdown['error']})")
+            continue
+        for package, self_us in breakdown['packages'][:top]:
+            print(f"  {package:<28} {self_us / 1000:8.2f} ms")
+        heavy = sorted(name for name in ('discord', 'dotenv', 'aiohttp', 'multiprocessing', 'http.server')
+                       if name in breakdown['modules'])
+        print(f"  modul berat yang dimuat: {', '.join(heavy) or '-'}")
+
+    timing = first_response_timing(repeats)
+    print(f"\nRespons pertama engine (median {repeats}x, termasuk start interpreter):")
+    print(f"  import selesai      {timing['imported_ms']:8.1f} ms")
+    print(f"  warm-up selesai     {timing['warmed_ms']:8.1f} ms")
+    print(f"  respons pertama     {timing['responded_ms']:8.1f} ms")
+    print("=" * 60)
@@ -0,0 +1,367 @@
+"""
+Transcript Journal - Jurnal Transkrip Append-Only dengan Indeks Offset
+Setiap record (dict yang sama dengan log sesi JSONL) ditulis sebagai
+[panjang u32][crc32 u32][JSON], dan untuk setiap record indeksnya mendapat entri
+berukuran tetap [hash sesi u64][offset u64][panjang u32]. Pembaca me-mmap
+keduanya sehingga giliran ke-n dari sebuah sesi dibaca langsung dari offset-nya
+tanpa mem-parsing isi file.
+
+Penulisan dikumpulkan di buffer dan di-commit bersama: satu write + satu fsync
+untuk seluruh batch. Indeks tidak di-fsync; jika tertinggal dari data setelah
+crash, bagian yang hilang dibangun ulang saat jurnal dibuka lagi, dan record
+terakhir yang terpotong dibuang.
+
+    python -m src.utils.transcript_journal logs/journal --session 42 --turn -1
+    python -m src.utils.transcript_journal logs/journal --export transkrip.jsonl
+"""
+
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+_HEADER = struct.Struct('<II')     # panjang payload, crc32 payload
+_ENTRY = struct.Struct('<QQI')     # hash sesi, offset record, panjang payload
+_DATA_SUFFIX = '.journal'
+_INDEX_SUFFIX = '.index'
+
+def session_hash(session: Hashable) -> int:
+    return int.from_bytes(hashlib.blake2b(str(session).encode('utf-8'), digest_size=8).digest(), 'little')
+
+def _segment_name(directory: str, segment: int, suffix: str) -> str:
+    return os.path.join(directory, f"{segment:06d}{suffix}")
+
+def _list_segments(directory: str) -> List[int]:
+    segments = []
+    for name in os.listdir(directory):
+        stem, suffix = os.path.splitext(name)
+        if suffix == _DATA_SUFFIX and stem.isdigit():
+            segments.append(int(stem))
+    return sorted(segments)
+
+def _encode(record: Dict[str, Any]) -> bytes:
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+class _Pending:
+    __slots__ = ('segment', 'data', 'index')
+
+    def __init__(self, segment: int):
+        self.segment = segment
+        self.data = bytearray()
+        self.index = bytearray()
+
+class TranscriptJournal:
+    """
+    Penulis jurnal. `append` hanya menambah ke buffer (aman dipanggil dari event loop);
+    `commit` menulis buffer ke disk. Jika dipakai sebagai writer SessionLogPipeline,
+    setiap batch pipeline menjadi satu commit.
+    """
+
+    def __init__(self, directory: str, max_segment_bytes: int = 256 * 2**20, commit_bytes: int = 2**20,
+                 fsync: bool = True):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.commit_bytes = commit_bytes
+        self.fsync = fsync
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()          # melindungi buffer
+        self._commit_lock = threading.Lock()   # satu commit sekaligus; append tetap jalan selama fsync
+        segments = _list_segments(directory)
+        self.recovered = 0
+        segment = segments[-1] if segments else 1
+        self._end = self._recover(segment)
+        self._pending = [_Pending(segment)]
+        self._files: Optional[Tuple[int, Any, Any]] = None
+
+        self.appended = 0
+        self.commits = 0
+        self.bytes_written = 0
+
+    def _recover(self, segment: int) -> int:
+        """Menyelaraskan indeks dengan data segmen terakhir; mengembalikan panjang data yang valid."""
+        data_path = _segment_name(self.directory, segment, _DATA_SUFFIX)
+        index_path = _segment_name(self.directory, segment, _INDEX_SUFFIX)
+        if not os.path.exists(data_path):
+            return 0
+        with open(data_path, 'rb') as f:
+            data = f.read()
+        index = b''
+        if os.path.exists(index_path):
+            with open(index_path, 'rb') as f:
+                index = f.read()
+        index_size = len(index)
+        index = index[:len(index) - len(index) % _ENTRY.size]
+        end = 0
+        entries = len(index) // _ENTRY.size
+        # Entri indeks yang menunjuk melewati data (data belum sempat tertulis) dibuang
+        while entries:
+            _, offset, length = _ENTRY.unpack_from(index, (entries - 1) * _ENTRY.size)
+            if offset + _HEADER.size + length <= len(data):
+                end = offset + _HEADER.size + length
+                break
+            entries -= 1
+        index = bytearray(index[:entries * _ENTRY.size])
+
+        # Record setelah entri terakhir: indeks dibangun ulang, record terpotong dibuang
+        while end + _HEADER.size <= len(data):
+            length, crc = _HEADER.unpack_from(data, end)
+            payload = data[end + _HEADER.size:end + _HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            try:
+                session = json.loads(payload)['session']
+            except (ValueError, KeyError, TypeError):
+                break
+            index += _ENTRY.pack(session_hash(session), end, length)
+            end += _HEADER.size + length
+            self.recovered += 1
+        if end != len(data) or len(index) != index_size:
+            with open(data_path, 'r+b') as f:
+                f.truncate(end)
+            with open(index_path, 'wb') as f:
+                f.write(index)
+            self.logger.warning(f"Jurnal {data_path}: {self.recovered} entri indeks dibangun ulang, "
+                                f"{len(data) - end} byte di akhir dibuang")
+        return end
+
+    def append(self, session: Hashable, record: Dict[str, Any]):
+        """Menambah satu record; `record['session']` diisi jika belum ada."""
+        if 'session' not in record:
+            record = {'session': session, **record}
+        payload = _encode(record)
+        size = _HEADER.size + len(payload)
+        with self._lock:
+            pending = self._pending[-1]
+            if self._end and self._end + size > self.max_segment_bytes:
+                pending = _Pending(pending.segment + 1)
+                self._pending.append(pending)
+                self._end = 0
+            pending.index += _ENTRY.pack(session_hash(session), self._end, len(payload))
+            pending.data += _HEADER.pack(len(payload), zlib.crc32(payload))
+            pending.data += payload
+            self._end += size
+            self.appended += 1
+            full = sum(len(p.data) for p in self._pending) >= self.commit_bytes
+        if full:
+            self.commit()
+
+    def write_batch(self, records: List[Dict[str, Any]]):
+        """Antarmuka writer SessionLogPipeline: satu batch, satu commit."""
+        for record in records:
+            self.append(record.get('session'), record)
+        self.commit()
+
+    def _segment_files(self, segment: int):
+        if self._files is not None and self._files[0] == segment:
+            return self._files
+        self._close_files()
+        data = open(_segment_name(self.directory, segment, _DATA_SUFFIX), 'ab')
+        index = open(_segment_name(self.directory, segment, _INDEX_SUFFIX), 'ab')
+        self._files = (segment, data, index)
+        return self._files
+
+    def _close_files(self):
+        if self._files is not None:
+            _, data, index = self._files
+            data.close()
+            index.close()
+            self._files = None
+
+    def commit(self) -> int:
+        """Menulis semua record yang tertunda: data lalu fsync, baru indeksnya. Mengembalikan jumlah byte."""
+        with self._commit_lock:
+            with self._lock:
+                pending = [p for p in self._pending if p.data]
+                self._pending = [_Pending(self._pending[-1].segment)]
+            written = 0
+            for group in pending:
+                _, data, index = self._segment_files(group.segment)
+                data.write(group.data)
+                data.flush()
+                if self.fsync:
+                    os.fsync(data.fileno())
+                # Indeks ditulis setelah datanya aman, jadi tidak pernah menunjuk ke data yang hilang
+                index.write(group.index)
+                index.flush()
+                written += len(group.data)
+            if written:
+                self.commits += 1
+                self.bytes_written += written
+            return written
+
+    async def commit_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.commit)
+            except OSError as e:
+                self.logger.error(f"Gagal commit jurnal {self.directory}: {e}")
+
+    def close(self):
+        self.commit()
+        with self._commit_lock:
+            self._close_files()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            buffered = sum(len(p.data) for p in self._pending)
+        return {
+            'appended': self.appended,
+            'commits': self.commits,
+            'bytes_written': self.bytes_written,
+            'buffered_bytes': buffered,
+            'recovered': self.recovered,
+        }
+
+class _Segment:
+    __slots__ = ('data', 'index', 'entries', '_files')
+
+    def __init__(self, data_path: str, index_path: str):
+        self._files = []
+        # Indeks dibaca lebih dulu: setiap entrinya menunjuk ke data yang sudah ada
+        self.index = self._map(index_path)
+        self.entries = len(self.index) // _ENTRY.size
+        self.data = self._map(data_path)
+
+    def _map(self, path: str):
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return b''
+        self._files.append(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        for view in (self.data, self.index):
+            if isinstance(view, mmap.mmap):
+                view.close()
+        for f in self._files:
+            f.close()
+
+class JournalReader:
+    """
+    Pembaca jurnal berbasis mmap. Peta sesi -> nomor entri dibangun sekali dari indeks
+    (4 byte per giliran); isi record hanya di-decode saat diminta.
+    """
+
+    def __init__(self, directory: str, verify: bool = True):
+        self.directory = directory
+        self.verify = verify
+        self._segments = [_Segment(_segment_name(directory, s, _DATA_SUFFIX), _segment_name(directory, s, _INDEX_SUFFIX))
+                          for s in _list_segments(directory)]
+        self._starts: List[int] = []
+        total = 0
+        for segment in self._segments:
+            self._starts.append(total)
+            total += segment.entries
+        self._total = total
+        self._by_session: Optional[Dict[int, array]] = None
+
+    def __enter__(self) -> 'JournalReader':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._total
+
+    def _session_map(self) -> Dict[int, array]:
+        if self._by_session is None:
+            by_session: Dict[int, array] = {}
+            number = 0
+            for segment in self._segments:
+                for key, _, _ in _ENTRY.iter_unpack(segment.index[:segment.entries * _ENTRY.size]):
+                    positions = by_session.get(key)
+                    if positions is None:
+                        positions = by_session[key] = array('I')
+                    positions.append(number)
+                    number += 1
+            self._by_session = by_session
+        return self._by_session
+
+    def _entry(self, number: int) -> Dict[str, Any]:
+        segment_no = bisect.bisect_right(self._starts, number) - 1
+        segment = self._segments[segment_no]
+        _, offset, length = _ENTRY.unpack_from(segment.index, (number - self._starts[segment_no]) * _ENTRY.size)
+        start = offset + _HEADER.size
+        payload = segment.data[start:start + length]
+        if self.verify:
+            stored_length, crc = _HEADER.unpack_from(segment.data, offset)
+            if stored_length != length or zlib.crc32(payload) != crc:
+                raise ValueError(f"Record jurnal #{number} rusak (offset {offset})")
+        return json.loads(payload)
+
+    def _positions(self, session: Hashable) -> array:
+        return self._session_map().get(session_hash(session), array('I'))
+
+    def session_count(self) -> int:
+        return len(self._session_map())
+
+    def turn_count(self, session: Hashable) -> int:
+        return len(self._positions(session))
+
+    def read_turn(self, session: Hashable, turn: int) -> Dict[str, Any]:
+        """Record ke-`turn` (0 = pertama, -1 = terakhir) dari sesi; IndexError jika tidak ada."""
+        return self._entry(self._positions(session)[turn])
+
+    def iter_session(self, session: Hashable, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        for number in self._positions(session)[start:stop]:
+            yield self._entry(number)
+
+    def sessions(self) -> Iterator[Any]:
+        """Kunci setiap sesi, diambil dari record pertamanya."""
+        for positions in self._session_map().values():
+            yield self._entry(positions[0]).get('session')
+
+    def iter_records(self, start: int = 0) -> Iterator[Dict[str, Any]]:
+        """Semua record sesuai urutan tulis, mulai dari nomor entri `start`."""
+        for number in range(start, self._total):
+            yield self._entry(number)
+
+    def close(self):
+        for segment in self._segments:
+            segment.close()
+        self._segments = []
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Membaca atau mengekspor jurnal transkrip")
+    parser.add_argument('directory')
+    parser.add_argument('--session', help="tampilkan record sesi ini")
+    parser.add_argument('--turn', type=int, help="hanya giliran ke-n (boleh negatif)")
+    parser.add_argument('--export', metavar='FILE', help="tulis semua record sebagai JSONL ('-' untuk stdout)")
+    args = parser.parse_args(argv)
+
+    with JournalReader(args.directory) as reader:
+        if args.session is not None:
+            records = ([reader.read_turn(args.session, args.turn)] if args.turn is not None
+                       else reader.iter_session(args.session))
+            for record in records:
+                print(json.dumps(record, ensure_ascii=False))
+        elif args.export:
+            out = sys.stdout if args.export == '-' else open(args.export, 'w', encoding='utf-8')
+            try:
+                for record in reader.iter_records():
+                    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+        else:
+            print(f"{len(reader):,} record, {reader.session_count():,} sesi")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,68 @@
+# tests/test_cache.py
+"""
+Unit tests untuk DetectionCache: normalisasi kunci, LRU, dan kunci per versi knowledge base.
+"""
+
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.cache import DetectionCache, LRUCache, normalize_input
+from src.core.chatbot import MentalHealthChatbot
+from src.core.knowledge_base import KnowledgeBase, get_shared_knowledge_base
+from src.core.knowledge_pack import load_pack
+
+class TestDetectionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = DetectionCache(max_entries=8, max_key_length=40)
+        self.kb = get_shared_knowledge_base()
+
+    def test_01_repeated_phrases_hit_after_normalization(self):
+        first = self.cache.scan_themes(self.kb, "Capek")
+        second = self.cache.scan_themes(self.kb, "  capek ")
+        self.assertIs(first, second)
+        self.assertEqual(self.cache.themes.hits, 1)
+        self.assertEqual(self.cache.themes.misses, 1)
+        self.assertEqual(normalize_input("Ga   Tauuu"), "tidak tahu")
+
+    def test_02_theme_entries_are_keyed_by_knowledge_version(self):
+        self.cache.scan_themes(self.kb, "capek")
+        # Pack yang sama berbagi entri; konten lain (reload, KB ad-hoc) punya entri sendiri
+        self.cache.scan_themes(KnowledgeBase(), "capek")
+        self.assertEqual(self.cache.themes.misses, 1)
+        content, matcher, _ = load_pack()
+        other = KnowledgeBase(content, matcher, version='lain')
+        for _ in range(2):
+            self.cache.scan_themes(other, "capek")
+            self.cache.scan_themes(self.kb, "capek")
+        # Bergantian antar KB tidak saling mengosongkan cache
+        self.assertEqual(self.cache.themes.misses, 2)
+        self.assertEqual(self.cache.themes.hits, 4)
+        self.assertNotEqual(KnowledgeBase(content).cache_token, KnowledgeBase(content).cache_token)
+
+    def test_03_long_inputs_bypass_cache(self):
+        self.cache.scan_themes(self.kb, "aku capek " * 10)
+        self.assertEqual(len(self.cache.themes), 0)
+
+    def test_04_lru_eviction(self):
+        lru = LRUCache(max_entries=2)
+        lru.put('a', 1)
+        lru.put('b', 2)
+        lru.get('a')
+        lru.put('c', 3)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('a'), 1)
+        self.assertEqual(lru.evictions, 1)
+
+    def test_05_chatbot_uses_cache_for_fallback_rules(self):
+        chatbot = MentalHealthChatbot("A", detection_cache=self.cache)
+        for text in ("halo", "hmm", "hmm", "hmm"):
+            chatbot.get_response(text)
+        self.assertEqual(self.cache.rules.hits, 2)
+        self.assertEqual(self.cache.themes.hits, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,7 @@ Unit tests for the Mental Health Chatbot (V8 - The Relationship Expert, Final Ve
 Verifies the final logic for natural conversation flow, memory, and proactive reflection.
 """
 
+import pickle
 import unittest
 import sys
 import os
@@ -11,7 +12,8 @@ import os
 # Menambahkan direktori root ke path agar bisa mengimpor dari src
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.core.chatbot import MentalHealthChatbot, ConversationStage
+from src.core.chatbot import MentalHealthChatbot, ConversationStage, get_batch_responses
+from src.core.history import RESPONSES
 
 class TestMentalHealthChatbotV8Final(unittest.TestCase):
 
@@ -57,7 +59,7 @@ class TestMentalHealthChatbotV8Final(unittest.TestCase):
         self.chatbot.get_response("halo")
         self.chatbot.get_response("pacarku marah-marah terus") # Count = 1, Topik: kemarahan
         self.chatbot.get_response("dia bilang aku nggak pernah dengerin") # Count = 2
-        response = self.chatbot.get_response("aku jadi bingung harus gimana") # Count = 3, memicu refleksi
+        response = self.chatbot.get_response("aku jadi nggak ngerti harus gimana") # Count = 3, memicu refleksi
         
         self.assertEqual(self.chatbot.stage, ConversationStage.POST_REFLECTION, "Bot harus beralih ke state POST_REFLECTION.")
         self.assertIn("**Sebuah Refleksi:**", response, "Respons harus mengandung bagian refleksi.")
@@ -105,5 +107,80 @@ class TestMentalHealthChatbotV8Final(unittest.TestCase):
         self.assertIn("stres akademik", closing_response)
         self.assertTrue(any(quote in closing_response for quote in self.chatbot.knowledge_base.motivational_quotes))
 
+    def test_07_batch_matches_sequential_state(self):
+        """
+        Kasus 7: Batch berisi beberapa sesi (dan beberapa pesan dari sesi yang sama) menghasilkan state yang sama.
+        """
+        script = [("A", "halo"), ("B", "halo"), ("A", "aku capek banget sama kuliah"),
+                  ("B", "aku lagi cemas banget"), ("A", "rasanya pusing"), ("B", "sudah, itu saja")]
+        sequential = {name: MentalHealthChatbot(name) for name in "AB"}
+        for name, text in script:
+            sequential[name].get_response(text)
+
+        batched = {name: MentalHealthChatbot(name) for name in "AB"}
+        responses = get_batch_responses([(batched[name], text) for name, text in script])
+
+        self.assertEqual(len(responses), len(script))
+        for name in "AB":
+            self.assertEqual(batched[name].stage, sequential[name].stage)
+            self.assertEqual(batched[name].last_topic, sequential[name].last_topic)
+            self.assertEqual(batched[name].topic_exploration_count, sequential[name].topic_exploration_count)
+        self.assertIn("**Sebuah Refleksi:**", responses[-1])
+
+    def test_08_history_is_bounded_with_rolling_totals(self):
+        """
+        Kasus 8: Riwayat dibatasi MAX_CONVERSATION_LENGTH, tetapi total giliran tetap dihitung.
+        """
+        chatbot = MentalHealthChatbot("TestUser", max_history=4)
+        for text in ["halo", "aku lelah banget", "pokoknya capek aja", "hmm", "hmm lagi", "masih capek"]:
+            chatbot.get_response(text)
+        history = chatbot.conversation_history
+        self.assertEqual(len(history), 4)
+        self.assertEqual(history.total_turns, 6)
+        self.assertEqual(history[0].user, "pokoknya capek aja")
+        self.assertIsNotNone(history[-1].bot_response)
+
+        # ID respons hanya berlaku per proses; pickle harus membawa teks aslinya
+        copy = pickle.loads(pickle.dumps(chatbot))
+        self.assertEqual([t.bot_response for t in copy.conversation_history],
+                         [t.bot_response for t in history])
+        self.assertEqual(copy.conversation_history.total_turns, 6)
+
+    def test_09_closing_summary_ranks_themes_incrementally(self):
+        """
+        Kasus 9: Ringkasan memakai statistik per giliran, urut dari tema yang paling sering muncul,
+        termasuk dari giliran yang sudah keluar dari riwayat.
+        """
+        chatbot = MentalHealthChatbot("TestUser", max_history=3)
+        for text in ["halo", "skripsi bikin pusing", "aku capek", "capek banget", "masih capek", "hmm"]:
+            chatbot.get_response(text)
+
+        insights = chatbot.insights
+        self.assertEqual(insights.ranked_themes(), ['kelelahan', 'stres akademik'])
+        self.assertEqual(insights.themes['stres akademik'].first_turn, 2)
+        self.assertEqual(insights.themes['kelelahan'].count, 3)
+        self.assertEqual(insights.themes['kelelahan'].last_turn, 5)
+
+        closing_response = chatbot.get_response("stop")
+        self.assertIn("**kelelahan, stres akademik**", closing_response)
+        self.assertIn("(3 kali)", closing_response)
+
+    def test_10_only_templates_are_interned(self):
+        """
+        Kasus 10: Hanya template statis yang masuk tabel respons; sapaan bernama,
+        gabungan validasi+pertanyaan, dan ringkasan disimpan apa adanya.
+        """
+        before = len(RESPONSES)
+        for i in range(20):
+            chatbot = MentalHealthChatbot(f"User{i}")
+            for text in ["halo", "aku capek banget sama kuliah", "tugasnya banyak", "masih capek", "stop"]:
+                chatbot.get_response(text)
+        self.assertEqual(len(RESPONSES), before)
+        history = chatbot.conversation_history
+        self.assertIsInstance(history[0].response_id, str)   # sapaan dengan nama
+        self.assertIsInstance(history[3].response_id, int)   # pertanyaan mendalam dari pack
+        self.assertEqual(RESPONSES.resolve(history[3].response_id), history[3].bot_response)
+        self.assertIsInstance(history[-1].response_id, str)  # ringkasan penutup
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,79 @@
+# tests/test_executor.py
+"""
+Unit tests untuk EngineExecutor: urutan per user dan paralelisme antar user.
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.chatbot import MentalHealthChatbot
+from src.integrations.executor import EngineExecutor, run_engine_turn
+
+class TestEngineExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = EngineExecutor(mode='thread', max_workers=4, lag_interval=0.01)
+
+    def tearDown(self):
+        asyncio.run(self.executor.shutdown())
+
+    def test_01_turns_of_one_user_stay_in_order(self):
+        order = []
+
+        async def turn(i):
+            # Giliran awal sengaja lebih lambat; urutan tetap harus dijaga
+            await self.executor.call(time.sleep, 0.02 if i == 0 else 0)
+            order.append(self.executor.queued_turns if i == 0 else i)
+
+        async def scenario():
+            await asyncio.gather(*[self.executor.submit('user', lambda i=i: turn(i)) for i in range(5)])
+
+        asyncio.run(scenario())
+        # Giliran pertama masih melihat kelima giliran di antrean
+        self.assertEqual(order, [5, 1, 2, 3, 4])
+        self.assertEqual(self.executor.max_queue_depth, 5)
+        self.assertEqual(self.executor.stats()['queued_turns'], 0)
+        self.assertEqual(self.executor.queued_turns, 0)
+
+    def test_02_different_users_run_in_parallel(self):
+        barrier = threading.Barrier(2, timeout=2)
+
+        async def scenario():
+            jobs = [self.executor.submit(key, lambda: self.executor.call(barrier.wait)) for key in ('a', 'b')]
+            await asyncio.gather(*jobs)
+
+        # Barrier hanya lolos jika kedua user berjalan bersamaan di pool
+        asyncio.run(scenario())
+
+    def test_03_failed_turn_does_not_block_queue(self):
+        async def fail():
+            raise RuntimeError("engine error")
+
+        async def scenario():
+            first = self.executor.submit('user', fail)
+            second = self.executor.submit('user', lambda: self.executor.call(run_engine_turn, MentalHealthChatbot("A"), "halo"))
+            results = await asyncio.gather(first, second, return_exceptions=True)
+            return results
+
+        failed, (chatbot, response) = asyncio.run(scenario())
+        self.assertIsInstance(failed, RuntimeError)
+        self.assertIn("Halo A!", response)
+
+    def test_04_loop_lag_is_measured(self):
+        async def scenario():
+            self.executor.start_lag_monitor()
+            await asyncio.sleep(0.02)
+            time.sleep(0.05)  # blokir event loop dengan sengaja
+            await asyncio.sleep(0.03)
+
+        asyncio.run(scenario())
+        self.assertGreater(self.executor.stats()['loop_lag_max_ms'], 20)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+# tests/test_flow.py
+"""
+Unit tests untuk kompilasi alur percakapan: tabel pemicu per stage, prioritas
+pemicu, rute Reply/Goto, validasi spesifikasi, dan penambahan stage baru tanpa
+mengubah dispatcher.
+"""
+
+import unittest
+import sys
+import os
+from enum import Enum, auto
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.chatbot import CONVERSATION_FLOW, ConversationStage, MentalHealthChatbot
+from src.core.flow import Goto, Reply, TurnInput, compile_flow
+
+class Stage(Enum):
+    CHAT = auto()
+    CRISIS = auto()
+    DONE = auto()
+
+class EchoBot:
+    """Pemilik handler minimal untuk menjalankan alur hasil kompilasi di luar chatbot."""
+    FLOW = None
+
+    def __init__(self):
+        self.stage = self.FLOW.initial
+
+    def respond(self, text):
+        key = text.lower().strip()
+        node = self.FLOW.nodes[self.stage]
+        trigger = node.triggers.get(key)
+        stage = trigger.target if trigger and trigger.target else self.stage
+        response, self.stage = self.FLOW.run(self, stage, TurnInput(text, key, None, trigger and trigger.name))
+        return response
+
+    def chat(self, message):
+        if message.key == 'panik':
+            return Goto('escalate')
+        return f"chat:{message.text}"
+
+    def crisis(self, message):
+        if message.key == 'panik':
+            return Reply("crisis:tetap", 'stay')
+        return "crisis"
+
+    def done(self, message):
+        return "done"
+
+SPEC = {
+    'initial': 'CHAT',
+    'triggers': {
+        'crisis': {'phrases': ['Tolong Aku ', 'darurat'], 'stages': ['CHAT'], 'target': 'CRISIS'},
+        'closing': {'phrases': ['stop', 'darurat'], 'target': 'DONE'},
+    },
+    'stages': {
+        'CHAT': {'handler': 'chat', 'routes': {'escalate': 'CRISIS'}},
+        'CRISIS': {'handler': 'crisis', 'next': 'CHAT', 'routes': {'stay': 'CRISIS'}},
+        'DONE': {'handler': 'done'},
+    },
+}
+
+class TestConversationFlow(unittest.TestCase):
+
+    def test_01_chatbot_flow_tables(self):
+        flow = MentalHealthChatbot.FLOW
+        self.assertEqual(flow.initial, ConversationStage.GREETING)
+        self.assertEqual(flow.thresholds['suggestion'], 3)
+        for stage in ConversationStage:
+            self.assertEqual(flow.nodes[stage].triggers['selesai'].target, ConversationStage.CLOSING)
+        self.assertEqual(flow.nodes[ConversationStage.EXPLORATION].triggers['cukup'].name, 'end_topic')
+        self.assertNotIn('cukup', flow.nodes[ConversationStage.REFLECTION].triggers)
+        self.assertFalse(flow.nodes[ConversationStage.GREETING].scan)
+
+    def test_02_new_stage_and_trigger_priority(self):
+        EchoBot.FLOW = compile_flow(SPEC, Stage, EchoBot)
+        bot = EchoBot()
+        self.assertEqual(bot.respond("halo"), "chat:halo")
+        self.assertEqual(bot.respond("tolong aku"), "crisis")
+        self.assertEqual(bot.stage, Stage.CHAT)
+        # 'darurat' ada di dua pemicu; yang dideklarasikan lebih dulu menang
+        self.assertEqual(bot.respond("DARURAT"), "crisis")
+        self.assertEqual(bot.respond("stop"), "done")
+        self.assertEqual(bot.stage, Stage.DONE)
+        self.assertEqual(bot.respond("darurat"), "done")
+
+    def test_04_handlers_choose_routes_declared_in_spec(self):
+        EchoBot.FLOW = compile_flow(SPEC, Stage, EchoBot)
+        bot = EchoBot()
+        # Goto menyerahkan giliran ke handler CRISIS; Reply menimpa 'next' CRISIS
+        self.assertEqual(bot.respond("panik"), "crisis:tetap")
+        self.assertEqual(bot.stage, Stage.CRISIS)
+        self.assertEqual(bot.respond("halo"), "crisis")
+        self.assertEqual(bot.stage, Stage.CHAT)
+
+        routes = MentalHealthChatbot.FLOW.nodes[ConversationStage.EXPLORATION].routes
+        self.assertEqual(routes, {'reflect': ConversationStage.REFLECTION, 'move_on': ConversationStage.POST_REFLECTION})
+        bad_route = {**SPEC, 'stages': {**SPEC['stages'], 'DONE': {'handler': 'done', 'routes': {'x': 'PANIK'}}}}
+        with self.assertRaisesRegex(ValueError, "PANIK"):
+            compile_flow(bad_route, Stage, EchoBot)
+
+    def test_03_invalid_specs_fail_at_compile_time(self):
+        missing_stage = {**SPEC, 'stages': {'CHAT': {'handler': 'chat'}, 'DONE': {'handler': 'done'}}}
+        with self.assertRaisesRegex(ValueError, "CRISIS"):
+            compile_flow(missing_stage, Stage, EchoBot)
+        bad_target = {**SPEC, 'triggers': {'x': {'phrases': ['a'], 'target': 'PANIK'}}}
+        with self.assertRaisesRegex(ValueError, "PANIK"):
+            compile_flow(bad_target, Stage, EchoBot)
+        bad_handler = {**CONVERSATION_FLOW, 'stages': {**CONVERSATION_FLOW['stages'], 'CLOSING': {'handler': '_tidak_ada'}}}
+        with self.assertRaisesRegex(ValueError, "_tidak_ada"):
+            compile_flow(bad_handler, ConversationStage, MentalHealthChatbot)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+# tests/test_http_server.py
+"""
+Unit tests untuk server HTTP/WebSocket: beberapa giliran di satu koneksi keep-alive,
+percakapan lewat WebSocket, penolakan saat batas koneksi tercapai, dan tugas latar
+sweep/flush sesi.
+"""
+
+import asyncio
+import base64
+import json
+import os
+import struct
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# http_server memakai import `core.*` seperti integrasi Discord
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from integrations.executor import EngineExecutor
+from integrations.http_server import ChatServer, ChatService
+
+async def _start_server(**kwargs):
+    os.environ.pop('SESSION_DB_PATH', None)
+    os.environ.pop('SESSION_SPILL_DIR', None)
+    return await ChatServer(ChatService(EngineExecutor(mode='thread', max_workers=2)), port=0, **kwargs).start()
+
+async def _http(reader, writer, method, path, body=None):
+    payload = json.dumps(body).encode() if body is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(payload)}\r\n\r\n".encode() + payload)
+    await writer.drain()
+    head = (await reader.readuntil(b'\r\n\r\n')).decode()
+    status = int(head.split(' ', 2)[1])
+    length = int(next(line.split(':')[1] for line in head.split('\r\n') if line.lower().startswith('content-length')))
+    return status, head, json.loads(await reader.readexactly(length))
+
+def _ws_frame(text):
+    data, mask = text.encode(), b'\x01\x02\x03\x04'
+    masked = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+    return struct.pack('!BB', 0x81, 0x80 | len(data)) + mask + masked
+
+async def _ws_read(reader):
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack('!H', await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', await reader.readexactly(8))[0]
+    return first & 0x0F, await reader.readexactly(length)
+
+class TestHttpServer(unittest.TestCase):
+
+    def test_01_keep_alive_turns_share_one_connection(self):
+        async def scenario():
+            server = await _start_server()
+            reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+            first = await _http(reader, writer, 'POST', '/sessions/abc/turns', {'text': 'halo', 'name': 'Rina'})
+            second = await _http(reader, writer, 'POST', '/sessions/abc/turns',
+                                 {'text': 'aku merasa cemas karena ujian'})
+            ended = await _http(reader, writer, 'DELETE', '/sessions/abc')
+            missing = await _http(reader, writer, 'DELETE', '/sessions/abc')
+            bad = await _http(reader, writer, 'POST', '/sessions/abc/turns', {'text': ''})
+            stats = server.stats()
+            writer.close()
+            await server.close()
+            return first, second, ended, missing, bad, stats
+
+        first, second, ended, missing, bad, stats = asyncio.run(scenario())
+        self.assertEqual(first[0], 200)
+        self.assertIn('keep-alive', first[1].lower())
+        self.assertTrue(first[2]['created'])
+        self.assertIn('Rina', first[2]['response'])
+        self.assertFalse(second[2]['created'])
+        self.assertTrue(second[2]['response'])
+        self.assertTrue(ended[2]['closed'])
+        self.assertEqual(missing[0], 404)
+        self.assertEqual(bad[0], 400)
+        self.assertEqual(stats['connections_total'], 1)
+        self.assertEqual(stats['requests'], 5)
+
+    def test_02_websocket_round_trip(self):
+        async def scenario():
+            server = await _start_server()
+            reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+            key = base64.b64encode(b'0123456789abcdef').decode()
+            writer.write((f"GET /ws/xyz?name=Budi HTTP/1.1\r\nHost: test\r\nUpgrade: websocket\r\n"
+                          f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+            await writer.drain()
+            handshake = (await reader.readuntil(b'\r\n\r\n')).decode()
+            replies = []
+            for text in ('halo', 'aku sedih sekali', 'selesai'):
+                writer.write(_ws_frame(text))
+                await writer.drain()
+                replies.append(await _ws_read(reader))
+            closing = await _ws_read(reader)
+            writer.close()
+            await server.close()
+            return handshake, replies, closing
+
+        handshake, replies, closing = asyncio.run(scenario())
+        self.assertIn('101 Switching Protocols', handshake)
+        self.assertIn('Sec-WebSocket-Accept: BACScCJPNqyz+UBoqMH89VmURoA=', handshake)
+        messages = [json.loads(payload) for _, payload in replies]
+        self.assertIn('Budi', messages[0]['response'])
+        self.assertTrue(messages[1]['response'])
+        self.assertTrue(messages[2]['closed'])
+        self.assertEqual(closing, (0x8, struct.pack('!H', 1000)))
+
+    def test_03_connection_limit_returns_503(self):
+        async def scenario():
+            server = await _start_server(max_connections=1)
+            held = await asyncio.open_connection('127.0.0.1', server.port)
+            status = await _http(*held, 'GET', '/health')
+            reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+            rejected = (await reader.read()).decode()
+            writer.close()
+            held[1].close()
+            await server.close()
+            return status, rejected
+
+        status, rejected = asyncio.run(scenario())
+        self.assertEqual(status[0], 200)
+        self.assertTrue(rejected.startswith('HTTP/1.1 503'))
+
+    def test_04_sweep_and_flush_run_in_background(self):
+        async def scenario(directory):
+            with mock.patch.dict(os.environ, {'SESSION_DB_PATH': os.path.join(directory, 'sessions.db')}):
+                service = ChatService(EngineExecutor(mode='thread', max_workers=2))
+            service.sessions.idle_ttl = 0.01
+            server = await ChatServer(service, port=0, sweep_interval=0.02, flush_interval=0.02).start()
+            reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+            await _http(reader, writer, 'POST', '/sessions/abc/turns', {'text': 'halo', 'name': 'Rina'})
+            await asyncio.sleep(0.2)
+            swept, flushed = len(service.sessions), service.session_store.commits
+            tasks = list(server._background)
+            writer.close()
+            await server.close()
+            return swept, flushed, tasks
+
+        with tempfile.TemporaryDirectory() as directory:
+            swept, flushed, tasks = asyncio.run(scenario(directory))
+        self.assertEqual(swept, 0)
+        self.assertGreaterEqual(flushed, 1)
+        self.assertEqual(len(tasks), 2)
+        self.assertTrue(all(task.cancelled() for task in tasks))
+
+if __name__ == '__main__':
+    unittest.main()
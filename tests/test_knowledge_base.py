@@ -0,0 +1,147 @@
+# tests/test_knowledge_base.py
+"""
+Unit tests untuk deteksi tema di KnowledgeBase (automaton kata kunci).
+"""
+
+import json
+import shutil
+import tempfile
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.chatbot import MentalHealthChatbot
+from src.core import knowledge_base as knowledge_base_module
+from src.core.knowledge_base import KnowledgeBase, get_shared_knowledge_base, reload_shared_knowledge_base
+from src.core.knowledge_pack import DEFAULT_PACK_PATH, compile_pack, load_pack
+from src.core.matcher import KeywordMatcher
+
+class TestThemeDetection(unittest.TestCase):
+
+    def setUp(self):
+        self.kb = KnowledgeBase()
+
+    def test_01_order_is_deterministic_by_salience(self):
+        """Tema dengan kecocokan terbanyak di depan, lalu yang muncul paling awal."""
+        self.assertEqual(self.kb.detect_emotional_themes("aku capek banget sama kuliah"),
+                         ['kelelahan', 'stres akademik'])
+        self.assertEqual(self.kb.detect_emotional_themes("Pacarku marah-marah terus")[0], 'kemarahan')
+
+    def test_02_scan_reports_counts_and_positions(self):
+        hits = self.kb.scan_emotional_themes("capek, capek, capek")
+        self.assertEqual(len(hits), 1)
+        self.assertEqual(hits[0].theme, 'kelelahan')
+        self.assertEqual(hits[0].count, 3)
+        self.assertEqual(hits[0].positions, (0, 7, 14))
+
+    def test_03_overlapping_keywords_share_one_pass(self):
+        matcher = KeywordMatcher({'a': ['he', 'she'], 'b': ['hers'], 'c': ['his']})
+        hits = {hit.theme: hit for hit in matcher.scan("ushers")}
+        self.assertEqual(hits['a'].count, 2)
+        self.assertEqual(hits['a'].positions, (1, 2))
+        self.assertEqual(hits['b'].positions, (2,))
+        self.assertNotIn('c', hits)
+
+    def test_04_no_theme_detected(self):
+        self.assertEqual(self.kb.detect_emotional_themes("halo"), [])
+
+    def test_05_batch_detection_matches_single_scans(self):
+        texts = ["aku capek banget sama kuliah", "halo", "Pacarku marah-marah terus", "halo", "lelah"]
+        self.assertEqual(self.kb.detect_emotional_themes_batch(texts),
+                         [self.kb.detect_emotional_themes(t) for t in texts])
+        # Kata kunci tidak boleh cocok melintasi batas antar pesan
+        self.assertEqual(self.kb.detect_emotional_themes_batch(["cap", "ek"]), [[], []])
+
+    def test_06_nul_character_in_message(self):
+        """Pesan berisi NUL tidak boleh menggeser batas pesan dalam batch."""
+        self.assertEqual(self.kb.detect_emotional_themes("aku capek\x00banget"), ['kelelahan'])
+        self.assertEqual(self.kb.detect_emotional_themes_batch(["sedih\x00", "cemas"]), [['kesedihan'], ['kecemasan']])
+        chatbot = MentalHealthChatbot("Uji")
+        chatbot.get_response("halo")
+        self.assertTrue(chatbot.get_response("aku capek\x00banget"))
+
+class TestSharedKnowledgeBase(unittest.TestCase):
+
+    def test_01_sessions_share_one_instance(self):
+        bot_a, bot_b = MentalHealthChatbot("A"), MentalHealthChatbot("B")
+        self.assertIs(bot_a.knowledge_base, bot_b.knowledge_base)
+        self.assertIs(bot_a.analyzer.kb, get_shared_knowledge_base())
+
+    def test_02_content_is_read_only(self):
+        kb = get_shared_knowledge_base()
+        with self.assertRaises(AttributeError):
+            kb.theme_patterns = {}
+        with self.assertRaises(TypeError):
+            kb.theme_patterns['baru'] = ('kata',)
+
+class TestKnowledgePack(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.tmp_dir, 'pack.json')
+        self.snapshot = os.path.join(self.tmp_dir, 'pack.snapshot')
+        shutil.copy(DEFAULT_PACK_PATH, self.source)
+        self.original_shared = knowledge_base_module._shared_knowledge_base
+
+    def tearDown(self):
+        knowledge_base_module._shared_knowledge_base = self.original_shared
+        shutil.rmtree(self.tmp_dir)
+
+    def _edit_source(self, edit):
+        with open(self.source, encoding='utf-8') as f:
+            content = json.load(f)
+        edit(content)
+        with open(self.source, 'w', encoding='utf-8') as f:
+            json.dump(content, f)
+
+    def test_01_snapshot_round_trip(self):
+        compiled = compile_pack(self.source, self.snapshot)
+        loaded = load_pack(self.source, self.snapshot)
+        self.assertEqual(loaded.digest, compiled.digest)
+        kb = KnowledgeBase.from_pack(loaded)
+        self.assertEqual(kb.detect_emotional_themes("aku lelah"), ['kelelahan'])
+
+    def test_02_stale_snapshot_is_recompiled(self):
+        compile_pack(self.source, self.snapshot)
+        self._edit_source(lambda c: c['theme_patterns']['kelelahan'].append('remuk'))
+        kb = KnowledgeBase.from_pack(load_pack(self.source, self.snapshot))
+        self.assertEqual(kb.detect_emotional_themes("badanku remuk"), ['kelelahan'])
+
+    def test_03_damaged_snapshot_falls_back_to_source(self):
+        compiled = compile_pack(self.source, self.snapshot)
+        with open(self.snapshot, encoding='utf-8') as f:
+            payload = json.load(f)
+        damaged = [
+            b'\x80\x05' + b'x' * 64,                                   # pickle tidak pernah dimuat
+            json.dumps(payload).encode('utf-8')[:-200],                   # terpotong
+            json.dumps({**payload, 'matcher': payload['matcher'][:3]}).encode('utf-8'),
+            json.dumps({**payload, 'matcher': [payload['matcher'][0], [{'a': 10 ** 6}], [0], [[]]]}).encode('utf-8'),
+            json.dumps({k: v for k, v in payload.items() if k != 'content'}).encode('utf-8'),
+        ]
+        for data in damaged:
+            with open(self.snapshot, 'wb') as f:
+                f.write(data)
+            with self.assertLogs('src.core.knowledge_pack', 'WARNING'):
+                loaded = load_pack(self.source, self.snapshot)
+            self.assertEqual(loaded.digest, compiled.digest)
+            self.assertEqual(KnowledgeBase.from_pack(loaded).detect_emotional_themes("aku lelah"), ['kelelahan'])
+
+    def test_04_hot_reload_keeps_running_sessions(self):
+        bot = MentalHealthChatbot("A")
+        bot.get_response("halo")
+        self._edit_source(lambda c: c['theme_patterns']['kelelahan'].append('remuk'))
+        reload_shared_knowledge_base(self.source)
+        bot.get_response("badanku remuk")
+        self.assertEqual(bot.last_topic, 'kelelahan')
+
+    def test_05_invalid_pack_keeps_previous_content(self):
+        previous = get_shared_knowledge_base()
+        self._edit_source(lambda c: c.pop('theme_patterns'))
+        with self.assertRaises(ValueError):
+            reload_shared_knowledge_base(self.source)
+        self.assertIs(get_shared_knowledge_base(), previous)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+# tests/test_logger.py
+"""
+Unit tests untuk pipeline logging: JSONL per sesi, redaksi, rotasi, dan antrean terbatas.
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.logger import ChatLogger, DroppingQueueHandler, JsonlSessionWriter, SessionLogPipeline, queue_listener
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+class _BlockedWriter:
+    """Writer yang menahan thread penulis sampai dilepas, untuk mensimulasikan disk lambat."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.rotations = 0
+
+    def write_batch(self, records):
+        self.release.wait(5)
+
+    def close(self):
+        pass
+
+class TestLoggingPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def test_01_records_are_grouped_per_session(self):
+        pipeline = SessionLogPipeline(JsonlSessionWriter(self.tmpdir), flush_interval=0.05)
+        pipeline.emit(1, 'turn', user="aku cemas", bot="Ceritakan lebih lanjut.")
+        pipeline.emit(2, 'session_start')
+        pipeline.emit(1, 'session_end')
+        pipeline.close()
+
+        first = read_jsonl(os.path.join(self.tmpdir, '1.jsonl'))
+        self.assertEqual([r['event'] for r in first], ['turn', 'session_end'])
+        self.assertEqual(first[0]['user'], "aku cemas")
+        self.assertEqual(len(read_jsonl(os.path.join(self.tmpdir, '2.jsonl'))), 1)
+        self.assertEqual(pipeline.stats()['written'], 3)
+
+    def test_02_redaction_hides_message_bodies(self):
+        pipeline = SessionLogPipeline(JsonlSessionWriter(self.tmpdir), redact=True)
+        pipeline.emit('u', 'turn', user="rahasia sekali", bot="balasan")
+        pipeline.close()
+
+        record = read_jsonl(os.path.join(self.tmpdir, 'u.jsonl'))[0]
+        self.assertEqual(record['user'], "<redacted len=14>")
+        self.assertNotIn("rahasia", json.dumps(record))
+
+    def test_03_size_rotation(self):
+        pipeline = SessionLogPipeline(JsonlSessionWriter(self.tmpdir, max_bytes=200), batch_size=1)
+        for i in range(10):
+            pipeline.emit('s', 'turn', user=f"pesan nomor {i}", bot="x" * 40)
+        pipeline.close()
+
+        files = sorted(os.listdir(self.tmpdir))
+        self.assertGreater(len(files), 1)
+        total = sum(len(read_jsonl(os.path.join(self.tmpdir, name))) for name in files)
+        self.assertEqual(total, 10)
+        self.assertEqual(pipeline.stats()['rotations'], len(files) - 1)
+
+    def test_04_overload_drops_instead_of_blocking(self):
+        writer = _BlockedWriter()
+        pipeline = SessionLogPipeline(writer, max_queue=5, batch_size=1)
+        results = [pipeline.emit('s', 'turn', user=str(i)) for i in range(50)]
+        writer.release.set()
+        pipeline.close()
+
+        self.assertIn(False, results)
+        self.assertEqual(pipeline.dropped, results.count(False))
+        self.assertEqual(pipeline.enqueued + pipeline.dropped, 50)
+
+    def test_05_chat_logger_does_not_duplicate_handlers(self):
+        first = ChatLogger(self.tmpdir)
+        second = ChatLogger(self.tmpdir)
+        self.addCleanup(second.close)
+        self.addCleanup(first.close)
+
+        queue_handlers = [h for h in logging.getLogger("MentalHealthBot").handlers
+                          if isinstance(h, DroppingQueueHandler)]
+        self.assertEqual(len(queue_handlers), 1)
+        self.assertIs(first.listener, second.listener)
+
+    def test_06_close_stops_only_own_listener(self):
+        first = ChatLogger(self.tmpdir)
+        self.addCleanup(first.close)
+        listener = first.listener
+        second = ChatLogger(self.tmpdir)
+        second.close()
+        # Instance kedua hanya menumpang; listener milik instance pertama tetap berjalan
+        self.assertIs(first.listener, listener)
+        self.assertIs(queue_listener(logging.getLogger("MentalHealthBot")), listener)
+        self.assertIsNotNone(listener._thread)
+        first.close()
+        self.assertIsNone(queue_listener(logging.getLogger("MentalHealthBot")))
+
+if __name__ == '__main__':
+    unittest.main()
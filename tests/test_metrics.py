@@ -0,0 +1,75 @@
+# tests/test_metrics.py
+"""
+Unit tests untuk MetricsRegistry, instrumentasi engine, dan endpoint /metrics.
+"""
+
+import unittest
+import urllib.request
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.chatbot import MentalHealthChatbot
+from src.core.metrics import (ENGINE_OPERATION_SECONDS, MetricsRegistry, REGISTRY,
+                              STAGE_TRANSITIONS)
+from src.integrations.metrics_server import start_metrics_server
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def test_01_prometheus_text_format(self):
+        registry = MetricsRegistry(enabled=True)
+        registry.counter('demo_events', 'Contoh counter', ('kind',)).labels('a').inc(2)
+        registry.gauge('demo_sessions', 'Contoh gauge').set_function(lambda: 7)
+        histogram = registry.histogram('demo_seconds', 'Contoh histogram', buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+
+        text = registry.render()
+        self.assertIn('# TYPE demo_events counter', text)
+        self.assertIn('demo_events_total{kind="a"} 2.0', text)
+        self.assertIn('demo_sessions 7.0', text)
+        self.assertIn('demo_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('demo_seconds_bucket{le="1.0"} 2', text)
+        self.assertIn('demo_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn('demo_seconds_count 2', text)
+
+    def test_02_timed_is_passthrough_when_disabled(self):
+        registry = MetricsRegistry(enabled=False)
+        histogram = registry.histogram('demo_call_seconds', 'Durasi', ('op',))
+        double = registry.timed(histogram, 'double')(lambda x: x * 2)
+
+        self.assertEqual(double(4), 8)
+        self.assertEqual(histogram.labels('double').count, 0)
+        registry.enabled = True
+        double(4)
+        self.assertEqual(histogram.labels('double').count, 1)
+
+    def test_03_engine_records_stages_and_transitions(self):
+        REGISTRY.enabled = True
+        self.addCleanup(setattr, REGISTRY, 'enabled', False)
+        transitions = STAGE_TRANSITIONS.labels('greeting', 'exploration').value
+        closings = ENGINE_OPERATION_SECONDS.labels('closing').count
+
+        chatbot = MentalHealthChatbot("Metrik")
+        for text in ["halo", "aku cemas soal kerjaan", "stop"]:
+            chatbot.get_response(text)
+
+        self.assertEqual(STAGE_TRANSITIONS.labels('greeting', 'exploration').value, transitions + 1)
+        self.assertEqual(ENGINE_OPERATION_SECONDS.labels('closing').count, closings + 1)
+        self.assertIn('chatbot_dispatch_seconds_bucket{stage="exploration"', REGISTRY.render())
+
+    def test_04_http_endpoint_serves_metrics(self):
+        registry = MetricsRegistry(enabled=True)
+        registry.counter('demo_requests', 'Contoh').inc()
+        server = start_metrics_server(registry, 0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            self.assertTrue(response.headers['Content-Type'].startswith('text/plain'))
+            self.assertIn('demo_requests_total 1.0', response.read().decode())
+
+if __name__ == '__main__':
+    unittest.main()
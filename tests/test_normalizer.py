@@ -0,0 +1,86 @@
+# tests/test_normalizer.py
+"""
+Unit tests untuk normalisasi bahasa gaul: elongasi, leksikon singkatan, varian
+negasi, cache terbatas, dan dampaknya pada deteksi tema serta pemicu alur.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.chatbot import ConversationStage, MentalHealthChatbot, get_batch_responses
+from src.core.knowledge_base import KnowledgeBase
+from src.core.normalizer import TextNormalizer, load_lexicon, normalize_text
+from src.core.patterns import match_pattern_rule
+
+class TestTextNormalizer(unittest.TestCase):
+
+    def test_01_elongation_slang_and_negation(self):
+        self.assertEqual(normalize_text("Capeeek BGT!!"), "capek banget!!")
+        self.assertEqual(normalize_text("  cpk   bgt "), "capek banget")
+        self.assertEqual(normalize_text("ga sanggup lg"), "tidak sanggup lagi")
+        for variant in ("gk tau", "nggak tau", "gaaa tauuu", "Enggak tahu"):
+            self.assertEqual(normalize_text(variant), "tidak tahu")
+        # Huruf ganda asli tidak disentuh, hanya tiga huruf atau lebih
+        self.assertEqual(normalize_text("ditinggal"), "ditinggal")
+        self.assertEqual(normalize_text("maaaaf"), "maaf")
+
+    def test_02_cache_is_bounded_and_idempotent(self):
+        normalizer = TextNormalizer(max_entries=8)
+        for i in range(50):
+            normalizer.normalize(f"cpk {i}")
+        self.assertLessEqual(normalizer.stats()['entries'], 8)
+        normalized = normalizer.normalize("gk tau lg")
+        self.assertEqual(normalizer.normalize(normalized), normalized)
+        long_text = "capeeek " * 40
+        self.assertEqual(normalizer.normalize(long_text), " ".join(["capek"] * 40))
+        self.assertNotIn(long_text, normalizer._cache)
+
+    def test_03_detectors_see_normalized_text(self):
+        kb = KnowledgeBase()
+        self.assertEqual(kb.detect_emotional_themes("capeeek bgt"), ['kelelahan'])
+        self.assertEqual(kb.detect_emotional_themes("ga sanggup lg"), ['kelelahan'])
+        self.assertEqual(kb.detect_emotional_themes("aku gk berguna"), ['self-esteem rendah'])
+        self.assertEqual(match_pattern_rule("makasiii").name, 'gratitude')
+
+        chatbot = MentalHealthChatbot("Uji")
+        chatbot.get_response("halo")
+        chatbot.get_response("aku cemaaas")
+        self.assertEqual(chatbot.last_topic, 'kecemasan')
+        # "gk tau" dinormalisasi menjadi frasa akhir "ga tau"
+        chatbot.get_response("gk tau")
+        self.assertEqual(chatbot.stage, ConversationStage.POST_REFLECTION)
+
+    def test_04_lexicon_file_extends_defaults(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as f:
+            json.dump({'anxi': 'cemas'}, f)
+        try:
+            lexicon = load_lexicon(f.name)
+        finally:
+            os.unlink(f.name)
+        normalizer = TextNormalizer(lexicon)
+        self.assertEqual(normalizer.normalize("anxi bgt"), "cemas banget")
+        self.assertNotEqual(normalizer.fingerprint, TextNormalizer().fingerprint)
+        self.assertEqual(load_lexicon('/tidak/ada.json')['gk'], 'tidak')
+
+    def test_05_long_messages_are_normalized_once_per_turn(self):
+        # Pesan panjang tidak masuk cache, jadi detektor harus memakai kunci dari giliran
+        long_text = "gw ngerasa cpk bgt, " + "tugas kuliah numpuk terus dan dosennya galak, " * 6
+        chatbot, other = MentalHealthChatbot("Uji"), MentalHealthChatbot("Dua")
+        chatbot.get_response("halo")
+        other.get_response("halo")
+        with mock.patch.object(TextNormalizer, '_normalize', autospec=True,
+                               side_effect=TextNormalizer._normalize) as spy:
+            chatbot.get_response(long_text + "a")
+            self.assertEqual(spy.call_count, 1)
+            get_batch_responses([(chatbot, long_text + "b"), (other, long_text + "c")])
+            self.assertEqual(spy.call_count, 3)
+        self.assertEqual(chatbot.last_topic, 'stres akademik')
+
+if __name__ == '__main__':
+    unittest.main()
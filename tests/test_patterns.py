@@ -0,0 +1,36 @@
+# tests/test_patterns.py
+"""
+Unit tests untuk dispatcher pola fallback (patterns.py).
+"""
+
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.patterns import EMOTION_PATTERNS, EMPATHETIC_RESPONSES, TOPIC_RESPONSES, get_pattern_response, match_pattern_rule
+
+class TestPatternDispatcher(unittest.TestCase):
+
+    def test_01_emotion_wins_over_earlier_topic_keyword(self):
+        """Pola emosi tetap menang walaupun kata kunci topik muncul lebih dulu."""
+        rule = match_pattern_rule("skripsi bikin aku bingung")
+        self.assertEqual(rule.name, 'confusion')
+
+    def test_02_topic_and_no_match(self):
+        self.assertEqual(match_pattern_rule("rencana masa depan").name, 'topic:future')
+        self.assertIsNone(match_pattern_rule("hmm"))
+
+    def test_03_responses_come_from_winning_rule(self):
+        self.assertIn(get_pattern_response("Halo!"), EMOTION_PATTERNS['greeting']['responses'])
+        self.assertIn(get_pattern_response("soal kuliah"), TOPIC_RESPONSES['academic']['responses'])
+
+    def test_04_avoids_recent_fallbacks(self):
+        recent = EMPATHETIC_RESPONSES[:-1]
+        for _ in range(10):
+            response = get_pattern_response("hmm", {'recent_responses': recent})
+            self.assertEqual(response, EMPATHETIC_RESPONSES[-1])
+
+if __name__ == '__main__':
+    unittest.main()
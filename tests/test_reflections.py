@@ -0,0 +1,60 @@
+# tests/test_reflections.py
+"""
+Unit tests untuk reflector kata ganti satu lintasan, pemicu refleksi, dan
+gema pernyataan "aku merasa ..." di alur eksplorasi.
+"""
+
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.chatbot import MentalHealthChatbot
+from src.core.reflections import reflect_pronouns, reflect_statement, should_use_reflection
+
+class TestReflections(unittest.TestCase):
+
+    def test_01_pronouns_swap_once(self):
+        # Dulu "aku" -> "kamu" lalu dibalik lagi menjadi "aku"
+        self.assertEqual(reflect_pronouns("Aku merasa kamu tidak peduli"), "kamu merasa aku tidak peduli")
+        self.assertEqual(reflect_pronouns("saya dan anda"), "kamu dan saya")
+        self.assertEqual(reflect_pronouns("pacarku marah sama temanmu"), "pacarmu marah sama temanku")
+        # Kata yang hanya berakhiran -ku/-mu tidak diubah
+        self.assertEqual(reflect_pronouns("aku mengaku baca buku waktu bertemu dia"),
+                         "kamu mengaku baca buku waktu bertemu dia")
+
+    def test_02_triggers_and_statement(self):
+        self.assertTrue(should_use_reflection("Kadang Aku Ingin menyerah"))
+        self.assertFalse(should_use_reflection("aku capek"))
+        self.assertEqual(reflect_statement("jujur aku merasa ibuku kecewa, tapi aku diam saja"),
+                         "kamu merasa ibumu kecewa")
+        self.assertIsNone(reflect_statement("aku merasa"))
+        self.assertIsNone(reflect_statement("aku merasa " + "sangat " * 20 + "lelah"))
+        self.assertIsNone(reflect_statement("aku sedih"))
+
+    def test_03_exploration_echoes_statement(self):
+        chatbot = MentalHealthChatbot("Uji")
+        chatbot.get_response("halo")
+        response = chatbot.get_response("gw ngerasa cpk bgt sama kuliah")
+        self.assertTrue(response.startswith("Jadi, kamu merasa capek banget sama kuliah. "))
+        self.assertEqual(chatbot.last_topic, 'kelelahan')
+        self.assertFalse(chatbot.get_response("tugasnya banyak").startswith("Jadi,"))
+
+    def test_04_only_feelings_are_echoed(self):
+        # "ingin" tetap pemicu refleksi, tetapi tidak digemakan
+        self.assertTrue(should_use_reflection("aku ingin tahu bagaimana"))
+        self.assertIsNone(reflect_statement("aku ingin tahu bagaimana"))
+        self.assertIsNone(reflect_statement("saya ingin berhenti kuliah"))
+
+    def test_05_crisis_statements_are_never_echoed(self):
+        for text in ("aku merasa ingin bunuh diri saja", "aku merasa lebih baik mati",
+                     "aku merasa capek. rasanya mau mengakhiri hidup"):
+            self.assertIsNone(reflect_statement(text), text)
+        chatbot = MentalHealthChatbot("Uji")
+        chatbot.get_response("halo")
+        self.assertNotIn("Jadi,", chatbot.get_response("aku pengen bunuh diri"))
+        self.assertNotIn("Jadi,", chatbot.get_response("aku ngerasa pengen mati aja"))
+
+if __name__ == '__main__':
+    unittest.main()
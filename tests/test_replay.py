@@ -0,0 +1,86 @@
+# tests/test_replay.py
+"""
+Unit tests untuk replay deterministik: RNG per sesi membuat respons dapat diulang,
+korpus dibangun dari log sesi, perbedaan golden dan regresi latensi terdeteksi.
+"""
+
+import json
+import os
+import random
+import tempfile
+import unittest
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.knowledge_base import KnowledgeBase
+from src.core.patterns import get_pattern_response
+from src.core.replay import build_corpus, compare_latency, diff_session, replay_session, run_replay
+
+SESSION = {'session': 'uji#1', 'name': 'Budi', 'inputs': [
+    "halo, nama saya Budi", "aku cemas soal ujian", "aku cemas sekali", "masih cemas terus",
+    "aku sedih juga", "makasih ya", "selesai"]}
+
+class TestReplay(unittest.TestCase):
+
+    def test_01_same_seed_same_responses(self):
+        first = replay_session(SESSION, seed=7, repeats=2)
+        second = replay_session(SESSION, seed=7)
+        self.assertTrue(first['deterministic'])
+        self.assertEqual(first['responses'], second['responses'])
+        self.assertEqual(first['stages'][-1], 'CLOSING')
+        self.assertEqual(len(first['latencies']), len(SESSION['inputs']))
+
+        rule_responses = [get_pattern_response("halo", {}, rng=random.Random(1)) for _ in range(3)]
+        self.assertEqual(len(set(rule_responses)), 1)
+
+    def test_02_golden_diff_detects_change(self):
+        result = replay_session(SESSION, seed=7)
+        golden = {'session': result['session'], 'responses': list(result['responses']), 'stages': list(result['stages'])}
+        self.assertEqual(diff_session(result, golden), [])
+        golden['responses'][2] = "respons lama"
+        golden['stages'][3] = 'GREETING'
+        problems = diff_session(result, golden)
+        self.assertEqual(len(problems), 2)
+        self.assertIn("giliran 2", problems[0])
+        self.assertIn("-respons lama", problems[0])
+        self.assertEqual(diff_session(result, None), ["uji#1: tidak ada di golden"])
+
+    def test_03_latency_gate(self):
+        report = run_replay([SESSION], seed=7, repeats=1)
+        self.assertEqual(report['meta']['sessions'], 1)
+        self.assertEqual(report['overall']['turns'], len(SESSION['inputs']))
+        self.assertIn('CLOSING', report['by_stage'])
+        # Baseline palsu: semua jauh lebih cepat sehingga setiap statistik tergolong regresi
+        fast = {'overall': {key: 0.001 for key in ('p50_us', 'p95_us')}, 'by_stage': {}}
+        self.assertEqual(compare_latency(report, fast, 0.2), ['semua:p50_us', 'semua:p95_us'])
+        slow = {'overall': {key: 1e9 for key in ('p50_us', 'p95_us')}, 'by_stage': {}}
+        self.assertEqual(compare_latency(report, slow, 0.2), [])
+
+    def test_04_build_corpus_from_session_logs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sessions.jsonl')
+            records = [{'session': 1, 'event': 'turn', 'user': "aku cemas"},
+                       {'session': 2, 'event': 'turn', 'user': "<redacted len=5>"},
+                       {'session': 1, 'event': 'turn', 'user': "selesai"},
+                       {'session': 1, 'event': 'session_end'},
+                       {'session': 1, 'event': 'turn', 'user': "aku sedih"}]
+            with open(path, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(record) + '\n' for record in records)
+            corpus = list(build_corpus([directory]))
+        self.assertEqual([entry['session'] for entry in corpus], ['1#1', '1#2'])
+        self.assertEqual(corpus[0]['inputs'], ["halo, nama saya User", "aku cemas", "selesai"])
+
+    def test_05_every_repeat_runs_detection(self):
+        # Tanpa cache bersama, ulangan kedua memindai tema sebanyak ulangan pertama
+        scan = KnowledgeBase.scan_emotional_themes
+        with mock.patch.object(KnowledgeBase, 'scan_emotional_themes', autospec=True, side_effect=scan) as spy:
+            replay_session(SESSION, seed=7, repeats=1)
+            once = spy.call_count
+            replay_session(SESSION, seed=7, repeats=2)
+        self.assertGreater(once, 0)
+        self.assertEqual(spy.call_count, 3 * once)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+# tests/test_send_scheduler.py
+"""
+Unit tests untuk SendScheduler: pemecahan di batas kalimat, pengemasan pesan,
+token bucket per channel, dan backoff saat rate limit (429).
+"""
+
+import asyncio
+import time
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.integrations.send_scheduler import SendScheduler, plan_messages, split_message
+
+class _RateLimited(Exception):
+    status = 429
+
+    def __init__(self, retry_after):
+        super().__init__("429 Too Many Requests")
+        self.retry_after = retry_after
+
+class _Channel:
+    def __init__(self, channel_id, fail_times=0):
+        self.id = channel_id
+        self.sent = []
+        self.fail_times = fail_times
+
+    async def send(self, content=None, *, embed=None, embeds=()):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise _RateLimited(0.05)
+        self.sent.append((time.monotonic(), content, embed, list(embeds)))
+
+class TestSplitting(unittest.TestCase):
+
+    def test_01_splits_on_sentence_boundaries(self):
+        sentence = "Ini adalah kalimat yang cukup panjang untuk diuji. "
+        text = sentence * 100
+        chunks = split_message(text, 500)
+        self.assertTrue(all(len(chunk) <= 500 for chunk in chunks))
+        self.assertTrue(all(chunk.endswith('.') for chunk in chunks))
+        self.assertEqual(' '.join(chunks), text.strip())
+
+    def test_02_overlong_sentence_is_cut_at_whitespace(self):
+        chunks = split_message("kata " * 300, 100)
+        self.assertTrue(all(len(chunk) <= 100 and not chunk.endswith('kat') for chunk in chunks))
+        self.assertEqual(sum(chunk.count('kata') for chunk in chunks), 300)
+
+    def test_03_text_and_embed_share_one_message(self):
+        embed = object()
+        self.assertEqual(plan_messages("halo", [embed]), [{'content': "halo", 'embed': embed}])
+        self.assertEqual(plan_messages(None, [embed]), [{'embed': embed}])
+        self.assertEqual(len(plan_messages("a. " * 1000, [embed])), 2)
+
+class TestSendScheduler(unittest.TestCase):
+
+    def test_04_channel_bucket_spaces_out_bursts(self):
+        async def scenario():
+            scheduler = SendScheduler(channel_rate=20, channel_burst=2)
+            channel, other = _Channel(1), _Channel(2)
+            futures = [scheduler.send(channel, f"pesan {i}") for i in range(4)] + [scheduler.send(other, "channel lain")]
+            self.assertEqual(scheduler.queued_jobs, 5)
+            await asyncio.gather(*futures)
+            return scheduler, channel, other
+
+        scheduler, channel, other = asyncio.run(scenario())
+        self.assertEqual(scheduler.queued_jobs, 0)
+        self.assertEqual([content for _, content, _, _ in channel.sent], [f"pesan {i}" for i in range(4)])
+        # Dua pesan pertama memakai burst, dua berikutnya menunggu token (1/20 detik per token)
+        self.assertGreaterEqual(channel.sent[3][0] - channel.sent[0][0], 0.08)
+        self.assertEqual(len(other.sent), 1)
+        self.assertEqual(scheduler.stats()['send_jobs'], 5)
+
+    def test_05_rate_limit_backs_off_and_retries(self):
+        async def scenario():
+            scheduler = SendScheduler(backoff_base=0.01)
+            channel = _Channel(1, fail_times=2)
+            await scheduler.send(channel, "akhirnya terkirim")
+            return scheduler, channel
+
+        scheduler, channel = asyncio.run(scenario())
+        self.assertEqual(len(channel.sent), 1)
+        stats = scheduler.stats()
+        self.assertEqual(stats['send_rate_limited'], 2)
+        self.assertGreaterEqual(stats['send_latency_max_ms'], 100)
+
+    def test_06_other_errors_propagate_to_sender(self):
+        class _Broken(_Channel):
+            async def send(self, content=None, **kwargs):
+                raise RuntimeError("gagal")
+
+        async def scenario():
+            scheduler = SendScheduler()
+            with self.assertRaises(RuntimeError):
+                await scheduler.send(_Broken(1), "halo")
+            return scheduler
+
+        self.assertEqual(asyncio.run(scenario()).failures, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+# tests/test_session_registry.py
+"""
+Unit tests untuk SessionRegistry: TTL menganggur, batas LRU, dan spill ke disk
+(nama file aman, kegagalan tulis, dan kedaluwarsa file spill).
+"""
+
+import asyncio
+import shutil
+import tempfile
+import time
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.chatbot import MentalHealthChatbot
+from src.integrations.session_registry import PickleSpillStore, SessionRegistry
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestSessionRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_01_lru_cap_evicts_least_recently_used(self):
+        registry = SessionRegistry(max_sessions=2, clock=self.clock)
+        registry[1], registry[2] = "a", "b"
+        registry.get(1)  # 1 baru dipakai, jadi 2 yang paling lama
+        registry[3] = "c"
+        self.assertIn(1, registry)
+        self.assertNotIn(2, registry)
+        self.assertEqual(registry.evictions, 1)
+
+    def test_02_idle_sessions_expire_on_sweep(self):
+        registry = SessionRegistry(idle_ttl=60, clock=self.clock)
+        registry[1] = "a"
+        self.clock.now = 30
+        registry[2] = "b"
+        self.clock.now = 70
+        self.assertEqual(registry.sweep(), 1)
+        self.assertNotIn(1, registry)
+        self.assertIn(2, registry)
+
+    def test_03_spilled_session_is_restored_transparently(self):
+        spill_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, spill_dir)
+        store = PickleSpillStore(spill_dir)
+        # Ditutup sebelum direktori dihapus: thread spill mungkin masih menulis
+        self.addCleanup(store.close)
+        registry = SessionRegistry(max_sessions=1, spill_store=store, clock=self.clock)
+
+        chatbot = MentalHealthChatbot("A")
+        chatbot.get_response("halo")
+        chatbot.get_response("aku lelah banget")
+        registry[1] = chatbot
+        registry[2] = MentalHealthChatbot("B")  # mengeluarkan sesi 1 ke disk
+
+        self.assertEqual(len(registry), 1)
+        self.assertIn(1, registry)
+        restored = registry[1]
+        self.assertEqual(restored.last_topic, 'kelelahan')
+        self.assertEqual(registry.restores, 1)
+
+        del registry[1]
+        self.assertNotIn(1, registry)
+
+    def test_04_spill_io_runs_off_the_caller(self):
+        spill_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, spill_dir)
+        store = PickleSpillStore(spill_dir)
+        self.addCleanup(store.close)
+        registry = SessionRegistry(max_sessions=1, spill_store=store, clock=self.clock)
+
+        # Giliran biasa tidak menghapus apa pun dari disk untuk user yang belum pernah di-spill
+        unlinks = []
+        store._unlink = unlinks.append
+        for _ in range(3):
+            registry[1] = MentalHealthChatbot("A")
+        self.assertEqual(unlinks, [])
+        del store._unlink
+
+        chatbot = MentalHealthChatbot("A")
+        chatbot.get_response("halo")
+        chatbot.get_response("aku cemas banget")
+        registry[1] = chatbot
+        registry[2] = MentalHealthChatbot("B")  # sesi 1 di-spill oleh thread latar
+        store.flush()
+        self.assertTrue(os.path.exists(store._path(store._name(1))))
+
+        restarted = PickleSpillStore(spill_dir)
+        self.addCleanup(restarted.close)
+        self.assertIn(1, restarted)
+        registry = SessionRegistry(max_sessions=1, spill_store=restarted, clock=self.clock)
+        restored = asyncio.run(registry.get_async(1))
+        self.assertEqual(restored.last_topic, 'kecemasan')
+        self.assertNotIn(1, restarted)
+        restarted.flush()
+        self.assertEqual(os.listdir(spill_dir), [])
+
+    def test_05_spill_files_are_safe_and_expire(self):
+        spill_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, spill_dir)
+        store = PickleSpillStore(spill_dir, max_age=60)
+        self.addCleanup(store.close)
+
+        # Kunci dengan pemisah path tetap ditulis di dalam direktori spill
+        store.save('../luar/x', MentalHealthChatbot("A"))
+        # Sesi yang tidak bisa di-pickle dicatat gagal, bukan diklaim tersimpan
+        broken = MentalHealthChatbot("B")
+        broken.unpicklable = lambda: None
+        with self.assertLogs('src.integrations.session_registry', 'ERROR'):
+            store.save('rusak', broken)
+            store.flush()
+        self.assertEqual(store.write_errors, 1)
+        self.assertNotIn('rusak', store)
+        self.assertIsNone(store.load('rusak'))
+        self.assertEqual(len(os.listdir(spill_dir)), 1)
+        self.assertEqual(store.load('../luar/x').user_name, "A")
+
+        registry = SessionRegistry(max_sessions=1, idle_ttl=60, spill_store=store, clock=self.clock)
+        registry[1] = MentalHealthChatbot("C")
+        registry[2] = MentalHealthChatbot("D")
+        store.flush()
+        old = time.time() - 120
+        os.utime(store._path(store._name(1)), (old, old))
+        registry.sweep()
+        store.flush()
+        # File sesi 1 lebih tua dari idle_ttl dan dihapus; sesi 2 masih aktif di memori
+        self.assertNotIn(1, registry)
+        self.assertIn(2, registry)
+        self.assertEqual(store.expired, 1)
+
+if __name__ == '__main__':
+    unittest.main()
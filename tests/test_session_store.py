@@ -0,0 +1,132 @@
+# tests/test_session_store.py
+"""
+Unit tests untuk serialisasi state sesi dan SQLiteSessionStore.
+"""
+
+import asyncio
+import shutil
+import tempfile
+import threading
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.chatbot import MentalHealthChatbot, ConversationStage
+from src.integrations.session_registry import SessionRegistry
+from src.integrations.session_store import SQLiteSessionStore
+
+class TestSessionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'sessions.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _open_store(self, **kwargs) -> SQLiteSessionStore:
+        store = SQLiteSessionStore(self.db_path, factory=MentalHealthChatbot.from_state, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def test_01_state_round_trip(self):
+        chatbot = MentalHealthChatbot("A")
+        for text in ("halo", "aku lagi cemas banget", "sudah, itu saja"):
+            chatbot.get_response(text)
+        restored = MentalHealthChatbot.from_state(chatbot.to_state())
+        self.assertEqual(restored.stage, ConversationStage.POST_REFLECTION)
+        self.assertEqual(restored.last_topic, chatbot.last_topic)
+        self.assertEqual(restored.reflected_topics, {'kecemasan'})
+        self.assertEqual(restored.questions_asked, chatbot.questions_asked)
+        self.assertEqual(len(restored.conversation_history), 3)
+
+    def test_02_sessions_survive_restart_and_load_lazily(self):
+        registry = SessionRegistry(spill_store=self._open_store(), write_through=True)
+        chatbot = MentalHealthChatbot("A")
+        chatbot.get_response("halo")
+        chatbot.get_response("aku lelah banget")
+        registry[42] = chatbot
+        registry._sessions.clear()  # simulasi restart: memori kosong, disk tetap
+        registry.spill_store.close()
+
+        restarted = SessionRegistry(spill_store=self._open_store(), write_through=True)
+        self.assertEqual(len(restarted), 0)
+        self.assertIn(42, restarted)
+        self.assertEqual(restarted[42].last_topic, 'kelelahan')
+        self.assertEqual(restarted.restores, 1)
+
+    def test_03_turn_writes_are_batched(self):
+        store = self._open_store(batch_size=1000)
+        for user_id in range(50):
+            store.save(user_id, MentalHealthChatbot(f"user{user_id}"))
+        self.assertEqual(store.commits, 0)
+        self.assertIsNotNone(store.load(7))  # dibaca dari buffer sebelum flush
+        store.flush()
+        self.assertEqual(store.commits, 1)
+        self.assertEqual(len(store), 50)
+
+        store.delete(7)
+        self.assertNotIn(7, store)
+        store.flush()
+        self.assertEqual(len(store), 49)
+
+    def test_04_membership_and_full_batch_stay_off_the_loop(self):
+        store = self._open_store(batch_size=2)
+        store.save(1, MentalHealthChatbot("A"))
+        store.flush()
+        store.close()
+
+        store = self._open_store(batch_size=2)
+        # Kunci dimuat saat dibuka; `in` tidak menunggu lock yang dipegang flush
+        answers = []
+        with store._lock:
+            checker = threading.Thread(target=lambda: answers.extend([1 in store, 2 in store]))
+            checker.start()
+            checker.join(1)
+        self.assertEqual(answers, [True, False])
+
+        async def scenario():
+            store.save(2, MentalHealthChatbot("B"))
+            store.save(3, MentalHealthChatbot("C"))
+            scheduled = store.commits
+            for _ in range(100):
+                if store.commits:
+                    break
+                await asyncio.sleep(0.01)
+            return scheduled, store.commits
+
+        scheduled, flushed = asyncio.run(scenario())
+        self.assertEqual(scheduled, 0)  # buffer penuh tidak di-flush langsung di event loop
+        self.assertEqual(flushed, 1)
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.load(3).user_name, "C")
+
+    def test_05_flush_does_not_block_save_and_load(self):
+        store = self._open_store()
+        store.save(1, MentalHealthChatbot("A"))
+        encoding, release = threading.Event(), threading.Event()
+
+        def slow_encode(state):
+            encoding.set()
+            release.wait(2)
+            return SQLiteSessionStore.encode(state)
+
+        store.encode = slow_encode
+        flusher = threading.Thread(target=store.flush)
+        flusher.start()
+        self.assertTrue(encoding.wait(2))
+        # Flush sedang meng-encode: save dan load tetap jalan, load membaca peta in-flight
+        store.save(2, MentalHealthChatbot("B"))
+        self.assertEqual(store.load(1).user_name, "A")
+        self.assertTrue(flusher.is_alive())
+        release.set()
+        flusher.join(2)
+        self.assertEqual(store.commits, 1)
+        self.assertEqual(store._inflight, {})
+        self.assertEqual(store.load(1).user_name, "A")
+        self.assertEqual(store.flush(), 1)
+
+if __name__ == '__main__':
+    unittest.main()
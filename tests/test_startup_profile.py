@@ -0,0 +1,42 @@
+# tests/test_startup_profile.py
+"""
+Unit tests untuk startup profile: penguraian output -X importtime, mode CLI yang
+tidak memuat discord, dan pengukuran respons pertama di interpreter baru.
+"""
+
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.startup_profile import first_response_timing, import_breakdown, parse_importtime
+
+SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     core.matcher
+import time:       300 |        900 |   core.knowledge_base
+import time:       500 |       1400 | core.chatbot
+"""
+
+class TestStartupProfile(unittest.TestCase):
+
+    def test_01_parse_importtime_keeps_depth(self):
+        records = parse_importtime(SAMPLE)
+        self.assertEqual([(r.module, r.depth) for r in records],
+                         [('core.matcher', 2), ('core.knowledge_base', 1), ('core.chatbot', 0)])
+        self.assertEqual(records[-1].cumulative_us, 1400)
+
+    def test_02_cli_engine_does_not_import_discord(self):
+        breakdown = import_breakdown('core.chatbot')
+        self.assertIsNone(breakdown['error'])
+        self.assertIn('core.chatbot', breakdown['modules'])
+        for heavy in ('discord', 'dotenv', 'asyncio', 'multiprocessing'):
+            self.assertNotIn(heavy, breakdown['modules'])
+
+    def test_03_first_response_after_import(self):
+        timing = first_response_timing(repeats=1)
+        self.assertGreater(timing['imported_ms'], 0)
+        self.assertLessEqual(timing['imported_ms'], timing['responded_ms'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+# tests/test_transcript_analytics.py
+"""
+Unit tests untuk analitik transkrip: hasil tidak bergantung pada ukuran chunk atau
+jumlah worker, sesi yang terpotong antar chunk tersambung benar, dan CSV ditulis.
+"""
+
+import csv
+import json
+import os
+import tempfile
+import unittest
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.transcript_analytics import analyze_transcripts, write_csv
+
+def _turn(session, text, stage=None):
+    record = {'ts': 0, 'session': session, 'event': 'turn', 'user': text, 'bot': '...'}
+    if stage:
+        record['stage'] = stage
+    return record
+
+class TestTranscriptAnalytics(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'sessions.jsonl')
+        records = []
+        for i in range(20):
+            # Sesi genap: tiga pesan cemas lalu sedih dan ditutup; tanpa field stage
+            records += [_turn(f"a{i}", "aku cemas sekali soal ujian")] * 3
+            records += [_turn(f"a{i}", "aku sedih banget"), _turn(f"a{i}", "selesai"),
+                        {'session': f"a{i}", 'event': 'session_end'}]
+            # Sesi dengan stage tercatat dan pesan yang disamarkan
+            records += [_turn(f"b{i}", "aku kesepian", 'EXPLORATION'),
+                        _turn(f"b{i}", "<redacted len=12>", 'EXPLORATION')]
+        with open(self.path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+            f.write("bukan json\n")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_01_chunk_size_does_not_change_results(self):
+        whole = analyze_transcripts([self.directory.name], chunk_bytes=2**30)
+        tiny = analyze_transcripts([self.path], chunk_bytes=200)
+        self.assertEqual(whole.summary(), {**tiny.summary(), 'max_open_sessions': whole.max_open_sessions})
+        self.assertEqual(whole.topic_transitions, tiny.topic_transitions)
+        self.assertEqual(whole.theme_rows(), tiny.theme_rows())
+
+    def test_02_aggregates(self):
+        aggregate = analyze_transcripts([self.path], chunk_bytes=300)
+        summary = aggregate.summary()
+        self.assertEqual(summary['sessions'], 40)
+        self.assertEqual(summary['malformed'], 1)
+        self.assertEqual(summary['redacted_turns'], 20)
+        self.assertAlmostEqual(summary['closing_rate'], 0.5)
+        # Run tiga pesan "cemas" mencapai threshold; sesi b punya stage tanpa refleksi
+        self.assertAlmostEqual(summary['reflection_rate'], 0.5)
+        self.assertEqual(aggregate.topic_transitions[('kecemasan', 'kesedihan')], 20)
+
+    def test_03_process_pool_matches_single_process(self):
+        single = analyze_transcripts([self.path], workers=1, chunk_bytes=500)
+        pooled = analyze_transcripts([self.path], workers=2, chunk_bytes=500)
+        self.assertEqual(single.summary(), pooled.summary())
+        self.assertEqual(single.topic_transitions, pooled.topic_transitions)
+
+    def test_04_csv_tables(self):
+        aggregate = analyze_transcripts([self.path])
+        written = write_csv(aggregate, os.path.join(self.directory.name, 'out'))
+        self.assertEqual(len(written), 4)
+        with open(written[1], encoding='utf-8') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ['theme', 'hits', 'messages', 'sessions'])
+        self.assertIn('kecemasan', [row[0] for row in rows])
+
+if __name__ == '__main__':
+    unittest.main()
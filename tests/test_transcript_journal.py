@@ -0,0 +1,95 @@
+# tests/test_transcript_journal.py
+"""
+Unit tests untuk jurnal transkrip: baca acak per giliran lewat indeks, group commit,
+rotasi segmen, pemulihan setelah crash, dan integrasi dengan SessionLogPipeline.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.logger import ChatLogger, JsonlSessionWriter, SessionLogPipeline
+from src.utils.transcript_journal import JournalReader, TranscriptJournal
+
+class TestTranscriptJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, sessions=5, turns=40, **kwargs):
+        journal = TranscriptJournal(self.directory, fsync=False, **kwargs)
+        for turn in range(turns):
+            for session in range(sessions):
+                journal.append(session, {'event': 'turn', 'user': f"pesan {turn} dari {session}", 'stage': 'EXPLORATION'})
+        journal.close()
+        return journal
+
+    def test_01_random_access_by_session_and_turn(self):
+        journal = self._write()
+        self.assertLessEqual(journal.commits, 2)
+        with JournalReader(self.directory) as reader:
+            self.assertEqual(len(reader), 200)
+            self.assertEqual(reader.session_count(), 5)
+            self.assertEqual(reader.turn_count(3), 40)
+            self.assertEqual(reader.read_turn(3, 17)['user'], "pesan 17 dari 3")
+            self.assertEqual(reader.read_turn('3', -1)['user'], "pesan 39 dari 3")
+            self.assertEqual([r['user'] for r in reader.iter_session(1, 38)], ["pesan 38 dari 1", "pesan 39 dari 1"])
+            self.assertEqual(sorted(reader.sessions()), [0, 1, 2, 3, 4])
+            with self.assertRaises(IndexError):
+                reader.read_turn(99, 0)
+
+    def test_02_segments_rotate_and_stay_ordered(self):
+        self._write(max_segment_bytes=2000, commit_bytes=500)
+        self.assertGreater(len([n for n in os.listdir(self.directory) if n.endswith('.journal')]), 3)
+        with JournalReader(self.directory) as reader:
+            self.assertEqual([r['user'] for r in reader.iter_session(2)], [f"pesan {t} dari 2" for t in range(40)])
+
+    def test_03_recovers_torn_tail_and_missing_index(self):
+        self._write(sessions=2, turns=10)
+        data_path = os.path.join(self.directory, '000001.journal')
+        index_path = os.path.join(self.directory, '000001.index')
+        # Crash: record terakhir terpotong dan indeks kehilangan lima entri terakhir
+        with open(data_path, 'r+b') as f:
+            f.truncate(os.path.getsize(data_path) - 3)
+        with open(index_path, 'r+b') as f:
+            f.truncate(os.path.getsize(index_path) - 5 * 20)
+
+        journal = TranscriptJournal(self.directory, fsync=False)
+        self.assertEqual(journal.recovered, 4)
+        journal.append(0, {'event': 'turn', 'user': "setelah pulih"})
+        journal.close()
+        with JournalReader(self.directory) as reader:
+            self.assertEqual(len(reader), 20)
+            self.assertEqual(reader.read_turn(0, -1)['user'], "setelah pulih")
+            self.assertEqual(reader.turn_count(1), 9)
+
+    def test_04_session_log_pipeline_writes_journal(self):
+        pipeline = SessionLogPipeline(JsonlSessionWriter(os.path.join(self.directory, 'sessions')),
+                                      redact=True, journal=TranscriptJournal(os.path.join(self.directory, 'journal')))
+        for i in range(50):
+            pipeline.emit('abc', 'turn', user=f"rahasia {i}", bot="oke", stage='EXPLORATION')
+        pipeline.close()
+        self.assertEqual(pipeline.stats()['journal_appended'], 50)
+        with JournalReader(os.path.join(self.directory, 'journal')) as reader:
+            record = reader.read_turn('abc', 10)
+        self.assertEqual(record['user'], "<redacted len=10>")
+        self.assertEqual(record['stage'], 'EXPLORATION')
+
+    def test_05_chat_logger_journal_replaces_jsonl(self):
+        chat_logger = ChatLogger(self.directory, attach_handlers=False, journal=True)
+        chat_logger.log_conversation('abc', "halo", "hai")
+        chat_logger.close()
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'sessions')))
+        self.assertEqual(chat_logger.stats()['written'], 1)
+        with JournalReader(os.path.join(self.directory, 'journal')) as reader:
+            self.assertEqual(reader.read_turn('abc', 0)['bot'], "hai")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+# tests/test_worker_pool.py
+"""
+Unit tests untuk PreforkPool: consistent hash, IPC ke worker, respawn worker yang
+mati lewat zygote di luar event loop, toleransi ping yang terlewat, dan sesi
+persisten (satu file per worker) yang bertahan saat gateway dimulai ulang.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from src.integrations.worker_pool import HashRing, PreforkPool, WorkerCrashedError
+from integrations.session_worker import PreforkSessions, SessionWorkerHandler
+
+class _CounterHandler:
+    """Handler sederhana: menghitung pesan per key di memori worker."""
+
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.counts = {}
+
+    def handle(self, op, key, payload):
+        if op == 'count':
+            self.counts[key] = self.counts.get(key, 0) + 1
+            return self.worker_id, os.getpid(), self.counts[key]
+        if op == 'crash':
+            os._exit(1)
+        if op == 'parent':
+            return os.getppid()
+        if op == 'sleep':
+            time.sleep(payload)
+            return True
+        raise KeyError(key)
+
+    def tick(self):
+        pass
+
+    def stats(self):
+        return {'pid': os.getpid(), 'active': len(self.counts)}
+
+    def close(self):
+        pass
+
+class TestHashRing(unittest.TestCase):
+
+    def test_01_routing_is_stable_and_spread(self):
+        ring = HashRing(list(range(4)))
+        owners = [ring.node_for(user_id) for user_id in range(2000)]
+        self.assertEqual(owners, [HashRing(list(range(4))).node_for(user_id) for user_id in range(2000)])
+        self.assertEqual(set(owners), {0, 1, 2, 3})
+        self.assertTrue(all(owners.count(node) > 300 for node in range(4)))
+
+    def test_02_adding_a_node_moves_only_some_keys(self):
+        before, after = HashRing(list(range(4))), HashRing(list(range(5)))
+        moved = sum(before.node_for(k) != after.node_for(k) for k in range(5000))
+        self.assertLess(moved, 5000 * 0.35)
+
+class TestPreforkPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = PreforkPool(_CounterHandler, workers=2, ping_timeout=2.0).start()
+
+    def tearDown(self):
+        asyncio.run(self.pool.shutdown())
+
+    def test_03_same_key_always_reaches_same_worker(self):
+        async def scenario():
+            results = []
+            for _ in range(3):
+                results.append(await self.pool.request(42, 'count'))
+            errors = []
+            try:
+                await self.pool.request(7, 'unknown')
+            except KeyError as e:
+                errors.append(e)
+            return results, errors
+
+        results, errors = asyncio.run(scenario())
+        self.assertEqual({(worker, pid) for worker, pid, _ in results}, {results[0][:2]})
+        self.assertEqual([count for _, _, count in results], [1, 2, 3])
+        self.assertEqual(results[0][0], self.pool.worker_for(42))
+        self.assertNotEqual(results[0][1], os.getpid())
+        self.assertEqual(len(errors), 1)
+
+    def test_04_crashed_worker_is_respawned(self):
+        async def scenario():
+            _, old_pid, _ = await self.pool.request(42, 'count')
+            with self.assertRaises(WorkerCrashedError):
+                await self.pool.request(42, 'crash')
+            await self.pool.check_health()
+            return old_pid, await self.pool.request(42, 'count')
+
+        old_pid, (_, new_pid, count) = asyncio.run(scenario())
+        self.assertNotEqual(old_pid, new_pid)
+        self.assertEqual(count, 1)  # state di memori worker lama ikut hilang
+        self.assertEqual(self.pool.stats()['worker_respawns'], 1)
+        self.assertEqual(self.pool.stats()['workers_alive'], 2)
+
+    def test_05_workers_are_forked_by_the_zygote(self):
+        async def scenario():
+            before = await self.pool.request(42, 'parent')
+            with self.assertRaises(WorkerCrashedError):
+                await self.pool.request(42, 'crash')
+            return before, await self.pool.request(42, 'parent')
+
+        before, after = asyncio.run(scenario())
+        # Worker pengganti tidak di-fork dari gateway yang sudah punya thread
+        self.assertEqual(before, self.pool._zygote.pid)
+        self.assertEqual(after, self.pool._zygote.pid)
+
+    def test_06_busy_worker_survives_a_missed_ping(self):
+        pool = PreforkPool(_CounterHandler, workers=2, ping_timeout=0.1, max_missed_pings=2).start()
+
+        async def scenario():
+            try:
+                busy = asyncio.ensure_future(pool.request(42, 'sleep', 0.5))
+                await asyncio.sleep(0.05)
+                first = await pool.check_health()
+                result = await busy
+                await pool.check_health()  # ping terjawab lagi: hitungan direset
+                busy = asyncio.ensure_future(pool.request(42, 'sleep', 1.0))
+                await asyncio.sleep(0.05)
+                missed = [await pool.check_health(), await pool.check_health()]
+                with self.assertRaises(WorkerCrashedError):
+                    await busy
+                return first, result, missed, pool.stats()
+            finally:
+                await pool.shutdown()
+
+        first, result, missed, stats = asyncio.run(scenario())
+        self.assertEqual(first, 0)
+        self.assertTrue(result)
+        self.assertEqual(missed, [0, 1])
+        self.assertEqual(stats['worker_respawns'], 1)
+        self.assertEqual(stats['worker_missed_pings'], 3)
+
+    def test_07_respawn_does_not_block_other_workers(self):
+        other = next(key for key in range(100) if self.pool.worker_for(key) != self.pool.worker_for(42))
+        spawn = self.pool._spawn
+
+        def slow_spawn(worker_id):
+            time.sleep(0.5)
+            return spawn(worker_id)
+
+        async def scenario():
+            with mock.patch.object(self.pool, '_spawn', slow_spawn):
+                start = time.monotonic()
+                with self.assertRaises(WorkerCrashedError):
+                    await self.pool.request(42, 'crash')
+                await asyncio.sleep(0.05)
+                # Fork pengganti berjalan di executor: worker lain tetap menjawab selama itu
+                await self.pool.request(other, 'count')
+                elapsed = time.monotonic() - start
+                # Permintaan ke worker yang sedang diganti menunggu penggantinya, bukan gagal
+                _, pid, count = await self.pool.request(42, 'count')
+            return elapsed, pid, count
+
+        elapsed, pid, count = asyncio.run(scenario())
+        self.assertLess(elapsed, 0.3)
+        self.assertEqual(count, 1)
+        self.assertEqual(self.pool.stats()['worker_respawns'], 1)
+
+class TestPreforkSessions(unittest.TestCase):
+
+    def test_08_stored_sessions_survive_gateway_restart(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.dict(os.environ, {'SESSION_DB_PATH': os.path.join(directory, 'sessions.db')}):
+            async def first_run():
+                pool = PreforkPool(SessionWorkerHandler, workers=2).start()
+                sessions = PreforkSessions(pool)
+                try:
+                    self.assertEqual(await sessions.restore_index(), 0)
+                    await sessions.open(42, "Uji")
+                    await sessions.turn(42, "aku cemas soal ujian")
+                    return (await sessions.turn(42, "aku takut gagal"))[1]
+                finally:
+                    await pool.shutdown()
+
+            async def second_run():
+                pool = PreforkPool(SessionWorkerHandler, workers=2).start()
+                sessions = PreforkSessions(pool)
+                try:
+                    self.assertNotIn(42, sessions)
+                    self.assertEqual(await sessions.restore_index(), 1)
+                    self.assertIn(42, sessions)
+                    self.assertNotIn(7, sessions)
+                    # 'open' untuk sesi tersimpan melanjutkan, tidak menimpa state-nya
+                    resumed = await sessions.open(42, "Uji")
+                    stage = (await pool.request(42, 'turn', "masih takut"))[1]
+                    await sessions.close(42)
+                    return resumed, stage, 42 in sessions
+                finally:
+                    await pool.shutdown()
+
+            stage_before = asyncio.run(first_run())
+            resumed, stage_after, still_active = asyncio.run(second_run())
+            # Satu file per worker: tulisan dari proses berbeda tidak berebut lock WAL yang sama
+            shards = sorted(name for name in os.listdir(directory) if name.endswith('.db'))
+        self.assertTrue(resumed.startswith("Halo lagi, Uji."))
+        self.assertNotEqual(stage_before, 'GREETING')
+        self.assertNotEqual(stage_after, 'GREETING')
+        self.assertFalse(still_active)
+        self.assertEqual(shards, ['sessions.worker0.db', 'sessions.worker1.db'])
+
+if __name__ == '__main__':
+    unittest.main()